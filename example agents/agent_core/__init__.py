@@ -0,0 +1,13 @@
+# agent_core package
+import os
+import sys
+
+# The example agents reuse the starter-kit client instead of carrying their
+# own copy of the HTTP plumbing.
+_TOOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "starter-kit", "tools"))
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+
+import codec  # noqa: E402  shared JSON codec, re-exported as agent_core.codec
+import hashing  # noqa: E402  streaming SHA-256, re-exported as agent_core.hashing
+import delivery_pipeline  # noqa: E402  parallel delivery uploads, re-exported as agent_core.delivery_pipeline
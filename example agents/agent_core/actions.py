@@ -0,0 +1,12 @@
+from idempotency import IdempotencyKeys
+
+
+def idempotent_call(ctx, resource, action, send, persist):
+    """Run ``send(key)`` with an idempotency key stored in ``ctx``.
+
+    New keys are written to disk through ``persist(ctx)`` before the request
+    goes out, so a call interrupted by a timeout or a restart is resent with
+    the same key on the next tick.
+    """
+    keys = IdempotencyKeys(ctx.setdefault("idempotency_keys", {}), persist=lambda: persist(ctx))
+    return keys.call(ctx.get("actor_id"), resource, action, send)
@@ -0,0 +1,16 @@
+def unchanged_since_stay(ctx, state, payload):
+    """True when ``state`` already saw this exact payload and decided to stay.
+
+    Polled GETs carry a ``_version`` (ETag or body hash) from the client
+    cache. A handler whose decision depends only on that payload can then
+    return ``state`` right away instead of re-evaluating it.
+    """
+    version = payload.get("_version") if isinstance(payload, dict) else None
+    return bool(version) and ctx.get("poll_versions", {}).get(state) == version
+
+
+def stay(ctx, state, payload):
+    version = payload.get("_version") if isinstance(payload, dict) else None
+    if version:
+        ctx.setdefault("poll_versions", {})[state] = version
+    return state
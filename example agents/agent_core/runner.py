@@ -0,0 +1,27 @@
+def run_chain(fsm, ctx, state, pure_states=()):
+    """Run ``state`` and any pure states it leads to within one tick.
+
+    A pure state only routes to another state: it does no I/O and nothing it
+    does needs to survive a crash on its own, so there is nothing to save or
+    wait for before it. Its handler runs right after the one that entered it,
+    and the tick ends on the first state that is not pure, which is where the
+    caller saves and sleeps.
+
+    Returns the states visited, ``[state, ..., final]``; ``[state]`` when the
+    handler stayed put. Re-entering a pure state within one chain means the
+    FSM routes in a circle and raises ``RuntimeError`` instead of spinning.
+    """
+    path = [state]
+    while True:
+        handler = fsm.get(state)
+        if not handler:
+            raise RuntimeError(f"Unknown state: {state}")
+        new_state = handler(ctx)
+        if new_state == state:
+            return path
+        path.append(new_state)
+        if new_state not in pure_states:
+            return path
+        if new_state in path[:-1]:
+            raise RuntimeError(f"pure state loop: {' -> '.join(path)}")
+        state = new_state
@@ -0,0 +1,65 @@
+class PollPolicy:
+    """How long to wait before running a state again.
+
+    ``on_entry`` is the delay right after the FSM moved into the state. Every
+    further tick that stays put multiplies ``interval`` by ``factor``, up to
+    ``max_interval``.
+    """
+
+    def __init__(self, interval, factor=1.0, max_interval=None, on_entry=None):
+        self.interval = interval
+        self.factor = factor
+        self.max_interval = max_interval if max_interval is not None else interval
+        self.on_entry = interval if on_entry is None else on_entry
+
+    def delay(self, streak):
+        if streak == 0:
+            return self.on_entry
+        return min(self.interval * self.factor ** (streak - 1), max(self.max_interval, self.interval))
+
+
+class PollScheduler:
+    """Picks the sleep after each tick from the state the FSM will run next.
+
+    A tick that changes state resets the backoff. So does one whose polled
+    payload changed even though the state did not, as recorded by
+    ``agent_core.polling.stay``: the counterparty is active and the next
+    change is likely close.
+    """
+
+    def __init__(self, policies, default):
+        self.policies = dict(policies)
+        self.default = default
+        self._streak = 0
+        self._versions = {}
+
+    def policy(self, state):
+        return self.policies.get(state, self.default)
+
+    def next_delay(self, ctx, state, new_state):
+        version = (ctx.get("poll_versions") or {}).get(state)
+        changed = version is not None and self._versions.get(state) not in (None, version)
+        self._versions[state] = version
+        if new_state != state or changed:
+            self._streak = 0 if new_state != state else 1
+        else:
+            self._streak += 1
+        return self.policy(new_state).delay(self._streak)
+
+
+def standard_policies(interval, max_interval, fast_states=(), backoff_states=(), action_states=(), pure_states=()):
+    """Policy table shared by the example agents.
+
+    ``fast_states`` react within a fraction of ``interval``; ``backoff_states``
+    wait on the counterparty and back off exponentially to ``max_interval``;
+    ``action_states`` run at once and back off only while they keep failing;
+    ``pure_states`` only route to another state and run immediately.
+    """
+    fast = PollPolicy(interval / 4, on_entry=0.0)
+    backoff = PollPolicy(interval, factor=1.5, max_interval=max_interval)
+    action = PollPolicy(interval, factor=2.0, max_interval=max_interval, on_entry=0.0)
+    immediate = PollPolicy(0.0)
+    policies = {}
+    for states, policy in ((fast_states, fast), (backoff_states, backoff), (action_states, action), (pure_states, immediate)):
+        policies.update((state, policy) for state in states)
+    return PollScheduler(policies, default=PollPolicy(interval))
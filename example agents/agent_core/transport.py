@@ -0,0 +1,91 @@
+import threading
+
+from agenttiki_client import get_client, json_or_error
+from circuit_breaker import BACKEND_UNAVAILABLE
+from delivery_pipeline import upload_manifest
+from downloads import download_file
+from route_cache import is_not_found, negotiation_routes
+
+
+class Transport:
+    """Credential-aware wrapper around the pooled starter-kit client.
+
+    Both example agents keep one instance at module level, so every poll tick
+    reuses the same keep-alive connections and the same response
+    normalization.
+    """
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.actor_id = None
+        self.api_key = None
+        # Per thread, so concurrent ticks each learn only about their own calls.
+        self._backoff = threading.local()
+
+    def configure_credentials(self, actor_id, api_key):
+        self.actor_id = actor_id
+        self.api_key = api_key
+
+    def require_api_key(self):
+        if not self.api_key:
+            raise RuntimeError("API key not set")
+        return self.api_key
+
+    @property
+    def client(self):
+        return get_client(timeout=self.timeout)
+
+    def response(self, method, base_name, path, authenticated=True, **kwargs):
+        api_key = self.require_api_key() if authenticated else None
+        return self.client.request(method, base_name, path, api_key=api_key, **kwargs)
+
+    def request(self, method, base_name, path, authenticated=True, **kwargs):
+        api_key = self.require_api_key() if authenticated else None
+        result = self.client.request_json(method, base_name, path, api_key=api_key, **kwargs)
+        error = result.get("error") if isinstance(result, dict) else None
+        if isinstance(error, dict) and error.get("code") == BACKEND_UNAVAILABLE:
+            self._backoff.seconds = max(getattr(self._backoff, "seconds", None) or 0.0, error.get("retry_after") or 0.0)
+        return result
+
+    def take_backoff(self):
+        """Seconds to wait if this thread's tick hit an open circuit, else ``None``.
+
+        Such a tick decided nothing, so the agent keeps it in its current
+        state and sleeps until the circuit half-opens instead of spending a
+        poll on it.
+        """
+        backoff = getattr(self._backoff, "seconds", None)
+        self._backoff.seconds = None
+        return backoff
+
+    def negotiation(self, method, suffix="", **kwargs):
+        # Learns whether this deployment serves /negotiate/v2 or
+        # /negotiations/v2 so steady-state calls cost one round trip.
+        return negotiation_routes.call(
+            self.client.bases["NEGOTIATION_API_BASE"],
+            suffix,
+            lambda path: self.request(method, "NEGOTIATION_API_BASE", path, **kwargs),
+            is_not_found,
+        )
+
+    def download(self, url, local_path, expected_sha256=None, timeout=60, file_meta=None):
+        # Streams into a .part file and resumes it on the next call if the
+        # transfer breaks, so a large output is never held in memory.
+        # Compressed deliveries are decompressed into local_path on the way.
+        file_meta = file_meta or {}
+        with self.client.leased() as client:
+            return download_file(
+                client.session,
+                url,
+                local_path,
+                expected_sha256=expected_sha256,
+                timeout=timeout,
+                content_encoding=file_meta.get("content_encoding"),
+                expected_uncompressed_sha256=file_meta.get("uncompressed_sha256"),
+            )
+
+    def upload(self, manifest, presigned_files, contract_id=None):
+        # Every file streams from disk in parallel; entries with part URLs go
+        # up as multipart uploads.
+        with self.client.leased() as client:
+            return upload_manifest(manifest, presigned_files, session=client.session, contract_id=contract_id)
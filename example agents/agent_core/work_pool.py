@@ -0,0 +1,192 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agent_core import codec
+from agent_core.runner import run_chain
+
+
+class WorkItem:
+    def __init__(self, key, ctx, scheduler):
+        self.key = key
+        self.ctx = ctx
+        self.scheduler = scheduler
+        self.due = 0.0
+
+
+class WorkPool:
+    """Advances many independent FSM contexts on a bounded thread pool.
+
+    Every item is one context with its own state file, ``work_dir/<key>.json``
+    (the FSM's ``save_state`` writes to ``ctx["state_file"]``), and its own
+    poll scheduler. The dispatcher hands due items to at most ``workers``
+    threads, so one item's wait never holds up another's. ``refill`` runs
+    every ``refill_interval`` seconds to feed new work in; ``stops`` and
+    ``retire`` decide what happens to an item that is done. Items found in
+    ``work_dir`` on start resume where they were saved.
+
+    Subclasses set ``FSM``, ``PURE_STATES`` and ``TERMINAL_STATES`` and pass
+    in the agent's ``make_scheduler()``, ``save_state(ctx)`` and, when its
+    transport has a circuit breaker, ``take_backoff()``.
+    """
+
+    FSM = {}
+    PURE_STATES = frozenset()
+    TERMINAL_STATES = frozenset()
+    # Identity copied from the runtime's own ctx into every item.
+    SHARED_KEYS = ("actor_id", "api_key")
+
+    def __init__(self, ctx, workers, work_dir, refill_interval, make_scheduler, save_state, take_backoff=None):
+        self.ctx = ctx
+        self.make_scheduler = make_scheduler
+        self.save_state = save_state
+        self.take_backoff = take_backoff or (lambda: None)
+        self.workers = max(1, workers)
+        self.work_dir = work_dir
+        self.refill_interval = refill_interval
+        self.items = {}
+        self.paused_until = 0.0
+        os.makedirs(work_dir, exist_ok=True)
+        self._load()
+
+    # --- hooks ---
+    def refill(self):
+        """Add new work; runs on the dispatcher thread."""
+
+    def stops(self, item):
+        return item.ctx.get("state") in self.TERMINAL_STATES
+
+    def finished(self):
+        """True when ``run`` should return."""
+        return False
+
+    # --- items ---
+    def _load(self):
+        for name in sorted(os.listdir(self.work_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.work_dir, name)
+            try:
+                with open(path, "rb") as file_handle:
+                    item_ctx = codec.loads(file_handle.read())
+            except (OSError, ValueError) as exc:
+                print(f"[RUNTIME] skipping unreadable {path}: {exc}")
+                continue
+            item_ctx.update(self._shared())
+            item_ctx["state_file"] = path
+            key = name[: -len(".json")]
+            self.items[key] = WorkItem(key, item_ctx, self.make_scheduler())
+        if self.items:
+            print(f"[RUNTIME] resumed {len(self.items)} work items")
+
+    def _shared(self):
+        return {key: self.ctx[key] for key in self.SHARED_KEYS if key in self.ctx}
+
+    def add(self, key, **fields):
+        item_ctx = self._shared()
+        item_ctx.update(fields)
+        item_ctx["state_file"] = os.path.join(self.work_dir, f"{key}.json")
+        self.save_state(item_ctx)
+        self.items[key] = WorkItem(key, item_ctx, self.make_scheduler())
+        print(f"[RUNTIME] {key} added in {item_ctx['state']} ({len(self.items)} active)")
+        return self.items[key]
+
+    def rename(self, item, key):
+        """Move ``item`` and its state file to ``key``; runs on the dispatcher thread."""
+        path = os.path.join(self.work_dir, f"{key}.json")
+        os.replace(item.ctx["state_file"], path)
+        item.ctx["state_file"] = path
+        del self.items[item.key]
+        item.key = key
+        self.items[key] = item
+
+    def retire(self, item):
+        del self.items[item.key]
+        try:
+            os.remove(item.ctx["state_file"])
+        except FileNotFoundError:
+            pass
+
+    # --- dispatch ---
+    def tick(self, item):
+        # Runs on a worker thread; only this thread touches item.ctx until
+        # the result is handed back to the dispatcher. The backoff is read
+        # on the same thread, so it only reflects this item's calls.
+        self.take_backoff()
+        state = item.ctx.get("state", "IDLE")
+        try:
+            path = run_chain(self.FSM, item.ctx, state, self.PURE_STATES)
+        except Exception as exc:
+            print(f"[ERROR] {item.key} state handler failed ({state}): {exc}")
+            path = [state, "FAILED"]
+        return path, self.take_backoff()
+
+    def pause(self, backoff):
+        # The circuit is shared by every item: hold all dispatching until
+        # it half-opens.
+        self.paused_until = max(self.paused_until, time.monotonic() + max(backoff, 1.0))
+        print(f"[RUNTIME] backend unavailable, pausing {backoff:.1f}s")
+
+    def settle(self, item, path, backoff):
+        state, new_state = path[0], path[-1]
+        now = time.monotonic()
+
+        if backoff is not None:
+            # The state this tick chose is not a decision, but its calls
+            # may have changed the backend, so keep what the handlers
+            # recorded and run the same state again.
+            self.save_state(item.ctx)
+            self.pause(backoff)
+            item.due = self.paused_until
+            return
+
+        if new_state != state:
+            for source, target in zip(path, path[1:]):
+                print(f"[TRANSITION] {item.key} {source} -> {target}")
+            item.ctx["state"] = new_state
+
+        if self.stops(item):
+            self.retire(item)
+            return
+        if new_state != state:
+            self.save_state(item.ctx)
+        item.due = now + item.scheduler.next_delay(item.ctx, state, new_state)
+
+    def run(self, stop=None):
+        """Dispatch due items until ``finished()`` or ``stop`` (an Event) is set."""
+        running = {}
+        next_refill = 0.0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="work") as pool:
+            while stop is None or not stop.is_set():
+                now = time.monotonic()
+                if now >= max(next_refill, self.paused_until):
+                    self.take_backoff()
+                    self.refill()
+                    next_refill = time.monotonic() + self.refill_interval
+                    backoff = self.take_backoff()
+                    if backoff is not None:
+                        self.pause(backoff)
+                if not running and self.finished():
+                    return
+
+                wake = [max(next_refill, self.paused_until)]
+                if len(running) < self.workers and time.monotonic() >= self.paused_until:
+                    busy = set(running.values())
+                    waiting = sorted((item for item in self.items.values() if item not in busy), key=lambda item: item.due)
+                    for item in waiting:
+                        if item.due > time.monotonic():
+                            wake.append(item.due)
+                            break
+                        if len(running) >= self.workers:
+                            break
+                        running[pool.submit(self.tick, item)] = item
+
+                timeout = max(0.0, min(wake) - time.monotonic())
+                if running:
+                    done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout)
+                    done = ()
+                for future in done:
+                    item = running.pop(future)
+                    self.settle(item, *future.result())
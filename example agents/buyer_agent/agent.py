@@ -1,12 +1,30 @@
+import os
 import time
 
 import api
-from fsm import FSM, load_state, save_state
+from agent_core.runner import run_chain
+from agent_core.scheduler import standard_policies
+from fsm import FSM, PURE_STATES, load_state, save_state
 
-POLL_INTERVAL_SECONDS = 5
+POLL_INTERVAL_SECONDS = float(os.getenv("BUYER_POLL_INTERVAL_SECONDS", "5"))
+POLL_MAX_INTERVAL_SECONDS = float(os.getenv("BUYER_POLL_MAX_INTERVAL_SECONDS", str(POLL_INTERVAL_SECONDS * 6)))
 TERMINAL_STATES = {"ACCEPTED", "FAILED"}
 
 
+def make_scheduler():
+    return standard_policies(
+        POLL_INTERVAL_SECONDS,
+        POLL_MAX_INTERVAL_SECONDS,
+        fast_states=("HANDLE_NEGOTIATION",),
+        backoff_states=("WAITING_FOR_PROVIDER", "WAITING_FOR_PAYMENT", "WAITING_FOR_OUTPUT"),
+        action_states=("IDLE", "MATCHING", "CONTRACT_CREATED", "PAYMENT_REQUIRED", "REVIEWING"),
+        pure_states=PURE_STATES,
+    )
+
+
+SCHEDULER = make_scheduler()
+
+
 def ensure_auth(ctx, max_retries=3):
     actor_id = ctx.get("actor_id")
     api_key = ctx.get("api_key")
@@ -17,12 +35,13 @@ def ensure_auth(ctx, max_retries=3):
 
     print("[AUTH] No stored credentials. Registering buyer actor...")
 
+    delays = api.retry_delays()
     for attempt in range(1, max_retries + 1):
         try:
             response = api.register_actor()
         except Exception as exc:
             print(f"[AUTH] Register attempt {attempt} failed: {exc}")
-            time.sleep(min(2 ** attempt, 10))
+            time.sleep(next(delays))
             continue
 
         actor_id = response.get("actor_id") if isinstance(response, dict) else None
@@ -37,7 +56,7 @@ def ensure_auth(ctx, max_retries=3):
             return True
 
         print(f"[AUTH] Register attempt {attempt} returned invalid payload: {response}")
-        time.sleep(min(2 ** attempt, 10))
+        time.sleep(next(delays))
 
     return False
 
@@ -71,22 +90,31 @@ def main():
             print(f"Agent finished with state: {state}\nExiting loop.")
             break
 
-        handler = FSM.get(state)
-        if not handler:
-            raise RuntimeError(f"Unknown state: {state}")
-
         try:
-            new_state = handler(ctx)
+            path = run_chain(FSM, ctx, state, PURE_STATES)
         except Exception as exc:
             print(f"[ERROR] state handler failed ({state}): {exc}")
-            new_state = "FAILED"
+            path = [state, "FAILED"]
+        new_state = path[-1]
+
+        backoff = api.take_backoff()
+        if backoff is not None:
+            # An open circuit answered this tick, so the state it chose is
+            # not a decision. Keep what the handlers recorded, stay put and
+            # retry once the circuit half-opens.
+            print(f"[LOOP] backend unavailable, retrying {state} in {backoff:.1f}s")
+            new_state = state
 
         if new_state != state:
-            print(f"[TRANSITION] {state} -> {new_state}")
+            for source, target in zip(path, path[1:]):
+                print(f"[TRANSITION] {source} -> {target}")
             ctx["state"] = new_state
 
         save_state(ctx)
-        time.sleep(POLL_INTERVAL_SECONDS)
+        if backoff is not None:
+            time.sleep(max(backoff, 1.0))
+        else:
+            time.sleep(SCHEDULER.next_delay(ctx, state, new_state))
 
 
 if __name__ == "__main__":
@@ -1,105 +1,54 @@
 import os
+import sys
 import urllib.parse
-import requests
 
+_AGENTS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _AGENTS_ROOT not in sys.path:
+    sys.path.append(_AGENTS_ROOT)
 
-LISTINGS_API_BASE = os.getenv(
-    "LISTINGS_API_BASE",
-    "https://6ie3irwugc.execute-api.us-east-1.amazonaws.com/prod",
-)
-CONTRACTS_API_BASE = os.getenv(
-    "CONTRACTS_API_BASE",
-    "https://hwvxmctc7b.execute-api.us-east-1.amazonaws.com/prod",
-)
-NEGOTIATION_API_BASE = os.getenv("NEGOTIATION_API_BASE", LISTINGS_API_BASE)
-ACTORS_API_BASE = os.getenv("ACTORS_API_BASE", LISTINGS_API_BASE)
-PAYMENTS_API_BASE = os.getenv("PAYMENTS_API_BASE", CONTRACTS_API_BASE)
+from agent_core.transport import Transport, json_or_error
 
-_API_KEY = None
-_ACTOR_ID = None
+_TRANSPORT = Transport()
 
 
 def configure_credentials(actor_id, api_key):
-    global _ACTOR_ID, _API_KEY
-    _ACTOR_ID = actor_id
-    _API_KEY = api_key
+    _TRANSPORT.configure_credentials(actor_id, api_key)
 
 
 def auth_headers():
-    if not _API_KEY:
-        raise RuntimeError("API key not set")
-
-    return {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {_API_KEY}",
-    }
+    return _TRANSPORT.client.auth_headers(_TRANSPORT.require_api_key())
 
 
 def _json_or_error(response):
-    request_id = (
-        response.headers.get("apigw-requestid")
-        or response.headers.get("Apigw-Requestid")
-        or response.headers.get("x-amzn-requestid")
-        or response.headers.get("X-Amzn-Requestid")
-    )
+    return json_or_error(response)
+
+
+def retry_delays():
+    return _TRANSPORT.client.retry_policy.delays()
 
-    try:
-        payload = response.json()
-    except Exception:
-        payload = {
-            "error": {
-                "code": "HTTP_ERROR",
-                "message": f"HTTP {response.status_code}: non-JSON response: {response.text[:300]}",
-            }
-        }
-        if request_id:
-            payload["error"]["request_id"] = request_id
-
-    if response.status_code >= 400:
-        if isinstance(payload, dict) and "error" in payload:
-            if isinstance(payload["error"], dict):
-                payload["error"].setdefault("status_code", response.status_code)
-                if request_id:
-                    payload["error"].setdefault("request_id", request_id)
-            return payload
-        backend_message = None
-        if isinstance(payload, dict):
-            backend_message = payload.get("message")
-        return {
-            "error": {
-                "code": "HTTP_ERROR",
-                "message": (
-                    f"HTTP {response.status_code}: {backend_message}"
-                    if backend_message
-                    else f"HTTP {response.status_code}: {response.text[:300]}"
-                ),
-                "status_code": response.status_code,
-                "request_id": request_id,
-            }
-        }
 
-    return payload
+def take_backoff():
+    return _TRANSPORT.take_backoff()
 
 
 def register_actor():
-    response = requests.request(
+    return _TRANSPORT.request(
         "POST",
-        f"{ACTORS_API_BASE}/actors/v1",
+        "ACTORS_API_BASE",
+        "/actors/v1",
+        authenticated=False,
         headers={"Content-Type": "application/json"},
         json={"action": "register"},
-        timeout=30,
     )
-    return _json_or_error(response)
 
 
 def match_intent(intent):
-    response = requests.post(
-        f"{LISTINGS_API_BASE}/listings/match/v1",
-        headers=auth_headers(),
+    return _TRANSPORT.request(
+        "POST",
+        "LISTINGS_API_BASE",
+        "/listings/match/v1",
         json={"version": "v1", "intent": intent},
-        timeout=30,
     )
-    return _json_or_error(response)
 
 
 def match(intent):
@@ -116,13 +65,7 @@ def create_contract(contract_id, intent_hash, provider_id, final_offer, negotiat
         "provider_id": provider_id,
         "final_offer": final_offer,
     }
-    response = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1",
-        headers=auth_headers(),
-        json=payload,
-        timeout=30,
-    )
-    return _json_or_error(response)
+    return _TRANSPORT.request("POST", "CONTRACTS_API_BASE", "/contracts/v1", json=payload)
 
 
 def create_negotiation(provider_id, intent_hash, offer, listing_id=None):
@@ -134,95 +77,38 @@ def create_negotiation(provider_id, intent_hash, offer, listing_id=None):
         "offer": offer,
         "proposal": offer,
     }
-
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2",
-        headers=auth_headers(),
-        json=payload,
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2",
-            headers=auth_headers(),
-            json=payload,
-            timeout=30,
-        )
-    return _json_or_error(response)
+    return _TRANSPORT.negotiation("POST", json=payload)
 
 
 def get_negotiation(negotiation_id):
-    response = requests.get(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.get(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}",
-            headers=auth_headers(),
-            timeout=30,
-        )
-    return _json_or_error(response)
-
-
-def propose_negotiation(negotiation_id, proposal):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/propose",
-        headers=auth_headers(),
+    return _TRANSPORT.negotiation("GET", f"/{negotiation_id}", cache=True)
+
+
+def propose_negotiation(negotiation_id, proposal, idempotency_key=None):
+    return _TRANSPORT.negotiation(
+        "POST",
+        f"/{negotiation_id}/propose",
         json={
             "proposal": proposal
         },
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/propose",
-            headers=auth_headers(),
-            json={
-                "proposal": proposal
-            },
-            timeout=30,
-        )
-    return _json_or_error(response)
-
-
-def accept_negotiation(negotiation_id):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/accept",
-        headers=auth_headers(),
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/accept",
-            headers=auth_headers(),
-            timeout=30,
-        )
-    return _json_or_error(response)
+
+
+def accept_negotiation(negotiation_id, idempotency_key=None):
+    return _TRANSPORT.negotiation("POST", f"/{negotiation_id}/accept", idempotency_key=idempotency_key)
 
 
 def reject_negotiation(negotiation_id):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/reject",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/reject",
-            headers=auth_headers(),
-            timeout=30,
-        )
-    return _json_or_error(response)
+    return _TRANSPORT.negotiation("POST", f"/{negotiation_id}/reject")
 
 
-def accept(negotiation_id):
-    return accept_negotiation(negotiation_id)
+def accept(negotiation_id, idempotency_key=None):
+    return accept_negotiation(negotiation_id, idempotency_key=idempotency_key)
 
 
-def propose(negotiation_id, proposal):
-    return propose_negotiation(negotiation_id, proposal)
+def propose(negotiation_id, proposal, idempotency_key=None):
+    return propose_negotiation(negotiation_id, proposal, idempotency_key=idempotency_key)
 
 
 def reject(negotiation_id):
@@ -230,12 +116,11 @@ def reject(negotiation_id):
 
 
 def get_contract(contract_id):
-    response = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return _json_or_error(response)
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}", cache=True)
+
+
+def get_balance():
+    return _TRANSPORT.request("GET", "CREDITS_API_BASE", "/credits/v1/balance")
 
 
 def create_payment_session(contract_id, exp=None, sig=None):
@@ -245,12 +130,7 @@ def create_payment_session(contract_id, exp=None, sig=None):
     if sig is not None:
         payload["sig"] = sig
 
-    response = requests.post(
-        f"{PAYMENTS_API_BASE}/payments/v1/create",
-        headers=auth_headers(),
-        json=payload,
-        timeout=30,
-    )
+    response = _TRANSPORT.response("POST", "PAYMENTS_API_BASE", "/payments/v1/create", json=payload)
     parsed = _json_or_error(response)
     if isinstance(parsed, dict):
         parsed["_status_code"] = response.status_code
@@ -273,97 +153,62 @@ def extract_signed_payment_params(payment_url):
 
 
 def get_latest_delivery(contract_id):
-    response = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/latest",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return _json_or_error(response)
-
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}/delivery/latest", cache=True)
 
-def request_upload(contract_id, files, delivery_type="OUTPUT"):
-    print("[DEBUG] request_upload called")
-    headers = auth_headers()
-    print("[DEBUG] request_upload headers:", headers)
 
-    r = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/upload-intent",
-        headers=headers,
+def request_upload(contract_id, files, delivery_type="OUTPUT", idempotency_key=None):
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/upload-intent",
         json={"files": files, "delivery_type": delivery_type},
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    return _json_or_error(r)
 
 
-def upload_input_intent(contract_id, files):
-    print("[DEBUG] upload_input_intent URL:",
-      f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/upload-intent")
-    response = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/upload-intent",
-        headers=auth_headers(),
-        json={"files": files, "delivery_type": "INPUT"},
-        timeout=30,
-    )
-    return _json_or_error(response)
+def upload_input_intent(contract_id, files, idempotency_key=None):
+    return request_upload(contract_id, files, delivery_type="INPUT", idempotency_key=idempotency_key)
 
 
 def confirm_upload(contract_id, files, delivery_type="INPUT"):
-    response = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/confirm",
-        headers=auth_headers(),
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/confirm",
         json={"delivery_type": delivery_type, "files": files},
-        timeout=30,
     )
-    return _json_or_error(response)
 
 
 def confirm_input(contract_id, files):
     return confirm_upload(contract_id, files, delivery_type="INPUT")
 
 
-def transition_contract(contract_id, to_status):
+def transition_contract(contract_id, to_status, idempotency_key=None):
     payload = {
         "version": "v1",
         "action": "transition",
         "contract_id": contract_id,
         "to_status": to_status,
     }
-    response = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1",
-        headers=auth_headers(),
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        "/contracts/v1",
         json=payload,
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    return _json_or_error(response)
 
 
 def download_latest(contract_id):
-    response = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/download",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return _json_or_error(response)
-
-
-def download_from_presigned(download_url, local_path):
-    response = requests.request("GET", download_url, timeout=60)
-    if response.status_code != 200:
-        return False
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}/delivery/download")
 
-    directory = os.path.dirname(local_path)
-    if directory:
-        os.makedirs(directory, exist_ok=True)
 
-    with open(local_path, "wb") as output_file:
-        output_file.write(response.content)
-    return True
+def download_from_presigned(download_url, local_path, expected_sha256=None, file_meta=None):
+    return _TRANSPORT.download(download_url, local_path, expected_sha256=expected_sha256, file_meta=file_meta)
 
 
-def upload_to_presigned(upload_url, local_path):
-    with open(local_path, "rb") as input_file:
-        response = requests.put(upload_url, data=input_file, timeout=60)
-    return response.status_code in (200, 201, 204)
+def upload_to_presigned(manifest, presigned_files, contract_id=None):
+    return _TRANSPORT.upload(manifest, presigned_files, contract_id=contract_id)
 
 
 def derive_provider_id(listing_id):
@@ -1,5 +1,3 @@
-import hashlib
-import json
 import os
 import sys
 import time
@@ -13,25 +11,36 @@ _AGENTS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if _AGENTS_ROOT not in sys.path:
     sys.path.append(_AGENTS_ROOT)
 
+from agent_core import codec, delivery_pipeline, hashing
+from agent_core.actions import idempotent_call
+from agent_core.polling import stay, unchanged_since_stay
 from negotiation_core.decision_engine import decision_engine
 
 STATE_FILE = "state.json"
 PAYMENT_URL_BASE = os.getenv("BUYER_PAYMENT_URL_BASE", "https://d1pe03n554sxy3.cloudfront.net/")
 PAYMENT_RETRY_LIMIT = 3
+DOWNLOAD_RETRY_LIMIT = 5
+REVIEW_RETRY_LIMIT = 10
 PAYMENT_WAIT_TIMEOUT_SECONDS = 600
+DEFAULT_INTENT = {
+    "service": "translation",
+    "from": "en",
+    "to": "de",
+}
 
 
 # --- State persistence ---
 def load_state():
     if not os.path.exists(STATE_FILE):
         return {}
-    with open(STATE_FILE, "r") as file_handle:
-        return json.load(file_handle)
+    with open(STATE_FILE, "rb") as file_handle:
+        return codec.loads(file_handle.read())
 
 
 def save_state(ctx):
-    with open(STATE_FILE, "w") as file_handle:
-        json.dump(ctx, file_handle, indent=2)
+    # The runtime gives every purchase its own file in ctx["state_file"].
+    with open(ctx.get("state_file", STATE_FILE), "w", encoding="utf-8") as file_handle:
+        file_handle.write(codec.dumps_pretty(ctx))
 
 
 # --- FSM handlers ---
@@ -45,11 +54,7 @@ def matching(ctx):
     if ctx.get("contract_id"):
         return "CONTRACT_CREATED"
 
-    intent = ctx.get("intent") or {
-        "service": "translation",
-        "from": "en",
-        "to": "de",
-    }
+    intent = ctx.get("intent") or DEFAULT_INTENT
 
     match_response = api.match_intent(intent)
     if "error" in match_response:
@@ -161,7 +166,13 @@ def handle_negotiation(ctx):
 
     if decision.action == "ACCEPT":
         print("[BUYER] accepting proposal")
-        res = api.accept(negotiation_id)
+        res = idempotent_call(
+            ctx,
+            negotiation_id,
+            "accept",
+            lambda key: api.accept(negotiation_id, idempotency_key=key),
+            save_state,
+        )
         if "error" in res:
             print(f"[BUYER] accept error: {res}")
             return "WAITING_FOR_PROVIDER"
@@ -176,7 +187,13 @@ def handle_negotiation(ctx):
     if decision.action == "PROPOSE":
         if not decision.proposal:
             return "WAITING_FOR_PROVIDER"
-        res = api.propose(negotiation_id, decision.proposal)
+        res = idempotent_call(
+            ctx,
+            negotiation_id,
+            f"propose:{ctx['negotiation']['round_count']}",
+            lambda key: api.propose(negotiation_id, decision.proposal, idempotency_key=key),
+            save_state,
+        )
         if "error" in res:
             print(f"[BUYER] propose error: {res}")
             return "WAITING_FOR_PROVIDER"
@@ -196,6 +213,8 @@ def waiting_for_provider(ctx):
     negotiation = api.get_negotiation(ctx["negotiation_id"])
     if "error" in negotiation:
         return "WAITING_FOR_PROVIDER"
+    if unchanged_since_stay(ctx, "WAITING_FOR_PROVIDER", negotiation):
+        return "WAITING_FOR_PROVIDER"
 
     meta = negotiation.get("meta") or {}
     status = negotiation.get("status") or meta.get("status")
@@ -217,7 +236,7 @@ def waiting_for_provider(ctx):
     if negotiation.get("next_actor_id") == ctx.get("actor_id") or meta.get("next_actor_id") == ctx.get("actor_id"):
         return "HANDLE_NEGOTIATION"
 
-    return "WAITING_FOR_PROVIDER"
+    return stay(ctx, "WAITING_FOR_PROVIDER", negotiation)
 
 
 def negotiation_accepted(ctx):
@@ -237,20 +256,25 @@ def contract_created(ctx):
     if status_state not in ("CONTRACT_CREATED", "CONTRACT_ACTIVE"):
         return status_state
 
-    input_dir = "input"
-    os.makedirs(input_dir, exist_ok=True)
-    local_input_path = os.path.join(input_dir, "input.txt")
-
-    with open(local_input_path, "w") as file_handle:
-        file_handle.write(f"buyer input for contract {contract_id}\n")
-        file_handle.write("translate this content from EN to DE\n")
+    # One directory per contract, so concurrent purchases never share a file.
+    local_input_path = os.path.join("input", contract_id, "input.txt")
 
-    with open(local_input_path, "rb") as file_handle:
-        sha256 = hashlib.sha256(file_handle.read()).hexdigest()
+    with hashing.HashingWriter.open(local_input_path) as writer:
+        writer.write(f"buyer input for contract {contract_id}\n")
+        writer.write("translate this content from EN to DE\n")
+    sha256 = writer.hexdigest()
 
-    files = [{"path": "input/input.txt", "sha256": sha256}]
+    manifest = [{"path": "input/input.txt", "local_path": local_input_path, "sha256": sha256, "size": writer.size}]
+    manifest = delivery_pipeline.compress_manifest(manifest)
+    files = delivery_pipeline.intent_files(manifest)
 
-    upload_intent_response = api.upload_input_intent(contract_id, files)
+    upload_intent_response = idempotent_call(
+        ctx,
+        contract_id,
+        "upload-intent:INPUT",
+        lambda key: api.upload_input_intent(contract_id, files, idempotency_key=key),
+        save_state,
+    )
     if "error" in upload_intent_response:
         print(f"[CONTRACT_CREATED] upload-intent error: {upload_intent_response}")
         return "CONTRACT_CREATED"
@@ -260,18 +284,21 @@ def contract_created(ctx):
         print("[CONTRACT_CREATED] upload-intent returned no files")
         return "CONTRACT_CREATED"
 
-    for file_meta in presigned_files:
-        if not api.upload_to_presigned(file_meta.get("upload_url"), local_input_path):
-            print(f"[CONTRACT_CREATED] presigned upload failed: {file_meta}")
-            return "CONTRACT_CREATED"
+    uploaded = api.upload_to_presigned(manifest, presigned_files, contract_id=contract_id)
+    delivery_pipeline.remove_compressed(manifest)
+    if "error" in uploaded:
+        print(f"[CONTRACT_CREATED] presigned upload failed: {uploaded}")
+        return "CONTRACT_CREATED"
+    uploaded_files = uploaded["files"]
+    print(f"[CONTRACT_CREATED] uploaded {uploaded['report']['bytes']} bytes in {uploaded['report']['seconds']}s")
 
-    confirm_response = api.confirm_input(contract_id, presigned_files)
+    confirm_response = api.confirm_input(contract_id, uploaded_files)
     if "error" in confirm_response:
         print(f"[CONTRACT_CREATED] confirm error: {confirm_response}")
         return "CONTRACT_CREATED"
 
-    ctx["input_snapshot_id"] = presigned_files[0].get("snapshot_id")
-    ctx["input_files"] = presigned_files
+    ctx["input_snapshot_id"] = uploaded_files[0].get("snapshot_id")
+    ctx["input_files"] = uploaded_files
     print(f"[CONTRACT_CREATED] input uploaded for contract {contract_id}")
 
     return "INPUT_UPLOADED"
@@ -367,6 +394,8 @@ def waiting_for_payment(ctx):
     if "error" in contract:
         print(f"[BUYER] waiting for payment confirmation... contract fetch error: {contract}")
         return "WAITING_FOR_PAYMENT"
+    if unchanged_since_stay(ctx, "WAITING_FOR_PAYMENT", contract):
+        return "WAITING_FOR_PAYMENT"
 
     status = contract.get("status")
     print(f"[BUYER] waiting for payment confirmation…")
@@ -376,7 +405,7 @@ def waiting_for_payment(ctx):
         return "CONTRACT_ACTIVE"
     if status in ("CANCELLED", "FAILED"):
         return "FAILED"
-    return "WAITING_FOR_PAYMENT"
+    return stay(ctx, "WAITING_FOR_PAYMENT", contract)
 
 
 def contract_active(ctx):
@@ -397,9 +426,11 @@ def waiting_for_output(ctx):
     if "error" in latest_response:
         print(f"[WAITING_FOR_OUTPUT] latest error: {latest_response}")
         return "WAITING_FOR_OUTPUT"
+    if unchanged_since_stay(ctx, "WAITING_FOR_OUTPUT", latest_response):
+        return "WAITING_FOR_OUTPUT"
 
     if latest_response.get("delivery_type") != "OUTPUT":
-        return "WAITING_FOR_OUTPUT"
+        return stay(ctx, "WAITING_FOR_OUTPUT", latest_response)
 
     ctx["output_snapshot_id"] = latest_response.get("snapshot_id")
     ctx["output_files"] = latest_response.get("files") or []
@@ -415,6 +446,43 @@ def reviewing(ctx):
         print("[REVIEWING] missing contract_id")
         return "FAILED"
 
+    if not ctx.get("output_verified"):
+        next_state = _download_output(ctx, contract_id)
+        if next_state:
+            return next_state
+
+    decision = ctx.get("review_decision", "FULFILLED")
+    if decision not in ("FULFILLED", "BREACHED"):
+        decision = "FULFILLED"
+
+    transition_response = _transition(ctx, contract_id, decision)
+    if "error" in transition_response:
+        status = _refused_transition_status(contract_id, transition_response)
+        if status == decision:
+            transition_response = {"status": status}
+        elif status in ("ACTIVE", "SHIPPED", None):
+            # The provider confirms OUTPUT before it marks the contract
+            # SHIPPED, and the backend refuses FULFILLED until it has. It may
+            # also have shipped since, or the check itself failed: retry.
+            attempts = int(ctx.get("review_attempts", 0)) + 1
+            ctx["review_attempts"] = attempts
+            if attempts >= REVIEW_RETRY_LIMIT:
+                print(f"[REVIEWING] {decision} refused after {attempts} attempts: {transition_response}")
+                return "FAILED"
+            print(f"[REVIEWING] {decision} refused (contract {status or 'unknown'}) attempt={attempts}, retrying")
+            return "REVIEWING"
+        else:
+            print(f"[REVIEWING] transition error: {transition_response}")
+            return "FAILED"
+
+    print(f"[REVIEWING] contract transitioned to {decision}")
+    if decision == "FULFILLED":
+        return "ACCEPTED"
+    return "FAILED"
+
+
+def _download_output(ctx, contract_id):
+    """Fetch and verify the OUTPUT; ``None`` once it is on disk, else the next state."""
     download_response = api.download_latest(contract_id)
     if "error" in download_response:
         print(f"[REVIEWING] download metadata error: {download_response}")
@@ -422,36 +490,46 @@ def reviewing(ctx):
 
     download_url = download_response.get("download_url")
     expected_sha256 = download_response.get("sha256")
+    file_meta = (download_response.get("files") or [{}])[0]
     local_output_path = os.path.join("downloads", f"{contract_id}_output.bin")
 
     if download_url:
-        downloaded = api.download_from_presigned(download_url, local_output_path)
-        if not downloaded:
-            print("[REVIEWING] failed to download presigned output")
+        downloaded = api.download_from_presigned(
+            download_url,
+            local_output_path,
+            expected_sha256=expected_sha256,
+            file_meta=file_meta,
+        )
+        error = downloaded.get("error") or {}
+        if error.get("code") == "HASH_MISMATCH":
+            print("[REVIEWING] output hash mismatch; marking BREACHED")
+            transition_response = _transition(ctx, contract_id, "BREACHED")
+            print(f"[REVIEWING] transition response: {transition_response}")
             return "FAILED"
-
-        if expected_sha256:
-            with open(local_output_path, "rb") as file_handle:
-                actual_sha256 = hashlib.sha256(file_handle.read()).hexdigest()
-            if actual_sha256 != expected_sha256:
-                print("[REVIEWING] output hash mismatch; marking BREACHED")
-                transition_response = api.transition_contract(contract_id, "BREACHED")
-                print(f"[REVIEWING] transition response: {transition_response}")
+        if error:
+            attempts = int(ctx.get("download_attempts", 0)) + 1
+            ctx["download_attempts"] = attempts
+            if attempts >= DOWNLOAD_RETRY_LIMIT:
+                print(f"[REVIEWING] download failed after {attempts} attempts: {error}")
                 return "FAILED"
-
-    decision = ctx.get("review_decision", "FULFILLED")
-    if decision not in ("FULFILLED", "BREACHED"):
-        decision = "FULFILLED"
-
-    transition_response = api.transition_contract(contract_id, decision)
-    if "error" in transition_response:
-        print(f"[REVIEWING] transition error: {transition_response}")
-        return "FAILED"
-
-    print(f"[REVIEWING] contract transitioned to {decision}")
-    if decision == "FULFILLED":
-        return "ACCEPTED"
-    return "FAILED"
+            # The partial file is kept; the next tick fetches a fresh URL
+            # and resumes from where this one stopped.
+            print(f"[REVIEWING] download interrupted attempt={attempts}, will resume: {error}")
+            return "REVIEWING"
+        ctx["download_attempts"] = 0
+    ctx["output_verified"] = True
+    return None
+
+
+def _refused_transition_status(contract_id, transition_response):
+    """Contract status behind a refused transition: ``None`` if unknown, ``""`` if not a refusal."""
+    error = transition_response.get("error") or {}
+    if error.get("code") != "INVALID_STATE_TRANSITION":
+        return ""
+    contract = api.get_contract(contract_id)
+    if "error" in contract:
+        return None
+    return contract.get("status") or None
 
 
 def accepted(ctx):
@@ -488,6 +566,16 @@ def _route_contract_state(ctx, source_state):
     return source_state
 
 
+def _transition(ctx, contract_id, to_status):
+    return idempotent_call(
+        ctx,
+        contract_id,
+        f"transition:{to_status}",
+        lambda key: api.transition_contract(contract_id, to_status, idempotency_key=key),
+        save_state,
+    )
+
+
 def _build_payment_url(contract_id):
     query = urllib.parse.urlencode({"contract_id": contract_id})
     return f"{PAYMENT_URL_BASE.rstrip('/')}/?{query}"
@@ -511,6 +599,10 @@ def _store_payment_link(ctx, response_obj, meta_obj):
     ctx["payment_url"] = payment_url
 
 
+# States that only route to another state; agent_core.runner runs them in the
+# same tick as the handler that entered them.
+PURE_STATES = frozenset({"NEGOTIATION_CREATED", "NEGOTIATION_ACCEPTED", "CONTRACT_ACTIVE", "INPUT_UPLOADED"})
+
 FSM = {
     "IDLE": idle,
     "MATCHING": matching,
@@ -0,0 +1,163 @@
+"""Run many purchases from one buyer process.
+
+``agent.py`` takes a single intent from ``IDLE`` to ``ACCEPTED`` or
+``FAILED`` and exits, so buying 200 translations means 200 runs one after
+another. This runtime takes a queue of intents and runs one FSM context per
+purchase instead, each with its own state file under ``work/``, all sharing
+the buyer's credentials and pooled HTTP client::
+
+    python runtime.py intents.jsonl      # one intent object per line
+    python runtime.py --count 200        # 200 purchases of the default intent
+
+The queue is kept in ``state.json``: a restarted runtime resumes the
+purchases in flight and carries on with the intents not yet started. Every
+finished purchase is appended to ``purchases.jsonl``.
+
+At most ``BUYER_RUNTIME_WORKERS`` handlers run at once, and a new purchase
+only starts while fewer than ``BUYER_RUNTIME_MAX_PURCHASES`` are open and the
+available credits cover it on top of the purchases still negotiating, which
+have not reserved anything yet. ``BUYER_CREDITS_PER_PURCHASE`` is the price
+assumed until a match shows a higher one; ``0`` turns the credit check off.
+"""
+
+import argparse
+import os
+import time
+
+import api
+from agent import POLL_INTERVAL_SECONDS, TERMINAL_STATES, ensure_auth, make_scheduler
+from agent_core import codec
+from agent_core.work_pool import WorkPool
+from fsm import DEFAULT_INTENT, FSM, PURE_STATES, load_state, save_state
+
+DEFAULT_WORKERS = int(os.getenv("BUYER_RUNTIME_WORKERS", "4"))
+DEFAULT_MAX_PURCHASES = int(os.getenv("BUYER_RUNTIME_MAX_PURCHASES", "16"))
+DEFAULT_CREDITS_PER_PURCHASE = float(os.getenv("BUYER_CREDITS_PER_PURCHASE", "1000"))
+WORK_DIR = "work"
+RESULTS_FILE = "purchases.jsonl"
+
+
+class BuyerRuntime(WorkPool):
+    FSM = FSM
+    PURE_STATES = PURE_STATES
+    TERMINAL_STATES = TERMINAL_STATES
+
+    def __init__(
+        self,
+        ctx,
+        workers=DEFAULT_WORKERS,
+        max_purchases=DEFAULT_MAX_PURCHASES,
+        credits_per_purchase=DEFAULT_CREDITS_PER_PURCHASE,
+        work_dir=WORK_DIR,
+        results_file=RESULTS_FILE,
+    ):
+        self.max_purchases = max(1, max_purchases)
+        self.credits_per_purchase = credits_per_purchase
+        self.results_file = results_file
+        self.blocked = False
+        ctx.setdefault("intent_queue", [])
+        ctx.setdefault("purchases_started", 0)
+        super().__init__(ctx, workers, work_dir, POLL_INTERVAL_SECONDS, make_scheduler, save_state, api.take_backoff)
+
+    @property
+    def queue(self):
+        return self.ctx["intent_queue"]
+
+    def enqueue(self, intents):
+        self.queue.extend(intents)
+        save_state(self.ctx)
+
+    def finished(self):
+        return not self.items and (not self.queue or self.blocked)
+
+    def price_estimate(self):
+        prices = [(item.ctx.get("final_offer") or {}).get("price") or 0 for item in self.items.values()]
+        return max([self.credits_per_purchase] + prices)
+
+    def credit_slots(self):
+        """How many more purchases the available credits cover, or ``None``."""
+        price = self.price_estimate()
+        if not price:
+            return None
+        balance = api.get_balance()
+        if "error" in balance:
+            print(f"[RUNTIME] balance error: {balance}")
+            return 0
+        available = balance.get("available_credits", balance.get("balance_credits")) or 0
+        # A contract already holds its price in reserved credits; a purchase
+        # that is still negotiating will need it later.
+        negotiating = sum(1 for item in self.items.values() if not item.ctx.get("contract_id"))
+        return max(0, int(available // price) - negotiating)
+
+    def refill(self):
+        room = min(self.max_purchases - len(self.items), len(self.queue))
+        if room <= 0:
+            return
+        slots = self.credit_slots()
+        if slots is not None:
+            room = min(room, slots)
+        self.blocked = room <= 0 and not self.items
+        if self.blocked:
+            print(f"[RUNTIME] available credits do not cover the next purchase; {len(self.queue)} intents left")
+        if room <= 0:
+            return
+
+        intents = self.queue[:room]
+        del self.queue[:room]
+        first = self.ctx["purchases_started"]
+        self.ctx["purchases_started"] = first + len(intents)
+        # The queue is saved before the purchases exist, so a crash in
+        # between drops these intents rather than buying them twice.
+        save_state(self.ctx)
+        for offset, intent in enumerate(intents):
+            self.add(f"purchase-{first + offset:05d}", state="IDLE", intent=intent, started_at=time.time())
+
+    def retire(self, item):
+        super().retire(item)
+        result = {
+            "purchase": item.key,
+            "state": item.ctx.get("state"),
+            "contract_id": item.ctx.get("contract_id"),
+            "intent": item.ctx.get("intent"),
+            "started_at": item.ctx.get("started_at"),
+            "finished_at": time.time(),
+        }
+        with open(self.results_file, "a", encoding="utf-8") as file_handle:
+            file_handle.write(codec.dumps(result) + "\n")
+
+
+def read_intents(path):
+    """Intents from a JSON list or a file with one JSON object per line."""
+    with open(path, "rb") as file_handle:
+        data = file_handle.read()
+    try:
+        intents = codec.loads(data)
+    except ValueError:
+        intents = [codec.loads(line) for line in data.splitlines() if line.strip()]
+    return intents if isinstance(intents, list) else [intents]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a queue of purchases concurrently.")
+    parser.add_argument("intents", nargs="?", help="JSON list or JSON-lines file of intents to add to the queue")
+    parser.add_argument("--count", type=int, default=0, help="add this many purchases of the default intent")
+    args = parser.parse_args(argv)
+
+    ctx = load_state()
+    ctx.setdefault("state", "IDLE")
+
+    if not ensure_auth(ctx):
+        print("[AUTH] Unable to authenticate buyer agent. Exiting.")
+        return
+
+    runtime = BuyerRuntime(ctx)
+    intents = read_intents(args.intents) if args.intents else []
+    intents += [DEFAULT_INTENT] * args.count
+    runtime.enqueue(intents)
+    print(f"[RUNTIME] {len(runtime.queue)} intents queued, {len(runtime.items)} in flight, {runtime.workers} workers")
+    runtime.run()
+    print(f"[RUNTIME] done; {len(runtime.queue)} intents left in the queue")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Drive buyer and provider agents end to end against the in-memory mock.
+
+Each agent runs as its own ``agent.py`` process in a private working
+directory, exactly as it would in production. Buyers are restarted for a new
+lifecycle after reaching a terminal state; providers are restarted with their
+listing kept, so they pick up the next contract or negotiation. With
+``--provider-workers`` each provider runs ``runtime.py`` instead and serves
+that many contracts at once for the whole run; with ``--buyer-workers`` each
+buyer runs ``runtime.py`` once for all of its lifecycles::
+
+    python loadgen.py --buyers 8 --providers 4 --lifecycles 3 --poll 0.2
+    python loadgen.py --buyers 8 --providers 1 --provider-workers 8
+    python loadgen.py --buyers 1 --providers 4 --lifecycles 20 --buyer-workers 8 --provider-workers 8
+
+Lifecycle times are measured from the buyer's start to contract creation and
+to ``FULFILLED``, using the timestamps the mock records.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from agent_core import codec
+from mock_server import FaultInjector, MockAgentTiki
+
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TERMINAL_STATES = {
+    "buyer": {"ACCEPTED", "FAILED"},
+    "provider": {"COMPLETED", "FAILED", "FULFILLED"},
+}
+# Provider state that survives a restart, so the listing is not re-created.
+PROVIDER_KEPT_KEYS = ("actor_id", "api_key", "provider_id", "listing_created", "listing_id")
+
+
+class AgentSlot:
+    """One agent identity and working directory, run once per lifecycle."""
+
+    def __init__(self, role, index, root, credentials, env, script="agent.py"):
+        self.role = role
+        self.script = script
+        self.name = f"{role}-{index}"
+        self.workdir = os.path.join(root, self.name)
+        self.env = env
+        self.process = None
+        # Identities live in this run's mock only, so nothing a previous run
+        # left here (state, work items, purchases.jsonl) is of any use.
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        os.makedirs(self.workdir)
+        self.write_state(dict(credentials, state="IDLE"))
+
+    @property
+    def state_path(self):
+        return os.path.join(self.workdir, "state.json")
+
+    def read_state(self):
+        try:
+            with open(self.state_path, "rb") as file_handle:
+                return codec.loads(file_handle.read())
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, state):
+        with open(self.state_path, "w", encoding="utf-8") as file_handle:
+            file_handle.write(codec.dumps_pretty(state))
+
+    def reset(self):
+        state = self.read_state()
+        if self.role == "buyer":
+            kept = {"actor_id": state.get("actor_id"), "api_key": state.get("api_key")}
+        else:
+            kept = {key: state[key] for key in PROVIDER_KEPT_KEYS if key in state}
+        self.write_state(dict(kept, state="IDLE"))
+
+    def read_purchases(self):
+        """Purchases the buyer runtime finished, from ``purchases.jsonl``."""
+        try:
+            with open(os.path.join(self.workdir, "purchases.jsonl"), "rb") as file_handle:
+                return [codec.loads(line) for line in file_handle if line.strip()]
+        except OSError:
+            return []
+
+    def run(self, stop, timeout=None, args=()):
+        """Run the agent script until it exits, ``stop`` is set or ``timeout`` passes."""
+        script = os.path.join(AGENTS_DIR, f"{self.role}_agent", self.script)
+        with open(os.path.join(self.workdir, "agent.log"), "ab") as log:
+            self.process = subprocess.Popen(
+                [sys.executable, "-u", script, *args],
+                cwd=self.workdir,
+                env=self.env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            deadline = time.monotonic() + timeout if timeout else None
+            while self.process.poll() is None:
+                if stop.is_set() or (deadline and time.monotonic() > deadline):
+                    self.process.terminate()
+                    try:
+                        self.process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        self.process.kill()
+                    return None
+                time.sleep(0.05)
+        return self.read_state()
+
+
+class LoadGenerator:
+    def __init__(
+        self,
+        mock,
+        buyers,
+        providers,
+        lifecycles,
+        poll,
+        lifecycle_timeout,
+        duration,
+        root,
+        provider_workers=0,
+        buyer_workers=0,
+    ):
+        self.mock = mock
+        self.lifecycles = lifecycles
+        self.lifecycle_timeout = lifecycle_timeout
+        self.duration = duration
+        self.records = []
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        env = dict(
+            os.environ,
+            **mock.env(),
+            BUYER_POLL_INTERVAL_SECONDS=str(poll),
+            PROVIDER_POLL_INTERVAL_SECONDS=str(poll),
+            BUYER_POLL_MAX_INTERVAL_SECONDS=str(poll * 6),
+            PROVIDER_POLL_MAX_INTERVAL_SECONDS=str(poll * 6),
+            PYTHONUNBUFFERED="1",
+        )
+        provider_script = "agent.py"
+        if provider_workers:
+            env["PROVIDER_RUNTIME_WORKERS"] = str(provider_workers)
+            provider_script = "runtime.py"
+        buyer_script = "agent.py"
+        if buyer_workers:
+            env["BUYER_RUNTIME_WORKERS"] = str(buyer_workers)
+            env["BUYER_RUNTIME_MAX_PURCHASES"] = str(buyer_workers)
+            buyer_script = "runtime.py"
+        self.buyers = [AgentSlot("buyer", index, root, self._register(), env, script=buyer_script) for index in range(buyers)]
+        self.providers = [
+            AgentSlot("provider", index, root, self._register(), env, script=provider_script) for index in range(providers)
+        ]
+
+    def _register(self):
+        with self.mock.backend.lock:
+            _, credentials = self.mock.backend.register(None, {})
+        return credentials
+
+    def run(self):
+        self.started = time.time()
+        provider_threads = [threading.Thread(target=self._provider_loop, args=(slot,), daemon=True) for slot in self.providers]
+        buyer_loop = self._buyer_runtime if self.buyers and self.buyers[0].script == "runtime.py" else self._buyer_loop
+        buyer_threads = [threading.Thread(target=buyer_loop, args=(slot,), daemon=True) for slot in self.buyers]
+        for thread in provider_threads + buyer_threads:
+            thread.start()
+        for thread in buyer_threads:
+            thread.join()
+        self.stop.set()
+        for thread in provider_threads:
+            thread.join()
+        self.finished = time.time()
+
+    def _buyer_loop(self, slot):
+        for _ in range(self.lifecycles):
+            if self._out_of_time():
+                return
+            slot.reset()
+            started = time.time()
+            state = slot.run(self.stop, timeout=self.lifecycle_timeout)
+            with self._lock:
+                self.records.append(
+                    {
+                        "buyer": slot.name,
+                        "started": started,
+                        "state": (state or {}).get("state", "TIMEOUT"),
+                        "contract_id": (state or {}).get("contract_id"),
+                    }
+                )
+
+    def _buyer_runtime(self, slot):
+        # One process runs every lifecycle; each purchase is timed from the
+        # moment the runtime started it.
+        slot.run(self.stop, timeout=self.lifecycle_timeout * self.lifecycles, args=("--count", str(self.lifecycles)))
+        purchases = slot.read_purchases()
+        with self._lock:
+            for purchase in purchases:
+                self.records.append(
+                    {
+                        "buyer": slot.name,
+                        "started": purchase.get("started_at"),
+                        "state": purchase.get("state") or "TIMEOUT",
+                        "contract_id": purchase.get("contract_id"),
+                    }
+                )
+            self.records.extend(
+                {"buyer": slot.name, "started": None, "state": "TIMEOUT", "contract_id": None}
+                for _ in range(self.lifecycles - len(purchases))
+            )
+
+    def _provider_loop(self, slot):
+        while not self.stop.is_set():
+            slot.run(self.stop)
+            slot.reset()
+
+    def _out_of_time(self):
+        return self.stop.is_set() or (self.duration and time.time() - self.started > self.duration)
+
+    def report(self):
+        contracts = self.mock.backend.contracts
+        to_contract = []
+        to_fulfilment = []
+        fulfilled_at = []
+        outcomes = {}
+        for record in self.records:
+            outcomes[record["state"]] = outcomes.get(record["state"], 0) + 1
+            contract = contracts.get(record["contract_id"])
+            if contract is None:
+                continue
+            to_contract.append(contract["created_at"] - record["started"])
+            fulfilled = contract["status_times"].get("FULFILLED")
+            if fulfilled is not None:
+                to_fulfilment.append(fulfilled - record["started"])
+                fulfilled_at.append(fulfilled)
+
+        stats = self.mock.stats()
+        requests = sum(stats["requests"].values())
+        window = (max(fulfilled_at) - self.started) if fulfilled_at else 0.0
+        return {
+            "buyers": len(self.buyers),
+            "providers": len(self.providers),
+            "lifecycles": len(self.records),
+            "outcomes": outcomes,
+            "fulfilled": len(to_fulfilment),
+            "elapsed_seconds": round(self.finished - self.started, 3),
+            "time_to_contract": summarize(to_contract),
+            "time_to_fulfilment": summarize(to_fulfilment),
+            "requests": requests,
+            "requests_per_lifecycle": round(requests / len(to_fulfilment), 1) if to_fulfilment else None,
+            "lifecycles_per_second": round(len(fulfilled_at) / window, 3) if window else 0.0,
+            "requests_by_route": dict(sorted(stats["requests"].items(), key=lambda item: -item[1])),
+            "faults": stats["faults"],
+        }
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (0 < q <= 100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": _round(percentile(values, 50)),
+        "p95": _round(percentile(values, 95)),
+        "p99": _round(percentile(values, 99)),
+        "max": _round(max(values) if values else None),
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def print_report(report):
+    print(
+        f"{report['buyers']} buyers x {report['providers']} providers: "
+        f"{report['fulfilled']}/{report['lifecycles']} lifecycles fulfilled in {report['elapsed_seconds']}s "
+        f"{report['outcomes']}"
+    )
+    for label, key in (("time to contract", "time_to_contract"), ("time to fulfilment", "time_to_fulfilment")):
+        summary = report[key]
+        print(f"  {label:<19} p50={summary['p50']}s p95={summary['p95']}s p99={summary['p99']}s max={summary['max']}s")
+    print(f"  throughput          {report['lifecycles_per_second']} lifecycles/s")
+    print(f"  requests            {report['requests']} total, {report['requests_per_lifecycle']} per fulfilled lifecycle")
+    print(f"  injected faults     {report['faults']}")
+    for route, count in list(report["requests_by_route"].items())[:10]:
+        print(f"    {count:>7}  {route}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run buyer and provider agents against the AgentTiki mock.")
+    parser.add_argument("--buyers", type=int, default=4)
+    parser.add_argument("--providers", type=int, default=2)
+    parser.add_argument("--lifecycles", type=int, default=1, help="lifecycles per buyer")
+    parser.add_argument("--duration", type=float, default=0, help="stop starting lifecycles after this many seconds")
+    parser.add_argument("--poll", type=float, default=0.2, help="agent poll interval in seconds")
+    parser.add_argument("--lifecycle-timeout", type=float, default=300)
+    parser.add_argument(
+        "--provider-workers",
+        type=int,
+        default=0,
+        help="run providers as runtime.py with this many workers (0: one contract at a time via agent.py)",
+    )
+    parser.add_argument(
+        "--buyer-workers",
+        type=int,
+        default=0,
+        help="run each buyer's lifecycles through runtime.py with this many at once (0: one agent.py run each)",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workdir", default=None, help="keep agent directories and logs here (each agent's directory is cleared first)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    faults = FaultInjector(
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    root = args.workdir or tempfile.mkdtemp(prefix="agenttiki-loadgen-")
+    try:
+        with MockAgentTiki(faults=faults, seed=args.seed) as mock:
+            generator = LoadGenerator(
+                mock,
+                buyers=args.buyers,
+                providers=args.providers,
+                lifecycles=args.lifecycles,
+                poll=args.poll,
+                lifecycle_timeout=args.lifecycle_timeout,
+                duration=args.duration,
+                root=root,
+                provider_workers=args.provider_workers,
+                buyer_workers=args.buyer_workers,
+            )
+            generator.run()
+            report = generator.report()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        print(codec.dumps_pretty(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
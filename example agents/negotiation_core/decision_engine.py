@@ -1,4 +1,4 @@
-import json
+from agent_core import codec
 
 from negotiation_core.negotiation_decision import NegotiationDecision
 from negotiation_core import llm
@@ -72,7 +72,7 @@ def parse_llm_output(text):
             raw = raw[4:]
         raw = raw.strip()
 
-    data = json.loads(raw)
+    data = codec.loads(raw)
     action = str(data.get("action", "")).upper()
     if action not in ("ACCEPT", "PROPOSE", "REJECT"):
         raise ValueError("Invalid action")
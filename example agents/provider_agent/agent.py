@@ -1,11 +1,30 @@
+import os
 import time
-from fsm import FSM, load_state, save_state
+from fsm import FSM, PURE_STATES, load_state, save_state
 import api
+import config
+from agent_core.runner import run_chain
+from agent_core.scheduler import standard_policies
 
-POLL_INTERVAL_SECONDS = 2
+POLL_INTERVAL_SECONDS = float(os.getenv("PROVIDER_POLL_INTERVAL_SECONDS", "2"))
+POLL_MAX_INTERVAL_SECONDS = float(os.getenv("PROVIDER_POLL_MAX_INTERVAL_SECONDS", str(config.POLL_MAX_INTERVAL_SECONDS)))
 TERMINAL_STATES = {"COMPLETED", "FAILED", "FULFILLED"}
 
 
+def make_scheduler():
+    return standard_policies(
+        POLL_INTERVAL_SECONDS,
+        POLL_MAX_INTERVAL_SECONDS,
+        fast_states=("HANDLE_NEGOTIATION",),
+        backoff_states=("AWAIT_INPUT", "AWAITING_INPUT", "WAITING_CONFIRM"),
+        action_states=("READY_TO_UPLOAD", "OUTPUT_UPLOADED"),
+        pure_states=PURE_STATES,
+    )
+
+
+SCHEDULER = make_scheduler()
+
+
 def ensure_auth(ctx, max_retries=3):
     actor_id = ctx.get("actor_id")
     api_key = ctx.get("api_key")
@@ -16,12 +35,13 @@ def ensure_auth(ctx, max_retries=3):
 
     print("[AUTH] No stored credentials. Registering actor...")
 
+    delays = api.retry_delays()
     for attempt in range(1, max_retries + 1):
         try:
             res = api.register_actor()
         except Exception as exc:
             print(f"[AUTH] Register attempt {attempt} failed: {exc}")
-            time.sleep(min(2 ** attempt, 10))
+            time.sleep(next(delays))
             continue
 
         actor_id = res.get("actor_id") if isinstance(res, dict) else None
@@ -37,7 +57,7 @@ def ensure_auth(ctx, max_retries=3):
             return True
 
         print(f"[AUTH] Register attempt {attempt} returned invalid payload: {res}")
-        time.sleep(min(2 ** attempt, 10))
+        time.sleep(next(delays))
 
     return False
 
@@ -71,18 +91,32 @@ def main():
             print(f"Agent finished with state: {state}\nExiting loop.")
             break
 
-        handler = FSM.get(state)
-        if not handler:
-            raise RuntimeError(f"Unknown state: {state}")
-
-        new_state = handler(ctx)
+        try:
+            path = run_chain(FSM, ctx, state, PURE_STATES)
+        except Exception as exc:
+            print(f"[ERROR] state handler failed ({state}): {exc}")
+            path = [state, "FAILED"]
+        new_state = path[-1]
+
+        backoff = api.take_backoff()
+        if backoff is not None:
+            # An open circuit answered this tick, so the state it chose is
+            # not a decision. Keep what the handlers recorded, stay put and
+            # retry once the circuit half-opens.
+            print(f"[LOOP] backend unavailable, retrying {state} in {backoff:.1f}s")
+            new_state = state
 
         if new_state != state:
-            print(f"[TRANSITION] {state} -> {new_state}")
+            for source, target in zip(path, path[1:]):
+                print(f"[TRANSITION] {source} -> {target}")
             ctx["state"] = new_state
             save_state(ctx)
 
-        time.sleep(POLL_INTERVAL_SECONDS)
+        if backoff is not None:
+            save_state(ctx)
+            time.sleep(max(backoff, 1.0))
+        else:
+            time.sleep(SCHEDULER.next_delay(ctx, state, new_state))
 
 
 if __name__ == "__main__":
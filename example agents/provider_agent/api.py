@@ -1,54 +1,46 @@
 import os
-import requests
-from config import API_BASE, PROVIDER_ID
+import sys
 
-LISTINGS_API_BASE = os.getenv(
-    "LISTINGS_API_BASE",
-    "https://6ie3irwugc.execute-api.us-east-1.amazonaws.com/prod",
-)
-CONTRACTS_API_BASE = os.getenv("CONTRACTS_API_BASE", API_BASE)
-NEGOTIATION_API_BASE = os.getenv("NEGOTIATION_API_BASE", LISTINGS_API_BASE)
-ACTORS_API_BASE = os.getenv("ACTORS_API_BASE", LISTINGS_API_BASE)
+from config import PROVIDER_ID
 
-_ACTOR_ID = None
-_API_KEY = None
+_AGENTS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _AGENTS_ROOT not in sys.path:
+    sys.path.append(_AGENTS_ROOT)
+
+from agent_core.transport import Transport, json_or_error
+
+_TRANSPORT = Transport()
 
 
 def configure_credentials(actor_id, api_key):
-    global _ACTOR_ID, _API_KEY
-    _ACTOR_ID = actor_id
-    _API_KEY = api_key
+    _TRANSPORT.configure_credentials(actor_id, api_key)
 
 
 def auth_headers():
-    if not _API_KEY:
-        raise RuntimeError("API key not set")
-    return {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {_API_KEY}",
-    }
+    return _TRANSPORT.client.auth_headers(_TRANSPORT.require_api_key())
 
 
 def _json_or_error(response):
-    try:
-        return response.json()
-    except Exception:
-        return {
-            "error": {
-                "code": "HTTP_ERROR",
-                "message": f"HTTP {response.status_code}: non-JSON response",
-            }
-        }
+    return json_or_error(response)
+
+
+def retry_delays():
+    return _TRANSPORT.client.retry_policy.delays()
+
+
+def take_backoff():
+    return _TRANSPORT.take_backoff()
 
 
 def register_actor():
-    r = requests.post(
-        f"{ACTORS_API_BASE}/actors/v1",
+    return _TRANSPORT.request(
+        "POST",
+        "ACTORS_API_BASE",
+        "/actors/v1",
+        authenticated=False,
         headers={"Content-Type": "application/json"},
         json={"action": "register"},
-        timeout=30,
     )
-    return r.json()
 
 
 def create_listing(intent, offer, trust_score=0.9):
@@ -59,120 +51,53 @@ def create_listing(intent, offer, trust_score=0.9):
         "trust_score": trust_score,
         "negotiation_supported": True,
     }
-    r = requests.post(
-        f"{LISTINGS_API_BASE}/listings/ingest/v1",
-        headers=auth_headers(),
-        json=payload,
-        timeout=30,
-    )
-    return r.json()
+    return _TRANSPORT.request("POST", "LISTINGS_API_BASE", "/listings/ingest/v1", json=payload)
 
 
 def get_contract(contract_id):
-    r = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return r.json()
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}", cache=True)
 
 
 def discover_contracts(status="ACTIVE"):
-    response = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/provider?status={status}",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return _json_or_error(response)
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/provider?status={status}")
 
 
 def discover_open_negotiations():
-    response = requests.get(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/provider-OPEN",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.get(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/provider-OPEN",
-            headers=auth_headers(),
-            timeout=30,
-        )
-    return _json_or_error(response)
-
-
-def accept_negotiation(negotiation_id):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/accept",
-        headers=auth_headers(),
+    return _TRANSPORT.negotiation("GET", "/provider-OPEN")
+
+
+def accept_negotiation(negotiation_id, idempotency_key=None):
+    return _TRANSPORT.negotiation(
+        "POST",
+        f"/{negotiation_id}/accept",
         json={"version": "v2"},
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/accept",
-            headers=auth_headers(),
-            json={"version": "v2"},
-            timeout=30,
-        )
-    return _json_or_error(response)
-
-
-def propose_negotiation(negotiation_id, proposal):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/propose",
-        headers=auth_headers(),
+
+
+def propose_negotiation(negotiation_id, proposal, idempotency_key=None):
+    return _TRANSPORT.negotiation(
+        "POST",
+        f"/{negotiation_id}/propose",
         json={"version": "v2", "proposal": proposal},
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/propose",
-            headers=auth_headers(),
-            json={"version": "v2", "proposal": proposal},
-            timeout=30,
-        )
-    return _json_or_error(response)
 
 
 def get_negotiation(negotiation_id):
-    response = requests.get(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.get(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}",
-            headers=auth_headers(),
-            timeout=30,
-        )
-    return _json_or_error(response)
+    return _TRANSPORT.negotiation("GET", f"/{negotiation_id}", cache=True)
 
 
 def reject_negotiation(negotiation_id):
-    response = requests.post(
-        f"{NEGOTIATION_API_BASE}/negotiate/v2/{negotiation_id}/reject",
-        headers=auth_headers(),
-        json={"version": "v2"},
-        timeout=30,
-    )
-    if response.status_code == 404:
-        response = requests.post(
-            f"{NEGOTIATION_API_BASE}/negotiations/v2/{negotiation_id}/reject",
-            headers=auth_headers(),
-            json={"version": "v2"},
-            timeout=30,
-        )
-    return _json_or_error(response)
+    return _TRANSPORT.negotiation("POST", f"/{negotiation_id}/reject", json={"version": "v2"})
 
 
-def accept(negotiation_id):
-    return accept_negotiation(negotiation_id)
+def accept(negotiation_id, idempotency_key=None):
+    return accept_negotiation(negotiation_id, idempotency_key=idempotency_key)
 
 
-def propose(negotiation_id, proposal):
-    return propose_negotiation(negotiation_id, proposal)
+def propose(negotiation_id, proposal, idempotency_key=None):
+    return propose_negotiation(negotiation_id, proposal, idempotency_key=idempotency_key)
 
 
 def reject(negotiation_id):
@@ -180,39 +105,38 @@ def reject(negotiation_id):
 
 
 def get_latest_delivery(contract_id):
-    r = requests.get(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/latest",
-        headers=auth_headers(),
-        timeout=30,
-    )
-    return r.json()
+    return _TRANSPORT.request("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}/delivery/latest", cache=True)
 
 
-def request_upload(contract_id, files, delivery_type="OUTPUT"):
-    r = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/upload-intent",
-        headers=auth_headers(),
+def request_upload(contract_id, files, delivery_type="OUTPUT", idempotency_key=None):
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/upload-intent",
         json={"files": files, "delivery_type": delivery_type},
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    return r.json()
 
 
 def confirm_upload(contract_id, files, delivery_type="OUTPUT"):
-    r = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/{contract_id}/delivery/confirm",
-        headers=auth_headers(),
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/confirm",
         json={"files": files, "delivery_type": delivery_type},
-        timeout=30,
     )
-    return r.json()
 
 
-def transition(contract_id, to_status):
-    return transition_contract(contract_id, to_status, actor_id=_ACTOR_ID or PROVIDER_ID)
+def transition(contract_id, to_status, idempotency_key=None):
+    return transition_contract(
+        contract_id,
+        to_status,
+        actor_id=_TRANSPORT.actor_id or PROVIDER_ID,
+        idempotency_key=idempotency_key,
+    )
 
 
-def transition_contract(contract_id, to_status, actor_id=None):
+def transition_contract(contract_id, to_status, actor_id=None, idempotency_key=None):
     body = {
         "version": "v1",
         "action": "transition",
@@ -222,19 +146,23 @@ def transition_contract(contract_id, to_status, actor_id=None):
     if actor_id:
         body["actor_id"] = actor_id
 
-    r = requests.post(
-        f"{CONTRACTS_API_BASE}/contracts/v1/transition",
-        headers=auth_headers(),
+    return _TRANSPORT.request(
+        "POST",
+        "CONTRACTS_API_BASE",
+        "/contracts/v1/transition",
         json=body,
-        timeout=30,
+        idempotency_key=idempotency_key,
     )
-    return r.json()
 
 
-def upload_output(contract_id, files, actor_id=None):
+def upload_output(contract_id, files, actor_id=None, idempotency_key=None):
     del actor_id
-    return request_upload(contract_id, files, delivery_type="OUTPUT")
+    return request_upload(contract_id, files, delivery_type="OUTPUT", idempotency_key=idempotency_key)
 
 
 def confirm_output(contract_id, files):
     return confirm_upload(contract_id, files, delivery_type="OUTPUT")
+
+
+def upload_to_presigned(manifest, presigned_files, contract_id=None):
+    return _TRANSPORT.upload(manifest, presigned_files, contract_id=contract_id)
@@ -1,4 +1,5 @@
 API_BASE = "https://hwvxmctc7b.execute-api.us-east-1.amazonaws.com/prod"
 PROVIDER_ID = "Daniel-Friedman"
 
-POLL_INTERVAL_SECONDS = 20
+# Cap for the exponential poll backoff while waiting on the buyer.
+POLL_MAX_INTERVAL_SECONDS = 20
@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 
@@ -8,6 +7,9 @@ _AGENTS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if _AGENTS_ROOT not in sys.path:
     sys.path.append(_AGENTS_ROOT)
 
+from agent_core import codec, delivery_pipeline, hashing
+from agent_core.actions import idempotent_call
+from agent_core.polling import stay, unchanged_since_stay
 from negotiation_core.decision_engine import decision_engine
 
 
@@ -40,32 +42,38 @@ def idle(ctx):
         print(f"[PROVIDER] found negotiation {ctx['negotiation_id']}")
         return "HANDLE_NEGOTIATION"
 
-    if not ctx.get("listing_created"):
-        res = api.create_listing(
-            intent={
-                "service": "translation",
-                "from": "en",
-                "to": "de",
-            },
-            offer={
-                "price": 1000,
-                "currency": "EUR",
-                "delivery_days": 3,
-            },
-            trust_score=0.9,
-        )
-        if "error" in res:
-            print(f"[PROVIDER] listing create error: {res}")
-            return "IDLE"
+    ensure_listing(ctx)
+    return "IDLE"
 
-        ctx["listing_created"] = True
-        if isinstance(res, dict) and res.get("listing_id"):
-            ctx["listing_id"] = res.get("listing_id")
-        save_state(ctx)
-        print(f"[PROVIDER] listing created: {ctx.get('listing_id')}")
-        return "IDLE"
 
-    return "IDLE"
+def ensure_listing(ctx):
+    """Create the provider's listing once; ``True`` when it exists."""
+    if ctx.get("listing_created"):
+        return True
+
+    res = api.create_listing(
+        intent={
+            "service": "translation",
+            "from": "en",
+            "to": "de",
+        },
+        offer={
+            "price": 1000,
+            "currency": "EUR",
+            "delivery_days": 3,
+        },
+        trust_score=0.9,
+    )
+    if "error" in res:
+        print(f"[PROVIDER] listing create error: {res}")
+        return False
+
+    ctx["listing_created"] = True
+    if isinstance(res, dict) and res.get("listing_id"):
+        ctx["listing_id"] = res.get("listing_id")
+    save_state(ctx)
+    print(f"[PROVIDER] listing created: {ctx.get('listing_id')}")
+    return True
 
 
 def handle_negotiation(ctx):
@@ -116,7 +124,13 @@ def handle_negotiation(ctx):
     decision = decision_engine(ctx, role="PROVIDER")
 
     if decision.action == "ACCEPT":
-        response = api.accept(negotiation_id)
+        response = idempotent_call(
+            ctx,
+            negotiation_id,
+            "accept",
+            lambda key: api.accept(negotiation_id, idempotency_key=key),
+            save_state,
+        )
         if "error" in response:
             print(f"[PROVIDER] accept error: {response}")
             return "IDLE"
@@ -135,7 +149,13 @@ def handle_negotiation(ctx):
             "currency": last_offer.get("currency", "EUR"),
             "scope": last_offer.get("scope", "full_document"),
         }
-        response = api.propose(negotiation_id, proposal)
+        response = idempotent_call(
+            ctx,
+            negotiation_id,
+            f"propose:{round_no}",
+            lambda key: api.propose(negotiation_id, proposal, idempotency_key=key),
+            save_state,
+        )
         if "error" in response:
             print(f"[PROVIDER] propose error: {response}")
             return "IDLE"
@@ -163,13 +183,15 @@ def awaiting_input(ctx):
     if "error" in res:
         print(res)
         return "AWAITING_INPUT"
+    if unchanged_since_stay(ctx, "AWAITING_INPUT", res):
+        return "AWAITING_INPUT"
 
     if res.get("delivery_type") == "INPUT":
         ctx["input_snapshot_id"] = res.get("snapshot_id")
         ctx["input_files"] = res.get("files")
         return "INPUT_DOWNLOADED"
 
-    return "AWAITING_INPUT"
+    return stay(ctx, "AWAITING_INPUT", res)
 
 
 def await_input(ctx):
@@ -198,7 +220,13 @@ def ready_to_upload(ctx):
 def output_uploaded(ctx):
     contract_id = ctx.get("contract_id")
 
-    response = api.transition_contract(contract_id, "SHIPPED")
+    response = idempotent_call(
+        ctx,
+        contract_id,
+        "transition:SHIPPED",
+        lambda key: api.transition_contract(contract_id, "SHIPPED", idempotency_key=key),
+        save_state,
+    )
     if "error" in response:
         print(f"[PROVIDER][OUTPUT_UPLOADED] transition error: {response}")
         return "FAILED"
@@ -214,6 +242,8 @@ def waiting_confirm(ctx):
     if "error" in contract:
         print(f"[PROVIDER][WAITING_CONFIRM] error: {contract}")
         return "WAITING_CONFIRM"
+    if unchanged_since_stay(ctx, "WAITING_CONFIRM", contract):
+        return "WAITING_CONFIRM"
 
     status = contract.get("status")
 
@@ -223,7 +253,7 @@ def waiting_confirm(ctx):
     if status == "BREACHED":
         return "FAILED"
 
-    return "WAITING_CONFIRM"
+    return stay(ctx, "WAITING_CONFIRM", contract)
 
 
 def completed(ctx):
@@ -241,46 +271,53 @@ def ready_to_upload_output(ctx):
     Prepare provider OUTPUT based on buyer INPUT metadata.
     Generate output file(s), upload intent, then PUT to S3.
     """
-    import hashlib
-    import requests
-
     contract_id = ctx["contract_id"]
 
-    os.makedirs("output", exist_ok=True)
-    output_file_path = "output/result.txt"
-    with open(output_file_path, "w") as f:
-        f.write(f"Processed input snapshot {ctx.get('input_snapshot_id')}")
-
-    with open(output_file_path, "rb") as f:
-        sha256 = hashlib.sha256(f.read()).hexdigest()
-
-    res = api.upload_output(contract_id, [
-        {"path": "output/result.txt", "sha256": sha256}
-    ])
+    # One directory per contract, so concurrent contracts never share a file.
+    output_file_path = os.path.join("output", contract_id, "result.txt")
+    with hashing.HashingWriter.open(output_file_path) as writer:
+        writer.write(f"Processed input snapshot {ctx.get('input_snapshot_id')}")
+    sha256 = writer.hexdigest()
+
+    manifest = [{"path": "output/result.txt", "local_path": output_file_path, "sha256": sha256, "size": writer.size}]
+    manifest = delivery_pipeline.compress_manifest(manifest)
+    files = delivery_pipeline.intent_files(manifest)
+    res = idempotent_call(
+        ctx,
+        contract_id,
+        "upload-intent:OUTPUT",
+        lambda key: api.upload_output(contract_id, files, idempotency_key=key),
+        save_state,
+    )
 
     if "error" in res:
         print(res)
         return "READY_TO_UPLOAD"
 
-    for file_meta in res.get("files", []):
-        with open(output_file_path, "rb") as f:
-            upload_res = requests.put(file_meta["upload_url"], data=f)
-            if upload_res.status_code not in (200, 201, 204):
-                print({"error": "upload_failed", "status_code": upload_res.status_code})
-                return "READY_TO_UPLOAD"
+    # Each presigned entry is matched to its own manifest file by path.
+    uploaded = api.upload_to_presigned(manifest, res.get("files", []), contract_id=contract_id)
+    delivery_pipeline.remove_compressed(manifest)
+    if "error" in uploaded:
+        print(uploaded)
+        return "READY_TO_UPLOAD"
+    uploaded_files = uploaded["files"]
 
-    confirm_res = api.confirm_output(contract_id, res.get("files", []))
+    confirm_res = api.confirm_output(contract_id, uploaded_files)
     if "error" in confirm_res:
         print(confirm_res)
         return "READY_TO_UPLOAD"
 
-    if res.get("files"):
-        ctx["output_snapshot_id"] = res["files"][0].get("snapshot_id")
-        ctx["output_files"] = res["files"]
+    if uploaded_files:
+        ctx["output_snapshot_id"] = uploaded_files[0].get("snapshot_id")
+        ctx["output_files"] = uploaded_files
 
     return "OUTPUT_UPLOADED"
 
 
+# States that only route to another state; agent_core.runner runs them in the
+# same tick as the handler that entered them.
+PURE_STATES = frozenset({"INPUT_DOWNLOADED"})
+
 FSM = {
     "IDLE": idle,
     "HANDLE_NEGOTIATION": handle_negotiation,
@@ -304,13 +341,14 @@ def load_state():
     """
     if not os.path.exists(STATE_FILE):
         return {}
-    with open(STATE_FILE, "r") as f:
-        return json.load(f)
+    with open(STATE_FILE, "rb") as f:
+        return codec.loads(f.read())
 
 
 def save_state(ctx):
     """
-    Save the agent state to state.json
+    Save the agent state to state.json, or to ctx["state_file"] when the
+    runtime gave this contract its own file
     """
-    with open(STATE_FILE, "w") as f:
-        json.dump(ctx, f, indent=2)
+    with open(ctx.get("state_file", STATE_FILE), "w", encoding="utf-8") as f:
+        f.write(codec.dumps_pretty(ctx))
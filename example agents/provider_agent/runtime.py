@@ -0,0 +1,123 @@
+"""Serve many negotiations and contracts from one provider process.
+
+``agent.py`` follows one contract from discovery to ``COMPLETED`` before it
+looks for the next. This runtime keeps an FSM context per discovered
+negotiation and contract instead, each with its own state file under
+``work/`` and its own poll schedule, and advances the ones that are due on a
+bounded thread pool while discovery keeps adding new work::
+
+    PROVIDER_RUNTIME_WORKERS=8 python runtime.py
+
+The handlers are the ones ``agent.py`` runs. A negotiation that falls back
+to ``IDLE`` (not our turn, or proposed and waiting) is dropped and picked up
+again by the next discovery. One that is accepted carries on as its
+contract's item, ``contract-<id>``, and discovery leaves a contract alone
+while the negotiation that produced it is still an item. A contract that
+reaches a terminal state is remembered so discovery does not start it
+twice.
+"""
+
+import os
+
+import api
+from agent import POLL_INTERVAL_SECONDS, TERMINAL_STATES, ensure_auth, make_scheduler
+from agent_core.work_pool import WorkPool
+from fsm import FSM, PURE_STATES, ensure_listing, load_state, save_state
+
+DEFAULT_WORKERS = int(os.getenv("PROVIDER_RUNTIME_WORKERS", "4"))
+WORK_DIR = "work"
+# Finished contract ids kept in state.json so discovery skips them.
+MAX_FINISHED = 1000
+
+
+class ProviderRuntime(WorkPool):
+    FSM = FSM
+    PURE_STATES = PURE_STATES
+    TERMINAL_STATES = TERMINAL_STATES
+    SHARED_KEYS = ("actor_id", "api_key", "provider_id")
+
+    def __init__(self, ctx, workers=DEFAULT_WORKERS, work_dir=WORK_DIR, discovery_interval=POLL_INTERVAL_SECONDS):
+        self.finished_contracts = list(ctx.get("finished_contracts") or [])
+        super().__init__(ctx, workers, work_dir, discovery_interval, make_scheduler, save_state, api.take_backoff)
+
+    def stops(self, item):
+        return item.ctx.get("state") in TERMINAL_STATES or item.ctx.get("state") == "IDLE"
+
+    def settle(self, item, path, backoff):
+        super().settle(item, path, backoff)
+        # The tick is over, so the dispatcher may read item.ctx here.
+        contract_id = item.ctx.get("contract_id")
+        if contract_id and item.key.startswith("negotiation-") and self.items.get(item.key) is item:
+            key = f"contract-{contract_id}"
+            if key in self.items:
+                print(f"[RUNTIME] {item.key} produced {contract_id}, which is already served")
+                super().retire(item)
+            else:
+                self.rename(item, key)
+
+    def retire(self, item):
+        super().retire(item)
+        contract_id = item.ctx.get("contract_id")
+        if contract_id and item.ctx.get("state") in TERMINAL_STATES:
+            self.finished_contracts = (self.finished_contracts + [contract_id])[-MAX_FINISHED:]
+            self.ctx["finished_contracts"] = self.finished_contracts
+            save_state(self.ctx)
+
+    def refill(self):
+        if not ensure_listing(self.ctx):
+            return
+
+        # Items are keyed by what they serve and only added, renamed and
+        # retired on this thread, so the checks below never read the ctx
+        # of an item a worker may be running.
+        contracts = api.discover_contracts(status="ACTIVE")
+        if "error" in contracts:
+            print(f"[RUNTIME] contract discovery error: {contracts}")
+        else:
+            finished = set(self.finished_contracts)
+            for contract in contracts.get("contracts") or []:
+                contract_id = contract.get("contract_id")
+                if not contract_id or contract_id in finished or f"contract-{contract_id}" in self.items:
+                    continue
+                # Its negotiation item accepted it and will carry it on.
+                if f"negotiation-{contract.get('negotiation_id')}" in self.items:
+                    continue
+                self.add(f"contract-{contract_id}", state="AWAITING_INPUT", contract_id=contract_id)
+
+        discovery = api.discover_open_negotiations()
+        if "error" in discovery:
+            print(f"[RUNTIME] discovery error: {discovery}")
+            return
+        for negotiation in discovery.get("negotiations") or []:
+            negotiation_id = negotiation.get("negotiation_id")
+            status = negotiation.get("status")
+            next_actor = negotiation.get("next_actor_id")
+            if not negotiation_id or (status and status != "OPEN") or f"negotiation-{negotiation_id}" in self.items:
+                continue
+            # Negotiations waiting on the buyer are skipped until it is our turn.
+            if next_actor and next_actor != self.ctx.get("actor_id"):
+                continue
+            self.add(
+                f"negotiation-{negotiation_id}",
+                state="HANDLE_NEGOTIATION",
+                negotiation_id=negotiation_id,
+                offer=negotiation.get("offer"),
+            )
+
+
+def main():
+    ctx = load_state()
+    ctx.setdefault("state", "IDLE")
+
+    if not ensure_auth(ctx):
+        print("[AUTH] Unable to authenticate provider agent. Exiting.")
+        return
+
+    save_state(ctx)
+    runtime = ProviderRuntime(ctx)
+    print(f"[RUNTIME] serving with {runtime.workers} workers")
+    runtime.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+AGENTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
+
+import agent_core  # noqa: E402,F401  puts starter-kit/tools on sys.path
+from agenttiki_client import close_clients  # noqa: E402
+from mock_server import MockAgentTiki  # noqa: E402
+
+# Top-level module names both agents use for their own files.
+AGENT_MODULES = ("agent", "api", "config", "fsm", "llm", "runtime")
+
+
+@pytest.fixture
+def mock():
+    with MockAgentTiki(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def agent_env(mock, monkeypatch, tmp_path):
+    """Points the agents' pooled client at the mock and runs in ``tmp_path``."""
+    for name, value in mock.env().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.chdir(tmp_path)
+    yield
+    close_clients()
+
+
+@pytest.fixture
+def load_runtime(agent_env, monkeypatch):
+    """``load_runtime("provider_agent")`` imports that agent's ``runtime.py``.
+
+    The buyer and provider share module names, so each test gets a fresh
+    import and the modules are dropped again afterwards.
+    """
+
+    def load(agent):
+        monkeypatch.syspath_prepend(os.path.join(AGENTS_DIR, agent))
+        for name in AGENT_MODULES:
+            sys.modules.pop(name, None)
+        return importlib.import_module("runtime")
+
+    yield load
+    for name in AGENT_MODULES:
+        sys.modules.pop(name, None)
@@ -0,0 +1,41 @@
+import pytest
+
+from loadgen import LoadGenerator
+from mock_server import FaultInjector, MockAgentTiki
+
+# Failures land on reads, downloads and discovery, which the agents retry;
+# the latency widens the races between buyer and provider.
+FAULTS = dict(latency=0.002, jitter=0.01, error_rate=0.1, throttle_rate=0.1, retry_after=0, seed=7)
+FAULT_PATHS = r"^/blobs/|-OPEN$|/balance$|^/contracts/v1/(buyer|provider)$"
+
+
+@pytest.mark.parametrize(
+    "buyer_workers, provider_workers",
+    [(0, 0), (3, 3)],
+    ids=["agents", "runtimes"],
+)
+def test_lifecycles_complete_under_faults(tmp_path, buyer_workers, provider_workers):
+    faults = FaultInjector(paths=FAULT_PATHS, **FAULTS)
+    with MockAgentTiki(faults=faults, seed=7) as mock:
+        generator = LoadGenerator(
+            mock,
+            buyers=2,
+            providers=2,
+            lifecycles=3,
+            poll=0.05,
+            lifecycle_timeout=60,
+            duration=0,
+            root=str(tmp_path),
+            provider_workers=provider_workers,
+            buyer_workers=buyer_workers,
+        )
+        generator.run()
+        report = generator.report()
+        contracts = list(mock.backend.contracts.values())
+
+    assert report["outcomes"] == {"ACCEPTED": 6}
+    assert report["fulfilled"] == 6
+    assert sum(report["faults"].values()) > 0
+    # One contract per purchase, each settled exactly once.
+    assert len(contracts) == 6
+    assert all(contract["status"] == "FULFILLED" for contract in contracts)
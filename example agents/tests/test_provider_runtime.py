@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def provider(mock, load_runtime, tmp_path):
+    runtime_module = load_runtime("provider_agent")
+    with mock.backend.lock:
+        _, credentials = mock.backend.register(None, {})
+    runtime_module.api.configure_credentials(credentials["actor_id"], credentials["api_key"])
+    ctx = dict(credentials, provider_id=credentials["actor_id"], state="IDLE")
+    runtime = runtime_module.ProviderRuntime(ctx, workers=2, work_dir=str(tmp_path / "work"), discovery_interval=0.1)
+    # Creates the listing.
+    runtime.refill()
+    return runtime
+
+
+def open_negotiation(mock, provider_id):
+    backend = mock.backend
+    with backend.lock:
+        _, buyer = backend.register(None, {})
+        listing_id = next(listing["listing_id"] for listing in backend.listings.values() if listing["provider_id"] == provider_id)
+        _, negotiation = backend.create_negotiation(backend.actors[buyer["actor_id"]], {"listing_id": listing_id, "proposal": {"price": 1000}})
+    return negotiation["negotiation_id"]
+
+
+def accept(mock, provider_id, negotiation_id):
+    with mock.backend.lock:
+        _, negotiation = mock.backend.accept(mock.backend.actors[provider_id], {}, negotiation_id)
+    return negotiation["contract_id"]
+
+
+def work_files(runtime):
+    return sorted(name for name in os.listdir(runtime.work_dir) if name.endswith(".json"))
+
+
+def test_contract_accepted_mid_tick_is_claimed_once(mock, provider):
+    provider_id = provider.ctx["actor_id"]
+    negotiation_id = open_negotiation(mock, provider_id)
+    provider.refill()
+    item = provider.items[f"negotiation-{negotiation_id}"]
+
+    # A worker accepts while its item is still running; discovery now
+    # lists the contract but must leave it to that item.
+    contract_id = accept(mock, provider_id, negotiation_id)
+    item.ctx["contract_id"] = contract_id
+    provider.refill()
+    assert list(provider.items) == [f"negotiation-{negotiation_id}"]
+
+    provider.settle(item, ["HANDLE_NEGOTIATION", "AWAIT_INPUT"], None)
+    provider.refill()
+
+    assert list(provider.items) == [f"contract-{contract_id}"]
+    assert provider.items[f"contract-{contract_id}"] is item
+    assert item.ctx["state"] == "AWAIT_INPUT"
+    assert work_files(provider) == [f"contract-{contract_id}.json"]
+
+
+def test_negotiation_for_a_served_contract_is_dropped(mock, provider):
+    provider_id = provider.ctx["actor_id"]
+    negotiation_id = open_negotiation(mock, provider_id)
+    provider.refill()
+    item = provider.items[f"negotiation-{negotiation_id}"]
+    contract_id = accept(mock, provider_id, negotiation_id)
+    served = provider.add(f"contract-{contract_id}", state="AWAITING_INPUT", contract_id=contract_id)
+
+    item.ctx["contract_id"] = contract_id
+    provider.settle(item, ["HANDLE_NEGOTIATION", "AWAIT_INPUT"], None)
+
+    assert provider.items == {f"contract-{contract_id}": served}
+    assert work_files(provider) == [f"contract-{contract_id}.json"]
+
+
+def test_finished_contracts_are_not_rediscovered(mock, provider):
+    provider_id = provider.ctx["actor_id"]
+    negotiation_id = open_negotiation(mock, provider_id)
+    contract_id = accept(mock, provider_id, negotiation_id)
+    provider.refill()
+    item = provider.items[f"contract-{contract_id}"]
+
+    provider.settle(item, ["AWAITING_INPUT", "FAILED"], None)
+    provider.refill()
+
+    # The contract is still ACTIVE on the backend.
+    assert provider.items == {}
+    assert provider.ctx["finished_contracts"] == [contract_id]
+    assert work_files(provider) == []
+
+
+def test_backoff_keeps_the_item_in_its_state(mock, provider):
+    negotiation_id = open_negotiation(mock, provider.ctx["actor_id"])
+    provider.refill()
+    item = provider.items[f"negotiation-{negotiation_id}"]
+
+    provider.settle(item, ["HANDLE_NEGOTIATION", "IDLE"], 2.0)
+
+    assert provider.items == {f"negotiation-{negotiation_id}": item}
+    assert item.ctx["state"] == "HANDLE_NEGOTIATION"
+    assert item.due == provider.paused_until > 0
@@ -0,0 +1,50 @@
+import pytest
+
+from agent_core.runner import run_chain
+
+
+def machine(transitions, ran=None):
+    """FSM whose handler for ``state`` returns ``transitions[state]``."""
+
+    def handler(state):
+        def run(ctx):
+            if ran is not None:
+                ran.append(state)
+            return transitions[state]
+
+        return run
+
+    return {state: handler(state) for state in transitions}
+
+
+def test_pure_states_run_in_the_same_tick():
+    ran = []
+    fsm = machine({"START": "ROUTE", "ROUTE": "WAIT", "WAIT": "WAIT"}, ran)
+
+    path = run_chain(fsm, {}, "START", pure_states={"ROUTE"})
+
+    # WAIT is not pure, so its handler is left for the next tick.
+    assert path == ["START", "ROUTE", "WAIT"]
+    assert ran == ["START", "ROUTE"]
+
+
+def test_staying_put_ends_the_chain():
+    assert run_chain(machine({"WAIT": "WAIT"}), {}, "WAIT", pure_states={"WAIT"}) == ["WAIT"]
+
+
+def test_chain_may_return_to_an_impure_state():
+    fsm = machine({"POLL": "ROUTE", "ROUTE": "POLL"})
+
+    assert run_chain(fsm, {}, "POLL", pure_states={"ROUTE"}) == ["POLL", "ROUTE", "POLL"]
+
+
+def test_pure_state_loop_raises():
+    fsm = machine({"START": "LEFT", "LEFT": "RIGHT", "RIGHT": "LEFT"})
+
+    with pytest.raises(RuntimeError, match="pure state loop: START -> LEFT -> RIGHT -> LEFT"):
+        run_chain(fsm, {}, "START", pure_states={"LEFT", "RIGHT"})
+
+
+def test_unknown_state_raises():
+    with pytest.raises(RuntimeError, match="Unknown state: NOWHERE"):
+        run_chain(machine({"START": "NOWHERE"}), {}, "START", pure_states={"NOWHERE"})
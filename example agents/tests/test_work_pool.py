@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+from agent_core import codec
+from agent_core.scheduler import PollPolicy, PollScheduler
+from agent_core.work_pool import WorkPool
+
+
+def save_state(ctx):
+    with open(ctx["state_file"], "w", encoding="utf-8") as file_handle:
+        file_handle.write(codec.dumps(ctx))
+
+
+def make_scheduler():
+    return PollScheduler({}, PollPolicy(0.0))
+
+
+class CountingPool(WorkPool):
+    """Items count to ``ctx["target"]`` one tick at a time, then finish."""
+
+    TERMINAL_STATES = frozenset({"DONE", "FAILED"})
+
+    def __init__(self, work_dir, workers=4, take_backoff=None, tick_seconds=0.0):
+        self.tick_seconds = tick_seconds
+        self.running = set()
+        self.double_claims = []
+        self.finished_items = []
+        self._running_lock = threading.Lock()
+        self.FSM = {"COUNT": self.count, "BROKEN": self.broken}
+        super().__init__({"actor_id": "act_1", "api_key": "key_1"}, workers, work_dir, 60, make_scheduler, save_state, take_backoff)
+
+    def count(self, ctx):
+        key = ctx["name"]
+        with self._running_lock:
+            if key in self.running:
+                self.double_claims.append(key)
+            self.running.add(key)
+        try:
+            time.sleep(self.tick_seconds)
+            ctx["count"] = ctx.get("count", 0) + 1
+            return "DONE" if ctx["count"] >= ctx["target"] else "COUNT"
+        finally:
+            with self._running_lock:
+                self.running.discard(key)
+
+    def broken(self, ctx):
+        raise ValueError("handler bug")
+
+    def retire(self, item):
+        self.finished_items.append((item.key, item.ctx["state"], item.ctx.get("count")))
+        super().retire(item)
+
+    def finished(self):
+        return not self.items
+
+
+def run_until_finished(pool, timeout=10):
+    stop = threading.Event()
+    runner = threading.Thread(target=pool.run, args=(stop,), daemon=True)
+    runner.start()
+    runner.join(timeout)
+    stop.set()
+    runner.join(1)
+    assert not runner.is_alive()
+
+
+def test_every_item_runs_to_completion_claimed_by_one_worker_at_a_time(tmp_path):
+    pool = CountingPool(str(tmp_path), workers=4, tick_seconds=0.005)
+    for index in range(12):
+        pool.add(f"item-{index}", state="COUNT", name=f"item-{index}", target=5)
+
+    run_until_finished(pool)
+
+    assert pool.double_claims == []
+    assert sorted(pool.finished_items) == sorted((f"item-{index}", "DONE", 5) for index in range(12))
+    assert os.listdir(tmp_path) == []
+
+
+def test_items_resume_from_the_work_dir(tmp_path):
+    save_state({"state": "COUNT", "name": "saved", "target": 3, "count": 2, "state_file": str(tmp_path / "saved.json")})
+    (tmp_path / "broken.json").write_text("{not json")
+
+    pool = CountingPool(str(tmp_path))
+
+    assert list(pool.items) == ["saved"]
+    assert pool.items["saved"].ctx["api_key"] == "key_1"
+    run_until_finished(pool)
+    assert pool.finished_items == [("saved", "DONE", 3)]
+
+
+def test_settle_saves_new_states_and_rename_moves_the_file(tmp_path):
+    pool = CountingPool(str(tmp_path))
+    item = pool.add("first", state="COUNT", name="first", target=9)
+
+    pool.settle(item, *pool.tick(item))
+    pool.rename(item, "second")
+
+    assert list(pool.items) == ["second"]
+    assert os.listdir(tmp_path) == ["second.json"]
+    with open(tmp_path / "second.json", "rb") as file_handle:
+        assert codec.loads(file_handle.read())["state"] == "COUNT"
+
+
+def test_failing_handler_fails_only_its_item(tmp_path):
+    pool = CountingPool(str(tmp_path))
+    pool.add("bad", state="BROKEN", name="bad")
+    pool.add("good", state="COUNT", name="good", target=2)
+
+    run_until_finished(pool)
+
+    assert sorted(pool.finished_items) == [("bad", "FAILED", None), ("good", "DONE", 2)]
+
+
+def test_backoff_pauses_dispatch_and_keeps_the_state(tmp_path):
+    backoffs = [None, 1.5]
+    pool = CountingPool(str(tmp_path), take_backoff=lambda: backoffs.pop(0) if backoffs else None)
+    item = pool.add("item", state="COUNT", name="item", target=1)
+
+    path, backoff = pool.tick(item)
+    pool.settle(item, path, backoff)
+
+    # The tick reached DONE, but an open circuit means it decided nothing.
+    assert (path, backoff) == (["COUNT", "DONE"], 1.5)
+    assert item.ctx["state"] == "COUNT"
+    assert list(pool.items) == ["item"]
+    assert item.due == pool.paused_until >= time.monotonic() + 1.0
@@ -1,4 +1,3 @@
-import json
 import sys
 from pathlib import Path
 
@@ -8,6 +7,7 @@ if str(TOOLS_DIR) not in sys.path:
 
 from agenttiki_client import get_client
 from auth import load_credentials, register_actor, save_credentials
+from codec import dumps_pretty
 from contracts import get_contract, transition_contract
 from credits import create_topup_session, get_balance
 from deliveries import confirm_delivery, create_upload_intent, put_file_to_presigned_url
@@ -52,7 +52,7 @@ def ensure_balance(api_key, needed_credits):
     page = get_client().bases["PAYMENTS_PAGE_BASE"]
     print("Low balance. Complete a top-up before retrying.")
     print(f"Top-up page: {page}?credits_amount={needed_credits}")
-    print(f"Top-up session: {json.dumps(topup, indent=2)}")
+    print(f"Top-up session: {dumps_pretty(topup)}")
     return False
 
 
@@ -62,7 +62,7 @@ def upload_input(api_key, contract_id):
         "required_format": "json",
         "scope": "full_site_data",
     }
-    encoded = json.dumps(payload, indent=2).encode("utf-8")
+    encoded = dumps_pretty(payload).encode("utf-8")
     files = [{"path": "input/request.json", "content_type": "application/json", "size_bytes": len(encoded)}]
     intent = create_upload_intent(api_key, contract_id, "INPUT", files)
     upload = (intent.get("files") or [{}])[0]
@@ -86,7 +86,7 @@ def main():
     negotiation = create_negotiation(api_key, matches["intent_hash"], match["listing_id"], INITIAL_PROPOSAL)
     negotiation_id = negotiation.get("negotiation_id")
     if not negotiation_id:
-        print(json.dumps(negotiation, indent=2))
+        print(dumps_pretty(negotiation))
         return
 
     state = get_negotiation(api_key, negotiation_id)
@@ -104,11 +104,11 @@ def main():
 
     contract_id = accepted.get("contract_id") or state.get("contract_id")
     if not contract_id:
-        print(json.dumps(accepted or state, indent=2))
+        print(dumps_pretty(accepted or state))
         return
 
     contract = get_contract(api_key, contract_id)
-    print(json.dumps(contract, indent=2))
+    print(dumps_pretty(contract))
     if contract.get("status") == "ACTIVE":
         upload_input(api_key, contract_id)
 
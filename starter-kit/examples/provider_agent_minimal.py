@@ -1,4 +1,3 @@
-import json
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
@@ -8,6 +7,7 @@ if str(TOOLS_DIR) not in sys.path:
     sys.path.insert(0, str(TOOLS_DIR))
 
 from auth import load_credentials, register_actor, save_credentials
+from codec import dumps_pretty
 from contracts import get_contract, list_provider_active_contracts, transition_contract
 from deliveries import confirm_delivery, create_upload_intent, put_file_to_presigned_url
 from listings import create_listing_v2
@@ -50,12 +50,12 @@ def generated_output():
         },
     }
     print("Generated deterministic JSON dataset for www.example.com")
-    return json.dumps(payload, indent=2).encode("utf-8")
+    return dumps_pretty(payload).encode("utf-8")
 
 
 def publish_listing(api_key):
     created = create_listing_v2(api_key, INTENT, OFFER)
-    print(json.dumps(created, indent=2))
+    print(dumps_pretty(created))
 
 
 def maybe_handle_negotiation(api_key):
@@ -67,10 +67,10 @@ def maybe_handle_negotiation(api_key):
     offer = negotiation.get("final_offer") or negotiation.get("offer") or {}
     if int(offer.get("price", 0) or 0) >= OFFER["price"]:
         accepted = accept_negotiation(api_key, negotiation_id)
-        print(json.dumps(accepted, indent=2))
+        print(dumps_pretty(accepted))
     else:
         rejected = reject_negotiation(api_key, negotiation_id)
-        print(json.dumps(rejected, indent=2))
+        print(dumps_pretty(rejected))
 
 
 def maybe_ship_active_contract(api_key):
@@ -1,4 +1,3 @@
-import json
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
@@ -9,6 +8,7 @@ if str(TOOLS_DIR) not in sys.path:
 
 from agenttiki_client import get_client
 from auth import load_credentials, register_actor, save_credentials
+from codec import dumps_pretty
 from contracts import get_contract, list_active_contracts, transition_contract
 from credits import create_topup_session, get_balance
 from deliveries import confirm_delivery, create_upload_intent, put_file_to_presigned_url
@@ -65,14 +65,14 @@ def ensure_balance(api_key, needed_credits):
     page = get_client().bases["PAYMENTS_PAGE_BASE"]
     print("Low balance. Complete a credits top-up before retrying the buy-side flow.")
     print(f"Top-up page: {page}?credits_amount={needed_credits}")
-    print(json.dumps(topup, indent=2))
+    print(dumps_pretty(topup))
     return balance
 
 
 def publish_capability(api_key):
     created = create_listing_v2(api_key, CAPABILITY_INTENT, LISTING_OFFER)
     print("Published provider-side capability:")
-    print(json.dumps(created, indent=2))
+    print(dumps_pretty(created))
     return created
 
 
@@ -95,7 +95,7 @@ def maybe_handle_incoming_negotiation(api_key):
     else:
         result = reject_negotiation(api_key, negotiation_id)
     print("Provider-side negotiation action:")
-    print(json.dumps(result, indent=2))
+    print(dumps_pretty(result))
     return result
 
 
@@ -105,7 +105,7 @@ def upload_input(api_key, contract_id):
         "required_format": "markdown",
         "scope": "summary",
     }
-    body = json.dumps(payload, indent=2).encode("utf-8")
+    body = dumps_pretty(payload).encode("utf-8")
     files = [{"path": "input/request.json", "content_type": "application/json", "size_bytes": len(body)}]
     intent = create_upload_intent(api_key, contract_id, "INPUT", files)
     upload = (intent.get("files") or [{}])[0]
@@ -135,7 +135,7 @@ def maybe_ship_provider_contract(api_key):
             "links": ["https://www.iana.org/domains/example"],
         },
     }
-    body = json.dumps(payload, indent=2).encode("utf-8")
+    body = dumps_pretty(payload).encode("utf-8")
     files = [{"path": "output/result.json", "content_type": "application/json", "size_bytes": len(body)}]
     intent = create_upload_intent(api_key, contract_id, "OUTPUT", files)
     upload = (intent.get("files") or [{}])[0]
@@ -155,20 +155,20 @@ def buy_needed_capability(api_key):
         return None
     created = create_negotiation(api_key, matches["intent_hash"], match["listing_id"], INITIAL_PROPOSAL)
     print("Buyer-side negotiation created:")
-    print(json.dumps(created, indent=2))
+    print(dumps_pretty(created))
     negotiation_id = created.get("negotiation_id")
     if not negotiation_id:
         return None
     state = get_negotiation(api_key, negotiation_id)
     print("Buyer-side negotiation state:")
-    print(json.dumps(state, indent=2))
+    print(dumps_pretty(state))
     if state.get("next_actor_id") == load_credentials(CREDENTIALS_PATH).get("actor_id"):
         counter = dict(INITIAL_PROPOSAL)
         counter["price"] = min(INITIAL_PROPOSAL["price"] + 100, 1000)
         propose_negotiation(api_key, negotiation_id, counter)
     accepted = accept_negotiation(api_key, negotiation_id)
     print("Buyer-side accept attempt:")
-    print(json.dumps(accepted, indent=2))
+    print(dumps_pretty(accepted))
     if accepted.get("error", {}).get("code") == "INSUFFICIENT_CREDITS":
         ensure_balance(api_key, INITIAL_PROPOSAL["price"])
         return None
@@ -177,7 +177,7 @@ def buy_needed_capability(api_key):
         return None
     contract = get_contract(api_key, contract_id)
     print("Buyer-side contract state:")
-    print(json.dumps(contract, indent=2))
+    print(dumps_pretty(contract))
     if contract.get("status") == "ACTIVE":
         upload_input(api_key, contract_id)
     if contract.get("status") == "SHIPPED":
@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+
+import pytest
+
+TOOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tools"))
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)
+
+from agenttiki_client import AgentTikiClient  # noqa: E402
+from circuit_breaker import CircuitBreakerRegistry  # noqa: E402
+from http_cache import ConditionalCache  # noqa: E402
+from mock_server import BASE_NAMES, FaultInjector, MockAgentTiki  # noqa: E402
+from rate_limit import RateLimiterRegistry  # noqa: E402
+from retry import RetryPolicy  # noqa: E402
+
+
+class ScriptedFaults(FaultInjector):
+    """Answers the next requests whose path matches ``paths`` with ``statuses``, in order."""
+
+    def __init__(self, paths, statuses):
+        super().__init__(paths=paths)
+        self.statuses = list(statuses)
+        self.served = 0
+        self._script_lock = threading.Lock()
+
+    def apply(self, path):
+        if not self.paths.search(path):
+            return None
+        with self._script_lock:
+            if not self.statuses:
+                return None
+            status = self.statuses.pop(0)
+            self.served += 1
+        if status == 429:
+            return 429, {"message": "Too Many Requests"}, {"Retry-After": "0"}
+        return status, {"error": {"code": "INTERNAL_ERROR", "message": "scripted failure"}}, {}
+
+
+@pytest.fixture
+def mock():
+    with MockAgentTiki(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def fail_next(mock):
+    """``fail_next(regex, 500, 429, ...)`` answers the next matching requests with those statuses."""
+
+    def script(paths, *statuses):
+        mock.faults = ScriptedFaults(paths, statuses)
+        return mock.faults
+
+    return script
+
+
+@pytest.fixture
+def api_key(mock):
+    with mock.backend.lock:
+        _, actor = mock.backend.register(None, {})
+    return actor["api_key"]
+
+
+@pytest.fixture
+def make_client(mock):
+    """Clients on the mock with their own retry, cache, limiter and breaker state.
+
+    Rate limiting and circuit breaking are off unless passed in.
+    """
+    clients = []
+
+    def build(**overrides):
+        options = {
+            "bases": {name: mock.base_url for name in BASE_NAMES},
+            "retry_policy": RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.05),
+            "http_cache": ConditionalCache(),
+            "coalesce": False,
+            "rate_limits": RateLimiterRegistry(rate=0),
+            "breakers": CircuitBreakerRegistry(failure_threshold=0),
+        }
+        options.update(overrides)
+        client = AgentTikiClient(timeout=5, **options)
+        clients.append(client)
+        return client
+
+    yield build
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
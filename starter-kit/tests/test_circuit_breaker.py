@@ -0,0 +1,100 @@
+import time
+
+from circuit_breaker import BACKEND_UNAVAILABLE, CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+from retry import RetryPolicy
+
+BALANCE = "/credits/v1/balance"
+SERVER_ERROR = {"error": {"code": "INTERNAL_ERROR", "status_code": 500}}
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+
+    breaker.record(SERVER_ERROR)
+    assert breaker.state == CLOSED
+    breaker.record({"error": {"code": "NOT_FOUND", "status_code": 404}})
+    breaker.record(SERVER_ERROR)
+    assert breaker.state == CLOSED
+    breaker.record(failed=True)
+
+    assert breaker.state == OPEN
+    rejected = breaker.before_call()
+    assert rejected["error"]["code"] == BACKEND_UNAVAILABLE
+    assert 0 < rejected["error"]["retry_after"] <= 60
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record(SERVER_ERROR)
+    time.sleep(0.06)
+
+    assert breaker.before_call() is None
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call()["error"]["code"] == BACKEND_UNAVAILABLE
+
+    breaker.record({"balance": 1})
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is None
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record(SERVER_ERROR)
+    time.sleep(0.06)
+    assert breaker.before_call() is None
+
+    breaker.record(SERVER_ERROR)
+
+    assert breaker.state == OPEN
+    assert breaker.before_call()["error"]["code"] == BACKEND_UNAVAILABLE
+
+
+def test_abandoned_probe_frees_the_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record(SERVER_ERROR)
+    time.sleep(0.06)
+    assert breaker.before_call() is None
+
+    breaker.abandon()
+
+    assert breaker.before_call() is None
+
+
+def test_registry_keys_breakers_by_endpoint_family():
+    registry = CircuitBreakerRegistry(failure_threshold=1)
+
+    assert registry.get("CONTRACTS_API_BASE", "/contracts/v1/abc") is registry.get("CONTRACTS_API_BASE", "/contracts/v1/def/delivery/latest")
+    assert registry.get("CONTRACTS_API_BASE", "/contracts/v1/abc") is not registry.get("CREDITS_API_BASE", "/credits/v1/balance")
+    assert CircuitBreakerRegistry(failure_threshold=0).get("CREDITS_API_BASE", BALANCE) is None
+
+
+def test_client_fails_fast_while_open_and_recovers(mock, fail_next, make_client, api_key):
+    client = make_client(
+        retry_policy=RetryPolicy(max_attempts=1),
+        breakers=CircuitBreakerRegistry(failure_threshold=2, reset_seconds=0.2),
+    )
+    get = lambda: client.request_json("GET", "CREDITS_API_BASE", BALANCE, api_key=api_key)
+    fail_next(BALANCE, 500, 500)
+
+    assert get()["error"]["status_code"] == 500
+    assert get()["error"]["status_code"] == 500
+    rejected = get()
+
+    assert rejected["error"]["code"] == BACKEND_UNAVAILABLE
+    assert mock.requests[f"GET {BALANCE}"] == 2
+
+    time.sleep(0.25)
+    assert "error" not in get()
+    assert client.breakers.get("CREDITS_API_BASE", BALANCE).state == CLOSED
+    assert mock.requests[f"GET {BALANCE}"] == 3
+
+
+def test_open_circuit_is_not_retried(mock, fail_next, make_client, api_key):
+    client = make_client(breakers=CircuitBreakerRegistry(failure_threshold=1, reset_seconds=60))
+    fail_next(BALANCE, 500, 500, 500)
+
+    result = client.request_json("GET", "CREDITS_API_BASE", BALANCE, api_key=api_key)
+
+    # The first 500 opens the circuit; the retry is answered locally.
+    assert result["error"]["code"] == BACKEND_UNAVAILABLE
+    assert mock.requests[f"GET {BALANCE}"] == 1
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from agenttiki_client import ClientRegistry
+
+BALANCE = "/credits/v1/balance"
+
+
+@pytest.fixture
+def registry(mock, monkeypatch):
+    for name, value in mock.env().items():
+        monkeypatch.setenv(name, value)
+    registry = ClientRegistry(pool_size=4, idle_timeout=0)
+    yield registry
+    registry.clear()
+
+
+def watch_close(client):
+    closed = []
+    close = client.close
+    client.close = lambda: (closed.append(True), close())
+    return closed
+
+
+def get_balance(client, api_key):
+    return client.request_json("GET", "CREDITS_API_BASE", BALANCE, api_key=api_key)
+
+
+def test_one_client_per_base_set(registry, monkeypatch):
+    client = registry.get()
+
+    assert registry.get() is client
+    assert registry.get(timeout=5) is not client
+    monkeypatch.setenv("CONTRACTS_API_BASE", "http://127.0.0.1:9")
+    assert registry.get() is not client
+
+
+def test_idle_clients_are_closed_on_the_next_lookup(registry, monkeypatch):
+    registry.idle_timeout = 0.05
+    idle = registry.get()
+    closed = watch_close(idle)
+    time.sleep(0.1)
+
+    monkeypatch.setenv("CONTRACTS_API_BASE", "http://127.0.0.1:9")
+    registry.get()
+
+    assert closed
+
+
+def test_leased_client_is_not_evicted(registry, monkeypatch):
+    registry.idle_timeout = 0.05
+    client = registry.get()
+    closed = watch_close(client)
+
+    with client.leased():
+        time.sleep(0.1)
+        monkeypatch.setenv("CONTRACTS_API_BASE", "http://127.0.0.1:9")
+        registry.get()
+        assert not closed
+
+
+def test_reconfigure_retires_in_use_clients_after_their_lease(registry, api_key):
+    client = registry.get()
+    closed = watch_close(client)
+
+    with client.leased():
+        registry.configure(pool_size=8)
+        assert not closed
+        # Still usable by whoever holds it.
+        assert "error" not in get_balance(client, api_key)
+        assert not closed
+
+    assert closed
+    replacement = registry.get()
+    assert replacement is not client
+    assert "error" not in get_balance(replacement, api_key)
+
+
+def test_clear_closes_unused_clients_at_once(registry):
+    client = registry.get()
+    closed = watch_close(client)
+
+    registry.clear()
+
+    assert closed
+    assert registry.get() is not client
@@ -0,0 +1,108 @@
+import functools
+import gzip
+import hashlib
+
+import pytest
+
+import agenttiki_client
+from agenttiki_client import close_clients, get_client
+from content_encoding import gzip_request_body
+from deliveries import download_file_from_presigned_url
+from delivery_pipeline import deliver_manifest
+from downloads import HASH_MISMATCH, _write_meta
+
+TEXT = b"".join(b"line %06d of a compressible delivery\n" % number for number in range(4000))
+
+
+@pytest.fixture
+def parties(mock, monkeypatch):
+    """Buyer and provider keys for an ACTIVE contract."""
+    for name, value in mock.env().items():
+        monkeypatch.setenv(name, value)
+    with mock.backend.lock:
+        _, buyer = mock.backend.register(None, {})
+        _, provider = mock.backend.register(None, {})
+        contract_id = mock.backend._open_contract(buyer["actor_id"], provider["actor_id"], {"price": 1})["contract_id"]
+    yield buyer["api_key"], provider["api_key"], contract_id
+    close_clients()
+
+
+def deliver(tmp_path, api_key, contract_id, delivery_type, name, content, compression="off"):
+    local_path = tmp_path / name
+    local_path.write_bytes(content)
+    manifest = [{"path": name, "local_path": str(local_path)}]
+    return deliver_manifest(api_key, contract_id, delivery_type, manifest, compression=compression)
+
+
+@pytest.fixture
+def compressed_output(parties, tmp_path):
+    buyer_key, provider_key, contract_id = parties
+    assert "error" not in deliver(tmp_path, buyer_key, contract_id, "INPUT", "input.txt", b"translate me")
+    delivered = deliver(tmp_path, provider_key, contract_id, "OUTPUT", "output.txt", TEXT, compression="gzip")
+    assert "error" not in delivered
+    download = get_client().request_json("GET", "CONTRACTS_API_BASE", f"/contracts/v1/{contract_id}/delivery/download", api_key=buyer_key)
+    return download["files"][0]
+
+
+def test_compressed_delivery_round_trips(compressed_output, tmp_path):
+    file_meta = compressed_output
+    local_path = str(tmp_path / "received.txt")
+
+    result = download_file_from_presigned_url(file_meta["download_url"], local_path, file_meta["sha256"], file_meta)
+
+    assert file_meta["path"] == "output.txt.gz"
+    assert file_meta["content_encoding"] == "gzip"
+    assert file_meta["size"] < len(TEXT)
+    assert result["uncompressed_size"] == len(TEXT)
+    with open(local_path, "rb") as file_handle:
+        assert file_handle.read() == TEXT
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["input.txt", "output.txt", "received.txt"]
+
+
+def test_compressed_download_resumes(mock, compressed_output, tmp_path):
+    file_meta = compressed_output
+    local_path = str(tmp_path / "received.txt")
+    with mock.backend.lock:
+        compressed = next(content for content in mock.backend.blobs.values() if content.startswith(b"\x1f\x8b"))
+    with open(local_path + ".part", "wb") as file_handle:
+        file_handle.write(compressed[:1000])
+    _write_meta(local_path + ".part.json", f'"{hashlib.md5(compressed).hexdigest()}"')
+
+    result = download_file_from_presigned_url(file_meta["download_url"], local_path, file_meta["sha256"], file_meta)
+
+    assert result["resumed_from"] == 1000
+    with open(local_path, "rb") as file_handle:
+        assert file_handle.read() == TEXT
+
+
+def test_uncompressed_hash_is_checked(compressed_output, tmp_path):
+    file_meta = dict(compressed_output, uncompressed_sha256="0" * 64)
+    local_path = tmp_path / "received.txt"
+
+    result = download_file_from_presigned_url(file_meta["download_url"], str(local_path), file_meta["sha256"], file_meta)
+
+    assert result["error"]["code"] == HASH_MISMATCH
+    assert not local_path.exists()
+
+
+def test_large_request_bodies_are_gzipped(mock, make_client, api_key, monkeypatch):
+    monkeypatch.setattr(agenttiki_client, "gzip_request_body", functools.partial(gzip_request_body, min_bytes=1024))
+    client = make_client()
+    sent = []
+    client.session.hooks["response"].append(lambda response, **kwargs: sent.append(response.request))
+    offer = {"price": 1000, "currency": "EUR", "notes": "x" * 4096}
+
+    result = client.request_json(
+        "POST",
+        "LISTINGS_API_BASE",
+        "/listings/ingest/v1",
+        api_key=api_key,
+        json={"version": "v1", "intent": {"service": "translation"}, "offer": offer, "trust_score": 0.9},
+    )
+
+    assert "error" not in result
+    assert sent[0].headers["Content-Encoding"] == "gzip"
+    assert len(sent[0].body) < 1024
+    assert b'"notes"' in gzip.decompress(sent[0].body)
+    with mock.backend.lock:
+        assert [listing["offer"] for listing in mock.backend.listings.values()] == [offer]
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import secrets
+
+import pytest
+import requests
+
+from agenttiki_client import close_clients
+from deliveries import download_file_from_presigned_url
+from downloads import HASH_MISMATCH, _write_meta, download_file
+
+CONTENT = bytes(range(256)) * 64
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+ETAG = f'"{hashlib.md5(CONTENT).hexdigest()}"'
+
+
+@pytest.fixture(autouse=True)
+def pooled_clients():
+    yield
+    close_clients()
+
+
+def serve_blob(mock, content):
+    token = secrets.token_urlsafe(12)
+    with mock.backend.lock:
+        mock.backend.blobs[f"test/{token}"] = content
+        mock.backend.download_tokens[token] = f"test/{token}"
+    return f"{mock.base_url}/blobs/{token}"
+
+
+def leave_part(local_path, content, validator):
+    with open(f"{local_path}.part", "wb") as file_handle:
+        file_handle.write(content)
+    _write_meta(f"{local_path}.part.json", validator)
+
+
+def read(path):
+    with open(path, "rb") as file_handle:
+        return file_handle.read()
+
+
+class BreakingSession:
+    """Drops the first response after one chunk and records request headers."""
+
+    def __init__(self, session):
+        self.session = session
+        self.requests = []
+        self.broken = False
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        response = self.session.get(url, headers=headers, **kwargs)
+        if not self.broken:
+            self.broken = True
+            chunks = response.iter_content
+
+            def iter_content(chunk_size=1):
+                yield next(iter(chunks(chunk_size)))
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+
+            response.iter_content = iter_content
+        return response
+
+
+def test_download_verifies_and_cleans_up(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+
+    result = download_file_from_presigned_url(serve_blob(mock, CONTENT), local_path, expected_sha256=SHA256)
+
+    assert result == {"path": local_path, "sha256": SHA256, "size": len(CONTENT), "resumed_from": 0}
+    assert read(local_path) == CONTENT
+    assert os.listdir(tmp_path) == ["out.bin"]
+
+
+def test_interrupted_transfer_resumes_with_range(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+    session = BreakingSession(requests.Session())
+
+    with session.session:
+        result = download_file(session, serve_blob(mock, CONTENT), local_path, expected_sha256=SHA256, chunk_size=1024, attempts=2)
+
+    assert result["sha256"] == SHA256
+    assert read(local_path) == CONTENT
+    assert session.requests == [{}, {"Range": "bytes=1024-", "If-Range": ETAG}]
+
+
+def test_part_left_by_an_earlier_call_is_resumed(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+    leave_part(local_path, CONTENT[:5000], ETAG)
+
+    result = download_file_from_presigned_url(serve_blob(mock, CONTENT), local_path, expected_sha256=SHA256)
+
+    assert result["resumed_from"] == 5000
+    assert result["sha256"] == SHA256
+    assert read(local_path) == CONTENT
+    assert os.listdir(tmp_path) == ["out.bin"]
+
+
+def test_changed_object_restarts_from_zero(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+    leave_part(local_path, b"x" * 5000, '"an-older-version"')
+
+    result = download_file_from_presigned_url(serve_blob(mock, CONTENT), local_path, expected_sha256=SHA256)
+
+    # If-Range did not match, so the mock sent the whole object.
+    assert result["resumed_from"] == 0
+    assert read(local_path) == CONTENT
+
+
+def test_complete_part_is_finished_without_a_body(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+    leave_part(local_path, CONTENT, ETAG)
+
+    result = download_file_from_presigned_url(serve_blob(mock, CONTENT), local_path, expected_sha256=SHA256)
+
+    assert result["resumed_from"] == len(CONTENT)
+    assert result["sha256"] == SHA256
+    assert read(local_path) == CONTENT
+
+
+def test_hash_mismatch_keeps_nothing(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+
+    result = download_file_from_presigned_url(serve_blob(mock, CONTENT), local_path, expected_sha256="0" * 64)
+
+    assert result["error"]["code"] == HASH_MISMATCH
+    assert result["error"]["sha256"] == SHA256
+    assert os.listdir(tmp_path) == []
+
+
+def test_corrupt_resumed_part_is_discarded(mock, tmp_path):
+    local_path = str(tmp_path / "out.bin")
+    url = serve_blob(mock, CONTENT)
+    leave_part(local_path, b"x" * 5000, ETAG)
+
+    first = download_file_from_presigned_url(url, local_path, expected_sha256=SHA256)
+    second = download_file_from_presigned_url(url, local_path, expected_sha256=SHA256)
+
+    assert first["error"]["code"] == HASH_MISMATCH
+    assert second["resumed_from"] == 0
+    assert read(local_path) == CONTENT
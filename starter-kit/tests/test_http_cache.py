@@ -0,0 +1,97 @@
+from http_cache import CACHE_MARKERS, ConditionalCache, strip_cache_markers
+
+BALANCE = "/credits/v1/balance"
+
+
+def cached_balance(client, api_key):
+    return client.request_json("GET", "CREDITS_API_BASE", BALANCE, api_key=api_key, cache=True)
+
+
+def test_unchanged_resource_is_answered_by_304(mock, client, api_key):
+    first = cached_balance(client, api_key)
+    second = cached_balance(client, api_key)
+
+    assert first["_unchanged"] is False
+    assert second["_unchanged"] is True
+    assert second["_version"] == first["_version"]
+    assert strip_cache_markers(second) == strip_cache_markers(first)
+    assert client.http_cache.stats()["not_modified"] == 1
+    assert mock.requests[f"GET {BALANCE}"] == 2
+
+
+def test_changed_resource_replaces_the_entry(mock, client, api_key):
+    first = cached_balance(client, api_key)
+    with mock.backend.lock:
+        actor_id = mock.backend.actors_by_key[api_key]
+        mock.backend.actors[actor_id]["reserved"] += 10
+
+    second = cached_balance(client, api_key)
+
+    assert second["_unchanged"] is False
+    assert second["_version"] != first["_version"]
+    assert second["available_credits"] == first["available_credits"] - 10
+    assert client.http_cache.stats()["changed"] == 2
+
+
+def test_304_for_an_evicted_entry_is_fetched_again(mock, make_client, api_key):
+    class EvictingCache(ConditionalCache):
+        # Another key pushes the entry out after its validators were sent.
+        def validators(self, key):
+            headers = super().validators(key)
+            self.clear()
+            return headers
+
+    client = make_client(http_cache=EvictingCache())
+    cached_balance(client, api_key)
+
+    result = cached_balance(client, api_key)
+
+    assert "error" not in result
+    assert result["_unchanged"] is False
+    assert result["available_credits"] == mock.backend.starting_credits
+    assert mock.requests[f"GET {BALANCE}"] == 3
+
+
+def test_identical_body_without_validators_is_not_reparsed():
+    cache = ConditionalCache()
+    content = b'{"balance": 5}'
+    cache.store("key", {}, content, {"balance": 5})
+
+    assert cache.validators("key") == {}
+    same = cache.lookup("key", 200, content)
+    assert same["_unchanged"] is True
+    assert same["balance"] == 5
+    assert cache.lookup("key", 200, b'{"balance": 6}') is None
+    assert cache.stats()["same_body"] == 1
+
+
+def test_error_responses_are_not_cached():
+    cache = ConditionalCache()
+    cache.store("key", {"ETag": '"a"'}, b"{}", {"ok": True})
+
+    result = cache.store("key", {}, b"{}", {"error": {"code": "NOT_FOUND"}})
+
+    assert "_unchanged" not in result["error"]
+    assert cache.validators("key") == {}
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = ConditionalCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.store(key, {"ETag": f'"{key}"'}, key.encode(), {"key": key})
+    cache.lookup("a", 304, b"")
+    cache.store("c", {"ETag": '"c"'}, b"c", {"key": "c"})
+
+    assert cache.validators("a") == {"If-None-Match": '"a"'}
+    assert cache.validators("b") == {}
+
+
+def test_returned_payloads_are_private_copies():
+    cache = ConditionalCache()
+    view = cache.store("key", {"ETag": '"a"'}, b"{}", {"items": [1]})
+    view["items"].append(2)
+
+    again = cache.lookup("key", 304, b"")
+
+    assert again["items"] == [1]
+    assert not set(CACHE_MARKERS) & set(strip_cache_markers(again))
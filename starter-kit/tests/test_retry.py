@@ -0,0 +1,129 @@
+import pytest
+import requests
+
+from retry import RetryBudget, RetryPolicy
+
+BALANCE = "/credits/v1/balance"
+REGISTER = "/actors/v1"
+
+
+def get_balance(client, api_key):
+    return client.request_json("GET", "CREDITS_API_BASE", BALANCE, api_key=api_key)
+
+
+def register(client, **kwargs):
+    return client.request_json("POST", "ACTORS_API_BASE", REGISTER, json={"action": "register"}, **kwargs)
+
+
+def test_get_is_retried_through_server_errors(mock, fail_next, client, api_key):
+    fail_next(BALANCE, 500, 503)
+
+    result = get_balance(client, api_key)
+
+    assert "error" not in result
+    assert result["available_credits"] == mock.backend.starting_credits
+    assert mock.requests[f"GET {BALANCE}"] == 3
+
+
+def test_retries_stop_at_max_attempts(mock, fail_next, client, api_key):
+    fail_next(BALANCE, *[500] * 10)
+
+    result = get_balance(client, api_key)
+
+    assert result["error"]["status_code"] == 500
+    assert mock.requests[f"GET {BALANCE}"] == client.retry_policy.max_attempts
+
+
+def test_post_is_not_replayed_after_a_server_error(mock, fail_next, client):
+    fail_next(REGISTER, 500)
+
+    result = register(client)
+
+    assert result["error"]["status_code"] == 500
+    assert mock.requests[f"POST {REGISTER}"] == 1
+
+
+def test_post_with_idempotency_key_is_retried(mock, fail_next, client):
+    fail_next(REGISTER, 500)
+
+    result = register(client, idempotency_key="register-once")
+
+    assert "api_key" in result
+    assert mock.requests[f"POST {REGISTER}"] == 2
+
+
+def test_throttled_post_is_retried(mock, fail_next, client):
+    fail_next(REGISTER, 429)
+
+    result = register(client)
+
+    assert "api_key" in result
+    assert mock.requests[f"POST {REGISTER}"] == 2
+
+
+def test_retry_budget_caps_retries(mock, fail_next, client, api_key):
+    budget = client.retry_policy.budget(api_key)
+    budget.min_per_second = 0
+    budget.balance = 0
+    fail_next(BALANCE, 500, 500)
+
+    result = get_balance(client, api_key)
+
+    # The first attempt deposits less than one retry's worth.
+    assert result["error"]["status_code"] == 500
+    assert mock.requests[f"GET {BALANCE}"] == 1
+
+
+def test_budget_refills_from_first_attempts():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_balance=2)
+
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+@pytest.mark.parametrize(
+    "method, error, idempotent, retryable",
+    [
+        ("GET", {"code": "INTERNAL_ERROR", "status_code": 500}, False, True),
+        ("POST", {"code": "INTERNAL_ERROR", "status_code": 500}, False, False),
+        ("POST", {"code": "INTERNAL_ERROR", "status_code": 500}, True, True),
+        ("POST", {"code": "HTTP_ERROR", "status_code": 429}, False, True),
+        ("POST", {"code": "NOT_YOUR_TURN", "status_code": 409}, False, True),
+        ("GET", {"code": "INVALID_STATE_TRANSITION", "status_code": 409}, True, False),
+        ("GET", {"code": "BACKEND_UNAVAILABLE"}, True, False),
+        ("GET", {"code": "NOT_FOUND", "status_code": 404}, True, False),
+    ],
+)
+def test_is_retryable(method, error, idempotent, retryable):
+    policy = RetryPolicy()
+
+    assert policy.is_retryable(method, result={"error": error}, idempotent=idempotent) is retryable
+
+
+def test_transport_errors_are_retried_only_when_replay_safe():
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise requests.exceptions.ConnectionError("reset")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy.run("GET", send, actor_key="get", transient=(requests.exceptions.ConnectionError,), sleep=lambda delay: None)
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy.run("POST", send, actor_key="post", transient=(requests.exceptions.ConnectionError,), sleep=lambda delay: None)
+    assert len(calls) == 1
+
+
+def test_retry_after_sets_the_minimum_delay():
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.05)
+
+    assert policy.next_delay(0.0, {"error": {"code": "HTTP_ERROR", "status_code": 429, "retry_after": 2}}) >= 2
+    assert policy.next_delay(0.0) <= 0.05
@@ -0,0 +1,101 @@
+import hashlib
+import re
+
+import pytest
+
+from agenttiki_client import close_clients, get_client
+from deliveries import confirm_delivery, create_upload_intent, upload_delivery_file
+from uploads import UPLOAD_FAILED, completed_file, upload_file
+
+PART_SIZE = 1024
+CONTENT = bytes(range(256)) * 14  # four parts, the last one short
+
+
+@pytest.fixture
+def contract(mock, monkeypatch):
+    """An ACTIVE contract whose buyer uploads INPUT through the pooled client."""
+    for name, value in mock.env().items():
+        monkeypatch.setenv(name, value)
+    with mock.backend.lock:
+        mock.backend.multipart_part_size = PART_SIZE
+        _, buyer = mock.backend.register(None, {})
+        _, provider = mock.backend.register(None, {})
+        opened = mock.backend._open_contract(buyer["actor_id"], provider["actor_id"], {"price": 1})
+    yield buyer["api_key"], opened["contract_id"]
+    close_clients()
+
+
+def upload_intent(api_key, contract_id, path, content, size=None):
+    files = [{"path": path, "sha256": hashlib.sha256(content).hexdigest(), "size": len(content) if size is None else size}]
+    response = create_upload_intent(api_key, contract_id, "INPUT", files)
+    return response["files"][0]
+
+
+def stored_blob(mock, entry):
+    with mock.backend.lock:
+        return mock.backend.blobs.get(entry["s3_key"])
+
+
+def part_path(part):
+    return re.escape(part["upload_url"].split("/", 3)[3])
+
+
+def test_failed_part_is_retried_on_its_own(mock, fail_next, contract, tmp_path):
+    api_key, contract_id = contract
+    local_path = tmp_path / "input.bin"
+    local_path.write_bytes(CONTENT)
+    entry = upload_intent(api_key, contract_id, "input.bin", CONTENT)
+    parts = entry["multipart"]["parts"]
+    faults = fail_next(part_path(parts[1]), 500)
+
+    result = upload_delivery_file(entry, local_path)
+
+    assert "error" not in result
+    assert [part["part_number"] for part in result["parts"]] == [1, 2, 3, 4]
+    assert faults.served == 1
+    assert mock.requests["PUT /blobs/{token}"] == len(parts) + 1
+    confirmed = confirm_delivery(api_key, contract_id, "INPUT", [completed_file(entry, result)])
+    assert confirmed["status"] == "recorded"
+    assert stored_blob(mock, entry) == CONTENT
+
+
+def test_part_that_keeps_failing_reports_its_number(mock, fail_next, contract, tmp_path):
+    api_key, contract_id = contract
+    local_path = tmp_path / "input.bin"
+    local_path.write_bytes(CONTENT)
+    entry = upload_intent(api_key, contract_id, "input.bin", CONTENT)
+    fail_next(part_path(entry["multipart"]["parts"][2]), 500, 500)
+
+    with get_client().leased() as client:
+        result = upload_file(client.session, entry, str(local_path), attempts=2)
+
+    assert result["error"]["code"] == UPLOAD_FAILED
+    assert result["error"]["part_number"] == 3
+    assert result["error"]["status_code"] == 500
+
+
+def test_empty_file_goes_up_in_one_put(mock, contract, tmp_path):
+    api_key, contract_id = contract
+    local_path = tmp_path / "empty.bin"
+    local_path.write_bytes(b"")
+    # Declared larger than a part, so the intent offers part URLs anyway.
+    entry = upload_intent(api_key, contract_id, "empty.bin", b"", size=4 * PART_SIZE)
+    assert entry["multipart"]["parts"]
+
+    sent = []
+    with get_client().leased() as client:
+        client.session.hooks["response"].append(lambda response, **kwargs: sent.append(response.request.headers))
+        try:
+            result = upload_file(client.session, entry, str(local_path))
+        finally:
+            client.session.hooks["response"].pop()
+
+    assert result["size"] == 0
+    assert "parts" not in result
+    # Presigned PUTs reject chunked bodies.
+    assert sent[0]["Content-Length"] == "0"
+    assert "Transfer-Encoding" not in sent[0]
+    assert mock.requests["PUT /blobs/{token}"] == 1
+    confirmed = confirm_delivery(api_key, contract_id, "INPUT", [completed_file(entry, result)])
+    assert confirmed["status"] == "recorded"
+    assert stored_blob(mock, entry) == b""
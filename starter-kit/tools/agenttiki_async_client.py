@@ -0,0 +1,259 @@
+import asyncio
+import functools
+import os
+import time
+import weakref
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from agenttiki_client import (
+    DEFAULT_COALESCE,
+    DEFAULT_POOL_SIZE,
+    TRANSIENT_ERRORS,
+    BaseClient,
+    get_client,
+    not_modified_error,
+    parse_response,
+    resolve_bases,
+)
+from singleflight import AsyncSingleFlight
+
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("AGENTTIKI_ASYNC_MAX_CONCURRENCY", "64"))
+
+if aiohttp is not None:
+    ASYNC_TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+else:
+    ASYNC_TRANSIENT_ERRORS = TRANSIENT_ERRORS
+
+
+class AsyncAgentTikiClient(BaseClient):
+    """Asyncio counterpart of ``AgentTikiClient`` with the same result contract.
+
+    Uses a pooled ``aiohttp`` session when aiohttp is installed. Without it,
+    calls run on the shared blocking client in the default executor. Either
+    way at most ``max_concurrency`` requests are in flight at once.
+    """
+
+    def __init__(
+        self,
+        timeout=30,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        pool_size=DEFAULT_POOL_SIZE,
+        bases=None,
+        retry_policy=None,
+        http_cache=None,
+        coalesce=DEFAULT_COALESCE,
+        rate_limits=None,
+        breakers=None,
+    ):
+        super().__init__(
+            timeout=timeout,
+            bases=bases,
+            retry_policy=retry_policy,
+            http_cache=http_cache,
+            coalesce=coalesce,
+            rate_limits=rate_limits,
+            breakers=breakers,
+        )
+        self.pool_size = pool_size
+        self.singleflight = AsyncSingleFlight()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[_timing_trace()])
+        return self._session
+
+    async def send(self, method, url, endpoint=None, **kwargs):
+        """Send one request and return ``(status_code, headers, content)``.
+
+        ``endpoint`` is a ``(base_name, path)`` pair; when given, the
+        client's hooks and request metrics see the call.
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        request = None
+        if endpoint is not None:
+            headers = kwargs.setdefault("headers", {})
+            request = self.before_request(method, endpoint[0], endpoint[1], headers, kwargs.get("data"))
+        marks = {}
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                status_code, headers, content = await self._transfer(method, url, timeout, marks, kwargs)
+            except Exception as error:
+                if request is not None:
+                    timings = _phase_timings(marks, started)
+                    self.after_request(request, timings=timings, error=error)
+                raise
+        if request is not None:
+            timings = _phase_timings(marks, started)
+            self.after_request(request, status_code, headers, len(content or b""), timings)
+        return status_code, headers, content
+
+    async def _transfer(self, method, url, timeout, marks, kwargs):
+        if aiohttp is None:
+            with get_client().leased() as client:
+                call = functools.partial(client.session.request, method, url, timeout=timeout, **kwargs)
+                response = await asyncio.get_running_loop().run_in_executor(None, call)
+            marks["ttfb"] = response.elapsed.total_seconds()
+            return response.status_code, response.headers, response.content
+        session = self._get_session()
+        async with session.request(
+            method,
+            url,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            trace_request_ctx=marks,
+            **kwargs,
+        ) as response:
+            content = await response.read()
+            return response.status, response.headers, content
+
+    async def request_json(
+        self,
+        method,
+        base_name,
+        path,
+        api_key=None,
+        idempotent=False,
+        idempotency_key=None,
+        cache=False,
+        **kwargs,
+    ):
+        idempotent = self.apply_idempotency_key(kwargs, idempotency_key) or idempotent
+        flight_key = self.coalesce_key(method, base_name, path, api_key, cache, kwargs)
+        self.encode_json_body(kwargs)
+        cache_key = self.cache_key(api_key, base_name, path) if cache and method.upper() == "GET" else None
+        headers = self.prepare_headers(api_key, kwargs)
+        url = self.url(base_name, path)
+
+        limiter = self.rate_limits.get(base_name)
+        breaker = self.breakers.get(base_name, path)
+
+        async def guarded():
+            rejected = breaker.before_call()
+            if rejected is not None:
+                return rejected
+            try:
+                result = await attempt()
+            except Exception:
+                breaker.record(failed=True)
+                raise
+            except BaseException:
+                breaker.abandon()
+                raise
+            breaker.record(result)
+            return result
+
+        async def attempt():
+            if limiter is not None:
+                await limiter.acquire_async()
+            if cache_key is None:
+                status_code, response_headers, content = await self.send(
+                    method, url, endpoint=(base_name, path), headers=dict(headers), **kwargs
+                )
+                result = parse_response(status_code, response_headers, content)
+            else:
+                for validate in (True, False):
+                    options = dict(kwargs, headers=dict(headers))
+                    if validate:
+                        self.apply_validators(options, cache_key)
+                    status_code, response_headers, content = await self.send(
+                        method, url, endpoint=(base_name, path), **options
+                    )
+                    result = self.cached_result(cache_key, status_code, response_headers, content)
+                    if result is not None:
+                        break
+                else:
+                    result = not_modified_error(response_headers)
+            if limiter is not None:
+                limiter.observe(result)
+            return result
+
+        def run():
+            return self.retry_policy.run_async(
+                method,
+                attempt if breaker is None else guarded,
+                actor_key=api_key,
+                idempotent=idempotent,
+                transient=ASYNC_TRANSIENT_ERRORS,
+            )
+
+        if flight_key is None:
+            return await run()
+        return await self.singleflight.do(flight_key, run)
+
+
+def _timing_trace():
+    # Records perf_counter marks into the per-request ``trace_request_ctx``.
+    trace = aiohttp.TraceConfig()
+
+    def mark(name):
+        async def callback(session, context, params):
+            marks = context.trace_request_ctx
+            if isinstance(marks, dict):
+                marks[name] = time.perf_counter()
+
+        return callback
+
+    trace.on_request_start.append(mark("request_start"))
+    trace.on_dns_resolvehost_start.append(mark("dns_start"))
+    trace.on_dns_resolvehost_end.append(mark("dns_end"))
+    trace.on_connection_create_start.append(mark("connect_start"))
+    trace.on_connection_create_end.append(mark("connect_end"))
+    trace.on_request_end.append(mark("headers_received"))
+    return trace
+
+
+def _phase_timings(marks, started):
+    timings = {"total": time.perf_counter() - started}
+    if "ttfb" in marks:
+        timings["ttfb"] = marks["ttfb"]
+    elif "headers_received" in marks:
+        timings["ttfb"] = marks["headers_received"] - marks.get("request_start", started)
+    if "dns_end" in marks:
+        timings["dns"] = marks["dns_end"] - marks["dns_start"]
+    if "connect_end" in marks:
+        timings["connect"] = marks["connect_end"] - marks["connect_start"]
+    elif "request_start" in marks:
+        timings["connect"] = 0.0
+    return timings
+
+
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+
+def get_async_client(timeout=30):
+    # aiohttp sessions are bound to the loop that created them, so clients are
+    # cached per running loop and per resolved base URL set.
+    loop = asyncio.get_running_loop()
+    clients = _ASYNC_CLIENTS.setdefault(loop, {})
+    bases = resolve_bases()
+    key = (tuple(sorted(bases.items())), timeout)
+    client = clients.get(key)
+    if client is None:
+        client = AsyncAgentTikiClient(timeout=timeout, bases=bases)
+        clients[key] = client
+    return client
+
+
+async def close_async_clients():
+    clients = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
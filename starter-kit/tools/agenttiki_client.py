@@ -1,8 +1,22 @@
+import contextlib
 import os
+import threading
+import time
 from urllib.parse import urljoin
 
 import requests
 
+import codec
+from cassettes import install_from_env
+from circuit_breaker import circuit_breakers
+from content_encoding import gzip_request_body
+from http_cache import DEFAULT_HTTP_CACHE
+from idempotency import IDEMPOTENCY_HEADER
+from metrics import TimedHTTPAdapter, request_metrics, take_connect_timings, template_path
+from rate_limit import rate_limiters
+from retry import DEFAULT_RETRY_POLICY, SAFE_METHODS
+from singleflight import SingleFlight
+
 
 DEFAULT_BASES = {
     "LISTINGS_API_BASE": "https://6ie3irwugc.execute-api.us-east-1.amazonaws.com/prod",
@@ -14,22 +28,173 @@ DEFAULT_BASES = {
     "PAYMENTS_PAGE_BASE": "https://d1pe03n554sxy3.cloudfront.net",
 }
 
+DEFAULT_POOL_SIZE = int(os.getenv("AGENTTIKI_POOL_SIZE", "32"))
+DEFAULT_POOL_IDLE_SECONDS = float(os.getenv("AGENTTIKI_POOL_IDLE_SECONDS", "300"))
+DEFAULT_COALESCE = os.getenv("AGENTTIKI_COALESCE_GETS", "1") not in ("0", "false", "no")
+
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+def resolve_bases():
+    listings = os.getenv("LISTINGS_API_BASE", DEFAULT_BASES["LISTINGS_API_BASE"]).rstrip("/")
+    contracts = os.getenv("CONTRACTS_API_BASE", DEFAULT_BASES["CONTRACTS_API_BASE"]).rstrip("/")
+    return {
+        "LISTINGS_API_BASE": listings,
+        "CONTRACTS_API_BASE": contracts,
+        "NEGOTIATION_API_BASE": os.getenv("NEGOTIATION_API_BASE", listings).rstrip("/"),
+        "ACTORS_API_BASE": os.getenv("ACTORS_API_BASE", listings).rstrip("/"),
+        "CREDITS_API_BASE": os.getenv("CREDITS_API_BASE", listings).rstrip("/"),
+        "PAYMENTS_API_BASE": os.getenv("PAYMENTS_API_BASE", contracts).rstrip("/"),
+        "PAYMENTS_PAGE_BASE": os.getenv("PAYMENTS_PAGE_BASE", DEFAULT_BASES["PAYMENTS_PAGE_BASE"]).rstrip("/"),
+    }
+
+
+def extract_request_id(headers):
+    return (
+        headers.get("apigw-requestid")
+        or headers.get("Apigw-Requestid")
+        or headers.get("x-amzn-requestid")
+        or headers.get("X-Amzn-Requestid")
+    )
+
+
+def _body_snippet(content, limit=300):
+    if isinstance(content, bytes):
+        return content[:limit].decode("utf-8", errors="replace")
+    return str(content or "")[:limit]
+
+
+def _http_message(status_code, *details):
+    return ": ".join([f"HTTP {status_code}"] + [detail for detail in details if detail])
 
-class AgentTikiClient:
-    def __init__(self, timeout=30):
-        listings = os.getenv("LISTINGS_API_BASE", DEFAULT_BASES["LISTINGS_API_BASE"]).rstrip("/")
-        contracts = os.getenv("CONTRACTS_API_BASE", DEFAULT_BASES["CONTRACTS_API_BASE"]).rstrip("/")
-        self.bases = {
-            "LISTINGS_API_BASE": listings,
-            "CONTRACTS_API_BASE": contracts,
-            "NEGOTIATION_API_BASE": os.getenv("NEGOTIATION_API_BASE", listings).rstrip("/"),
-            "ACTORS_API_BASE": os.getenv("ACTORS_API_BASE", listings).rstrip("/"),
-            "CREDITS_API_BASE": os.getenv("CREDITS_API_BASE", listings).rstrip("/"),
-            "PAYMENTS_API_BASE": os.getenv("PAYMENTS_API_BASE", contracts).rstrip("/"),
-            "PAYMENTS_PAGE_BASE": os.getenv("PAYMENTS_PAGE_BASE", DEFAULT_BASES["PAYMENTS_PAGE_BASE"]).rstrip("/"),
+
+def parse_response(status_code, headers, content):
+    request_id = extract_request_id(headers)
+    try:
+        payload = codec.loads(content)
+    except Exception:
+        payload = {
+            "error": {
+                "code": "HTTP_ERROR",
+                "message": _http_message(status_code, "non-JSON response", _body_snippet(content)),
+            }
+        }
+        if request_id:
+            payload["error"]["request_id"] = request_id
+    if status_code >= 400:
+        if isinstance(payload, dict) and "error" in payload:
+            if isinstance(payload["error"], dict):
+                payload["error"].setdefault("status_code", status_code)
+                if request_id:
+                    payload["error"].setdefault("request_id", request_id)
+                _add_retry_after(payload["error"], headers)
+            return payload
+        backend_message = payload.get("message") if isinstance(payload, dict) else None
+        error = {
+            "code": "HTTP_ERROR",
+            "message": _http_message(status_code, backend_message or _body_snippet(content)),
+            "status_code": status_code,
+            "request_id": request_id,
+        }
+        _add_retry_after(error, headers)
+        return {"error": error}
+    return payload
+
+
+def not_modified_error(headers):
+    """Envelope for a ``304`` that no cache entry can answer."""
+    return {
+        "error": {
+            "code": "HTTP_ERROR",
+            "message": "HTTP 304: not modified, but no cached copy is held",
+            "status_code": 304,
+            "request_id": extract_request_id(headers),
         }
+    }
+
+
+def _add_retry_after(error, headers):
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return
+    try:
+        error.setdefault("retry_after", max(0.0, float(value)))
+    except ValueError:
+        # HTTP-date form; the retry policy falls back to its own backoff.
+        pass
+
+
+def _bytes_received(response, streamed=False):
+    # Streamed bodies are not read yet; fall back to the advertised length.
+    if not streamed:
+        return len(response.content or b"")
+    try:
+        return int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+def json_or_error(response):
+    return parse_response(response.status_code, response.headers, response.content)
+
+
+class BaseClient:
+    def __init__(
+        self,
+        timeout=30,
+        bases=None,
+        retry_policy=None,
+        http_cache=None,
+        coalesce=DEFAULT_COALESCE,
+        rate_limits=None,
+        breakers=None,
+    ):
+        self.bases = dict(bases) if bases else resolve_bases()
         self.timeout = timeout
-        self.session = requests.Session()
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+        self.http_cache = http_cache or DEFAULT_HTTP_CACHE
+        self.coalesce = coalesce
+        self.rate_limits = rate_limits or rate_limiters
+        self.breakers = breakers or circuit_breakers
+        self.before_hooks = []
+        self.after_hooks = [request_metrics.record]
+
+    def add_hook(self, before=None, after=None):
+        """Register ``before(request)`` and/or ``after(request, response)``.
+
+        ``request`` is a dict with method, base_name, path, endpoint (the
+        templated path), url, headers (mutable) and bytes_out. ``response``
+        has status_code, request_id, bytes_in, timings and error.
+        """
+        if before is not None:
+            self.before_hooks.append(before)
+        if after is not None:
+            self.after_hooks.append(after)
+
+    def before_request(self, method, base_name, path, headers, body):
+        request = {
+            "method": method.upper(),
+            "base_name": base_name,
+            "path": path,
+            "endpoint": template_path(path),
+            "url": self.url(base_name, path),
+            "headers": headers,
+            "bytes_out": len(body) if isinstance(body, (bytes, bytearray, str)) else 0,
+        }
+        for hook in self.before_hooks:
+            hook(request)
+        return request
+
+    def after_request(self, request, status_code=None, headers=None, bytes_in=0, timings=None, error=None):
+        response = {
+            "status_code": status_code,
+            "request_id": extract_request_id(headers) if headers is not None else None,
+            "bytes_in": bytes_in,
+            "timings": timings or {},
+            "error": error,
+        }
+        for hook in self.after_hooks:
+            hook(request, response)
 
     def auth_headers(self, api_key, content_type=True):
         headers = {"Authorization": f"Bearer {api_key}"}
@@ -40,51 +205,314 @@ class AgentTikiClient:
     def url(self, base_name, path):
         return urljoin(self.bases[base_name] + "/", path.lstrip("/"))
 
-    def request_json(self, method, base_name, path, api_key=None, **kwargs):
+    def prepare_headers(self, api_key, kwargs):
         headers = kwargs.pop("headers", {})
         if api_key:
-            merged = self.auth_headers(api_key, content_type="json" in kwargs)
+            merged = self.auth_headers(api_key, content_type=False)
             merged.update(headers)
             headers = merged
-        response = self.session.request(
-            method,
+        return headers
+
+    def encode_json_body(self, kwargs):
+        # Serialize once up front so retries resend the same bytes and the
+        # HTTP library does not encode the body again.
+        if "json" not in kwargs:
+            return
+        body = kwargs.pop("json")
+        if body is None:
+            return
+        kwargs["data"], gzipped = gzip_request_body(codec.dumps_bytes(body))
+        headers = dict(kwargs.get("headers") or {})
+        if not any(name.lower() == "content-type" for name in headers):
+            headers["Content-Type"] = "application/json"
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+        kwargs["headers"] = headers
+
+    def apply_idempotency_key(self, kwargs, idempotency_key):
+        # A keyed POST is safe to resend after a timeout or 5xx, so it is
+        # retried like a GET.
+        if not idempotency_key:
+            return False
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **{IDEMPOTENCY_HEADER: idempotency_key})
+        return True
+
+    def cache_key(self, api_key, base_name, path):
+        return (api_key, self.url(base_name, path))
+
+    def apply_validators(self, kwargs, cache_key):
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **self.http_cache.validators(cache_key))
+
+    def coalesce_key(self, method, base_name, path, api_key, cache, kwargs):
+        # Only bodiless safe reads are shared; anything else may differ per caller.
+        if not self.coalesce or method.upper() not in SAFE_METHODS:
+            return None
+        if "json" in kwargs or "data" in kwargs:
+            return None
+        return (
+            method.upper(),
             self.url(base_name, path),
-            headers=headers,
-            timeout=kwargs.pop("timeout", self.timeout),
-            **kwargs,
+            api_key,
+            bool(cache),
+            repr(sorted((kwargs.get("params") or {}).items())),
+            repr(sorted((kwargs.get("headers") or {}).items())),
         )
-        request_id = (
-            response.headers.get("apigw-requestid")
-            or response.headers.get("Apigw-Requestid")
-            or response.headers.get("x-amzn-requestid")
-            or response.headers.get("X-Amzn-Requestid")
+
+    def coalescing_stats(self):
+        return self.singleflight.stats()
+
+    def cached_result(self, cache_key, status_code, headers, content):
+        # A 304 or a byte-identical body reuses the cached parse. A 304 for
+        # an entry evicted since its validators went out gives ``None``, so
+        # the caller can ask again without them.
+        cached = self.http_cache.lookup(cache_key, status_code, content)
+        if cached is not None:
+            return cached
+        if status_code == 304:
+            return None
+        payload = parse_response(status_code, headers, content)
+        return self.http_cache.store(cache_key, headers, content, payload)
+
+
+class AgentTikiClient(BaseClient):
+    def __init__(
+        self,
+        timeout=30,
+        pool_size=DEFAULT_POOL_SIZE,
+        bases=None,
+        retry_policy=None,
+        http_cache=None,
+        coalesce=DEFAULT_COALESCE,
+        rate_limits=None,
+        breakers=None,
+    ):
+        super().__init__(
+            timeout=timeout,
+            bases=bases,
+            retry_policy=retry_policy,
+            http_cache=http_cache,
+            coalesce=coalesce,
+            rate_limits=rate_limits,
+            breakers=breakers,
         )
+        self.session = requests.Session()
+        self.singleflight = SingleFlight()
+        # One adapter for every scheme so API Gateway, CloudFront and presigned
+        # S3 hosts all keep their connections warm between calls.
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        install_from_env(self.session, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.retired = False
+        self._use_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    @contextlib.contextmanager
+    def leased(self):
+        """Mark the client busy so idle eviction leaves its session open.
+
+        ``request`` holds a lease for every call; code that drives
+        ``session`` directly (streamed uploads and downloads) takes one too.
+        """
+        with self._use_lock:
+            self.in_use += 1
         try:
-            payload = response.json()
-        except Exception:
-            payload = {
-                "error": {
-                    "code": "HTTP_ERROR",
-                    "message": f"HTTP {response.status_code}: non-JSON response",
-                }
-            }
-        if response.status_code >= 400:
-            if isinstance(payload, dict) and "error" in payload:
-                if isinstance(payload["error"], dict):
-                    payload["error"].setdefault("status_code", response.status_code)
-                    if request_id:
-                        payload["error"].setdefault("request_id", request_id)
-                return payload
-            return {
-                "error": {
-                    "code": "HTTP_ERROR",
-                    "message": f"HTTP {response.status_code}",
-                    "status_code": response.status_code,
-                    "request_id": request_id,
-                }
-            }
-        return payload
+            yield self
+        finally:
+            with self._use_lock:
+                self.in_use -= 1
+                self.last_used = time.monotonic()
+                if self.retired and not self.in_use:
+                    self.close()
+
+    def retire(self):
+        """Close now if unleased, otherwise when the last lease is released."""
+        with self._use_lock:
+            self.retired = True
+            if not self.in_use:
+                self.close()
+
+    def close_if_idle(self, now, idle_timeout):
+        """Close and return ``True`` when unleased for ``idle_timeout`` seconds."""
+        with self._use_lock:
+            if self.in_use or now - self.last_used <= idle_timeout:
+                return False
+            self.close()
+            return True
+
+    def request(self, method, base_name, path, api_key=None, **kwargs):
+        with self.leased():
+            return self._request(method, base_name, path, api_key=api_key, **kwargs)
+
+    def _request(self, method, base_name, path, api_key=None, **kwargs):
+        self.encode_json_body(kwargs)
+        headers = self.prepare_headers(api_key, kwargs)
+        request = self.before_request(method, base_name, path, headers, kwargs.get("data"))
+        take_connect_timings()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                request["url"],
+                headers=request["headers"],
+                timeout=kwargs.pop("timeout", self.timeout),
+                **kwargs,
+            )
+        except Exception as error:
+            timings = take_connect_timings()
+            timings["total"] = time.perf_counter() - started
+            self.after_request(request, timings=timings, error=error)
+            raise
+        timings = take_connect_timings()
+        timings["ttfb"] = response.elapsed.total_seconds()
+        timings["total"] = time.perf_counter() - started
+        self.after_request(request, response.status_code, response.headers, _bytes_received(response, kwargs.get("stream")), timings)
+        return response
+
+    def request_json(
+        self,
+        method,
+        base_name,
+        path,
+        api_key=None,
+        idempotent=False,
+        idempotency_key=None,
+        cache=False,
+        **kwargs,
+    ):
+        idempotent = self.apply_idempotency_key(kwargs, idempotency_key) or idempotent
+        flight_key = self.coalesce_key(method, base_name, path, api_key, cache, kwargs)
+        self.encode_json_body(kwargs)
+        if cache and method.upper() == "GET":
+            send = lambda: self._cached_get(base_name, path, api_key, dict(kwargs))
+        else:
+            send = lambda: json_or_error(self.request(method, base_name, path, api_key=api_key, **kwargs))
+        limiter = self.rate_limits.get(base_name)
+        if limiter is not None:
+            send = self._rate_limited(limiter, send)
+        breaker = self.breakers.get(base_name, path)
+        if breaker is not None:
+            send = self._guarded(breaker, send)
+        run = lambda: self.retry_policy.run(
+            method,
+            send,
+            actor_key=api_key,
+            idempotent=idempotent,
+            transient=TRANSIENT_ERRORS,
+        )
+        if flight_key is None:
+            return run()
+        return self.singleflight.do(flight_key, run)
+
+    def _rate_limited(self, limiter, send):
+        def attempt():
+            limiter.acquire()
+            result = send()
+            limiter.observe(result)
+            return result
+
+        return attempt
+
+    def _guarded(self, breaker, send):
+        def attempt():
+            rejected = breaker.before_call()
+            if rejected is not None:
+                return rejected
+            try:
+                result = send()
+            except Exception:
+                breaker.record(failed=True)
+                raise
+            except BaseException:
+                breaker.abandon()
+                raise
+            breaker.record(result)
+            return result
+
+        return attempt
+
+    def _cached_get(self, base_name, path, api_key, kwargs):
+        cache_key = self.cache_key(api_key, base_name, path)
+        for validate in (True, False):
+            options = dict(kwargs)
+            if validate:
+                self.apply_validators(options, cache_key)
+            response = self.request("GET", base_name, path, api_key=api_key, **options)
+            result = self.cached_result(cache_key, response.status_code, response.headers, response.content)
+            if result is not None:
+                return result
+        return not_modified_error(response.headers)
+
+
+class ClientRegistry:
+    """Process-wide cache of pooled clients, one per resolved base URL set.
+
+    Clients unused for longer than ``idle_timeout`` seconds are closed on the
+    next lookup so long-lived agents do not hold stale keep-alive sockets. A
+    client with a request or lease in progress is never evicted, and one
+    dropped by ``configure`` or ``clear`` while in use is closed when its
+    last lease ends.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_POOL_IDLE_SECONDS):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, timeout=30):
+        bases = resolve_bases()
+        key = (tuple(sorted(bases.items())), timeout)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now, keep=key)
+            client = self._clients.get(key)
+            if client is None:
+                client = AgentTikiClient(timeout=timeout, pool_size=self.pool_size, bases=bases)
+                self._clients[key] = client
+            with client._use_lock:
+                client.last_used = max(client.last_used, now)
+            return client
+
+    def configure(self, pool_size=None, idle_timeout=None):
+        with self._lock:
+            if pool_size is not None and pool_size != self.pool_size:
+                self.pool_size = pool_size
+                self._close_all()
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+
+    def clear(self):
+        with self._lock:
+            self._close_all()
+
+    def _evict_idle(self, now, keep=None):
+        if not self.idle_timeout or self.idle_timeout <= 0:
+            return
+        for key, client in list(self._clients.items()):
+            if key != keep and client.close_if_idle(now, self.idle_timeout):
+                del self._clients[key]
+
+    def _close_all(self):
+        for client in self._clients.values():
+            client.retire()
+        self._clients.clear()
+
+
+_REGISTRY = ClientRegistry()
+
+
+def get_client(timeout=30):
+    return _REGISTRY.get(timeout=timeout)
+
+
+def configure_client_pool(pool_size=None, idle_timeout=None):
+    _REGISTRY.configure(pool_size=pool_size, idle_timeout=idle_timeout)
 
 
-def get_client():
-    return AgentTikiClient()
+def close_clients():
+    _REGISTRY.clear()
@@ -1,6 +1,7 @@
-import json
 from pathlib import Path
 
+import codec
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
 
 
@@ -18,13 +19,24 @@ def register_actor():
     )
 
 
+async def register_actor_async():
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "ACTORS_API_BASE",
+        "/actors/v1",
+        headers={"Content-Type": "application/json"},
+        json={"action": "register"},
+    )
+
+
 def save_credentials(path, actor_id, api_key):
     target = Path(path)
-    target.write_text(json.dumps({"actor_id": actor_id, "api_key": api_key}, indent=2) + "\n")
+    target.write_text(codec.dumps_pretty({"actor_id": actor_id, "api_key": api_key}) + "\n", encoding="utf-8")
 
 
 def load_credentials(path):
     target = Path(path)
     if not target.exists():
         return None
-    return json.loads(target.read_text())
+    return codec.loads(target.read_bytes())
@@ -0,0 +1,232 @@
+import atexit
+import os
+import shutil
+import threading
+import time
+
+import codec
+from hashing import file_hash
+
+
+DEFAULT_BLOB_STORE = os.getenv("AGENTTIKI_BLOB_STORE", "")
+DEFAULT_BLOB_STORE_MAX_BYTES = int(os.getenv("AGENTTIKI_BLOB_STORE_MAX_BYTES", str(1 << 30)))
+DEFAULT_BLOB_STORE_MAX_AGE = float(os.getenv("AGENTTIKI_BLOB_STORE_MAX_AGE_SECONDS", "0"))
+
+# Remembered (path, stat) -> sha256 pairs; old ones are dropped first.
+MAX_PATH_ENTRIES = 4096
+
+
+def backend_has_content(file_meta, upload):
+    """Reuse hook: the upload-intent entry says the backend already holds it."""
+    return bool(file_meta.get("exists"))
+
+
+class BlobStore:
+    """Content-addressed copy of delivered files, keyed by SHA-256.
+
+    Blobs live under ``root/ab/abcdef...``; ``index.json`` next to them keeps
+    their size, last use and the uploads (contract, snapshot, S3 key) that
+    carried them, plus a stat-keyed hash cache so a file that has not changed
+    since it was last hashed is never read again.
+
+    ``reuse_hooks`` are called as ``hook(file_meta, last_upload)`` for each
+    upload-intent entry; one returning true means the backend already holds
+    the content and the PUT is skipped. ``gc`` keeps the store under
+    ``max_bytes``, evicting least recently used blobs first, and drops blobs
+    unused for ``max_age`` seconds when that is set.
+
+    Changes to the index stay in memory until ``flush`` (or ``gc``) writes it
+    back atomically; the delivery pipeline flushes once per manifest.
+    Concurrent processes sharing a root may lose each other's index updates,
+    which only costs a re-hash.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_BLOB_STORE_MAX_BYTES, max_age=DEFAULT_BLOB_STORE_MAX_AGE, reuse_hooks=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.reuse_hooks = list(reuse_hooks) if reuse_hooks is not None else [backend_has_content]
+        self._index_path = os.path.join(root, "index.json")
+        self._lock = threading.RLock()
+        self._counters = {"hash_hits": 0, "hash_misses": 0, "stored": 0, "deduplicated": 0, "reused": 0, "evicted": 0}
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load()
+        self._dirty = False
+
+    def path_for(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def has(self, sha256):
+        with self._lock:
+            return sha256 in self._index["blobs"] and os.path.exists(self.path_for(sha256))
+
+    def hash_file(self, path):
+        """SHA-256 of ``path``, from the cache when its size, mtime and inode match."""
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        with self._lock:
+            cached = self._index["paths"].get(path)
+            if cached is not None and cached["stat"] == signature:
+                self._counters["hash_hits"] += 1
+                cached["seen"] = time.time()
+                return cached["sha256"]
+        sha256 = file_hash(path).hexdigest()
+        with self._lock:
+            self._counters["hash_misses"] += 1
+            self._remember_path(path, signature, sha256)
+            self._dirty = True
+        return sha256
+
+    def put(self, path, sha256=None):
+        """Copy ``path`` into the store unless its content is already there."""
+        sha256 = sha256 or self.hash_file(path)
+        target = self.path_for(sha256)
+        with self._lock:
+            if self.has(sha256):
+                self._counters["deduplicated"] += 1
+                self._touch(sha256)
+                return sha256
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(path, temporary)
+        os.replace(temporary, target)
+        with self._lock:
+            entry = self._index["blobs"].setdefault(sha256, {"uploads": []})
+            entry["size"] = os.path.getsize(target)
+            self._counters["stored"] += 1
+            self._touch(sha256)
+            self._gc_locked()
+        return sha256
+
+    def materialize(self, sha256, destination):
+        """Copy a stored blob to ``destination``; ``False`` if it is not stored."""
+        if not self.has(sha256):
+            return False
+        directory = os.path.dirname(destination)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(self.path_for(sha256), destination)
+        with self._lock:
+            self._touch(sha256)
+        return True
+
+    def record_upload(self, sha256, file_meta, contract_id=None):
+        """Note that ``sha256`` was uploaded as the upload-intent ``file_meta``."""
+        upload = {
+            "contract_id": contract_id or file_meta.get("contract_id"),
+            "snapshot_id": file_meta.get("snapshot_id"),
+            "s3_key": file_meta.get("s3_key"),
+            "path": file_meta.get("path"),
+            "uploaded_at": time.time(),
+        }
+        with self._lock:
+            entry = self._index["blobs"].get(sha256)
+            if entry is None:
+                return
+            entry["uploads"] = (entry["uploads"] + [upload])[-8:]
+            self._touch(sha256)
+
+    def last_upload(self, sha256):
+        with self._lock:
+            entry = self._index["blobs"].get(sha256)
+            return dict(entry["uploads"][-1]) if entry and entry["uploads"] else None
+
+    def can_skip(self, file_meta):
+        """True when a reuse hook says this entry needs no upload."""
+        sha256 = file_meta.get("sha256")
+        upload = self.last_upload(sha256) if sha256 else None
+        if any(hook(file_meta, upload) for hook in self.reuse_hooks):
+            with self._lock:
+                self._counters["reused"] += 1
+            return True
+        return False
+
+    def gc(self, max_bytes=None, max_age=None):
+        """Evict blobs until the store fits; returns the number removed."""
+        with self._lock:
+            removed = self._gc_locked(max_bytes, max_age)
+            self._dirty = self._dirty or bool(removed)
+            self.flush()
+            return removed
+
+    def flush(self):
+        """Write the index back if it changed since the last flush."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._save()
+            self._dirty = False
+
+    def stats(self):
+        with self._lock:
+            blobs = self._index["blobs"]
+            return dict(self._counters, blobs=len(blobs), bytes=sum(entry.get("size", 0) for entry in blobs.values()))
+
+    def _gc_locked(self, max_bytes=None, max_age=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age is None else max_age
+        blobs = self._index["blobs"]
+        by_age = sorted(blobs, key=lambda sha256: blobs[sha256].get("last_used", 0))
+        total = sum(entry.get("size", 0) for entry in blobs.values())
+        cutoff = time.time() - max_age if max_age else None
+        removed = 0
+        for sha256 in by_age:
+            entry = blobs[sha256]
+            expired = cutoff is not None and entry.get("last_used", 0) < cutoff
+            if not expired and (not max_bytes or total <= max_bytes):
+                break
+            try:
+                os.remove(self.path_for(sha256))
+            except FileNotFoundError:
+                pass
+            total -= entry.get("size", 0)
+            del blobs[sha256]
+            removed += 1
+        self._counters["evicted"] += removed
+        return removed
+
+    def _touch(self, sha256):
+        self._index["blobs"][sha256]["last_used"] = time.time()
+        self._dirty = True
+
+    def _remember_path(self, path, signature, sha256):
+        paths = self._index["paths"]
+        paths[path] = {"stat": signature, "sha256": sha256, "seen": time.time()}
+        if len(paths) > MAX_PATH_ENTRIES:
+            for stale in sorted(paths, key=lambda key: paths[key]["seen"])[: len(paths) - MAX_PATH_ENTRIES]:
+                del paths[stale]
+
+    def _load(self):
+        try:
+            with open(self._index_path, "rb") as file_handle:
+                index = codec.loads(file_handle.read())
+        except (OSError, ValueError):
+            index = {}
+        if not isinstance(index, dict):
+            index = {}
+        index.setdefault("blobs", {})
+        index.setdefault("paths", {})
+        return index
+
+    def _save(self):
+        temporary = f"{self._index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file_handle:
+            file_handle.write(codec.dumps_bytes(self._index))
+        os.replace(temporary, self._index_path)
+
+
+_DEFAULT = {}
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_blob_store():
+    """Process-wide store at ``AGENTTIKI_BLOB_STORE``, or ``None`` when unset."""
+    if not DEFAULT_BLOB_STORE:
+        return None
+    with _DEFAULT_LOCK:
+        store = _DEFAULT.get(DEFAULT_BLOB_STORE)
+        if store is None:
+            store = _DEFAULT[DEFAULT_BLOB_STORE] = BlobStore(os.path.expanduser(DEFAULT_BLOB_STORE))
+            atexit.register(store.flush)
+        return store
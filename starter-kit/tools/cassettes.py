@@ -0,0 +1,259 @@
+import base64
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.parse
+from collections import deque
+
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+import codec
+from metrics import TimedHTTPAdapter, template_path
+
+
+DEFAULT_CASSETTE = os.getenv("AGENTTIKI_CASSETTE", "")
+DEFAULT_CASSETTE_MODE = os.getenv("AGENTTIKI_CASSETTE_MODE", "replay")
+DEFAULT_CASSETTE_SPEED = float(os.getenv("AGENTTIKI_CASSETTE_SPEED", "0"))
+
+# Per-connection and per-response noise that would only bloat a cassette.
+# Bodies are stored decoded, so their content encoding goes too.
+_DROPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "date",
+    "keep-alive",
+    "server",
+    "transfer-encoding",
+}
+
+
+def exchange_key(method, url, body_sha256):
+    """``(method, templated path, body hash)``; hosts and query strings are ignored."""
+    return (method.upper(), template_path(urllib.parse.urlsplit(url).path), body_sha256)
+
+
+def body_sha256(body):
+    if body is None:
+        return ""
+    if hasattr(body, "read"):
+        # Uploads stream from a file handle; hash it and rewind for the send.
+        position = body.tell()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: body.read(1 << 20), b""):
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        body.seek(position)
+        return digest.hexdigest()
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+class Cassette:
+    """Recorded HTTP exchanges, one JSON object per line.
+
+    While recording, each exchange is appended as soon as its response has
+    been read, so a killed agent still leaves a usable file. On replay the
+    file is indexed by ``exchange_key`` and each key serves its exchanges in
+    recorded order; the last one is repeated once the queue runs dry, which
+    is what a poll loop that outlives the recording expects. Files ending in
+    ``.gz`` are read and written gzip-compressed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = {}
+        self._loose = {}
+        self._counters = {"recorded": 0, "exchanges": 0, "served": 0, "repeated": 0, "loose": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def load(self):
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rb") as file_handle:
+            exchanges = [codec.loads(line) for line in file_handle if line.strip()]
+        with self._lock:
+            self._index.clear()
+            self._loose.clear()
+            for exchange in exchanges:
+                key = exchange_key(exchange["method"], exchange["url"], exchange["body_sha256"])
+                self._index.setdefault(key, deque()).append(exchange)
+                self._loose.setdefault(key[:2], deque()).append(exchange)
+            self._counters["exchanges"] = len(exchanges)
+        return self
+
+    def append(self, exchange):
+        line = codec.dumps_bytes(exchange) + b"\n"
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with opener(self.path, "ab") as file_handle:
+                file_handle.write(line)
+            self._counters["recorded"] += 1
+
+    def take(self, method, url, body_sha256):
+        """Next recorded exchange for this request, or ``None``.
+
+        Falls back to method and templated path alone when no exchange has
+        the same body, so a changed timestamp in a payload does not break a
+        replay; those are counted as ``loose``.
+        """
+        key = exchange_key(method, url, body_sha256)
+        with self._lock:
+            exchange = _next_exchange(self._index.get(key))
+            counter = "served"
+            if exchange is None:
+                exchange = _next_exchange(self._loose.get(key[:2]))
+                counter = "loose"
+            if exchange is None:
+                self._counters["misses"] += 1
+                return None
+            if exchange.get("_served"):
+                counter = "repeated"
+            exchange["_served"] = True
+            self._counters[counter] += 1
+            return exchange
+
+    def stats(self):
+        """Counters for regression checks.
+
+        ``unused`` exchanges mean the code now makes fewer requests than when
+        recorded; ``repeated``, ``loose`` and ``misses`` mean it makes more or
+        different ones.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            unused = sum(1 for queue in self._index.values() for exchange in queue if not exchange.get("_served"))
+        counters["unused"] = unused
+        return counters
+
+
+class RecordingAdapter(TimedHTTPAdapter):
+    def __init__(self, cassette, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        digest = body_sha256(request.body)
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        content = response.content
+        self.cassette.append(
+            {
+                "method": request.method,
+                "url": request.url,
+                "body_sha256": digest,
+                "status": response.status_code,
+                "headers": {
+                    name: value for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS
+                },
+                **_encode_body(content),
+                "elapsed": round(time.perf_counter() - started, 6),
+            }
+        )
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Answers from a cassette without touching the network.
+
+    ``speed`` scales recorded latency: ``1`` replays original timing, ``10``
+    ten times faster, and ``0`` or ``None`` not at all. Requests missing from
+    the cassette get a ``599`` response rather than going out.
+    """
+
+    def __init__(self, cassette, speed=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cassette = cassette
+        self.speed = speed
+
+    def send(self, request, **kwargs):
+        exchange = self.cassette.take(request.method, request.url, body_sha256(request.body))
+        if exchange is None:
+            status, headers, content = 599, {"Content-Type": "text/plain"}, b"not in cassette"
+        else:
+            status, headers, content = exchange["status"], exchange["headers"], _decode_body(exchange)
+            if self.speed:
+                time.sleep(exchange.get("elapsed", 0.0) / self.speed)
+        headers = dict(headers, **{"Content-Length": str(len(content))})
+        raw = HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=status,
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+def install(session, cassette, mode, speed=None, **adapter_kwargs):
+    """Mount a recording or replaying adapter for every scheme on ``session``.
+
+    ``adapter_kwargs`` (pool sizes) apply to the recording adapter.
+    """
+    if mode == "record":
+        adapter = RecordingAdapter(cassette, **adapter_kwargs)
+    elif mode == "replay":
+        adapter = ReplayAdapter(cassette, speed=speed)
+    else:
+        raise ValueError(f"unknown cassette mode {mode!r}")
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
+
+
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def install_from_env(session, **adapter_kwargs):
+    """Apply ``AGENTTIKI_CASSETTE`` to a client session, if it is set.
+
+    Every client in the process shares one cassette per path, so replay
+    order holds across clients.
+    """
+    if not DEFAULT_CASSETTE:
+        return None
+    with _SHARED_LOCK:
+        cassette = _SHARED.get(DEFAULT_CASSETTE)
+        if cassette is None:
+            cassette = Cassette(DEFAULT_CASSETTE)
+            if DEFAULT_CASSETTE_MODE == "replay":
+                cassette.load()
+            _SHARED[DEFAULT_CASSETTE] = cassette
+    install(session, cassette, DEFAULT_CASSETTE_MODE, speed=DEFAULT_CASSETTE_SPEED, **adapter_kwargs)
+    return cassette
+
+
+def cassette_stats():
+    """``Cassette.stats()`` for every cassette installed from the environment."""
+    with _SHARED_LOCK:
+        cassettes = dict(_SHARED)
+    return {path: cassette.stats() for path, cassette in cassettes.items()}
+
+
+def _next_exchange(queue):
+    # Both indexes share exchange objects, so skip ones the other served.
+    if not queue:
+        return None
+    while len(queue) > 1 and queue[0].get("_served"):
+        queue.popleft()
+    return queue[0]
+
+
+def _encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(exchange):
+    if "body_b64" in exchange:
+        return base64.b64decode(exchange["body_b64"])
+    return exchange.get("body", "").encode("utf-8")
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+
+BACKEND_UNAVAILABLE = "BACKEND_UNAVAILABLE"
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("AGENTTIKI_BREAKER_FAILURES", "5"))
+DEFAULT_RESET_SECONDS = float(os.getenv("AGENTTIKI_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+
+def endpoint_family(path):
+    """``/contracts/v1/abc/delivery/latest`` -> ``contracts/v1``."""
+    segments = [segment for segment in path.split("?", 1)[0].split("/") if segment]
+    return "/".join(segments[:2])
+
+
+def is_backend_failure(result):
+    # 429 is the rate limiter's job; other 4xx prove the backend is alive.
+    error = result.get("error") if isinstance(result, dict) else None
+    if not isinstance(error, dict):
+        return False
+    return (error.get("status_code") or 0) >= 500
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive backend failures.
+
+    Once open, calls are rejected until ``reset_seconds`` have passed. Then
+    exactly one half-open probe is let through: success closes the circuit,
+    failure opens it for another ``reset_seconds``.
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Return ``None`` to proceed, or a ``BACKEND_UNAVAILABLE`` envelope."""
+        with self._lock:
+            if self.state == CLOSED:
+                return None
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return None
+            self.rejected += 1
+            return self._unavailable(now)
+
+    def record(self, result=None, failed=False):
+        failed = failed or is_backend_failure(result)
+        with self._lock:
+            self._probe_in_flight = False
+            if not failed:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def abandon(self):
+        # The call was cancelled before the backend answered.
+        with self._lock:
+            self._probe_in_flight = False
+
+    def retry_after(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.opened_at + self.reset_seconds - now)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+    def _unavailable(self, now):
+        retry_after = round(self.retry_after(now), 3)
+        return {
+            "error": {
+                "code": BACKEND_UNAVAILABLE,
+                "message": f"{self.name} is unavailable; circuit {self.state.lower()}, retry in {retry_after}s",
+                "retry_after": retry_after,
+            }
+        }
+
+
+class CircuitBreakerRegistry:
+    """Breakers keyed by (base name, endpoint family), shared process-wide."""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.failure_threshold > 0
+
+    def get(self, base_name, path):
+        if not self.enabled:
+            return None
+        key = (base_name, endpoint_family(path))
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    f"{base_name} {key[1]}",
+                    failure_threshold=self.failure_threshold,
+                    reset_seconds=self.reset_seconds,
+                )
+                self._breakers[key] = breaker
+            return breaker
+
+    def configure(self, failure_threshold=None, reset_seconds=None):
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = failure_threshold
+            if reset_seconds is not None:
+                self.reset_seconds = reset_seconds
+            self._breakers.clear()
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {breaker.name: breaker.stats() for breaker in breakers.values()}
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,61 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+# AGENTTIKI_JSON_CODEC=json forces the stdlib codec, e.g. to compare output.
+_PREFERRED = os.getenv("AGENTTIKI_JSON_CODEC", "auto").lower()
+
+if orjson is not None and _PREFERRED in ("auto", "orjson"):
+    CODEC_NAME = "orjson"
+elif ujson is not None and _PREFERRED in ("auto", "ujson"):
+    CODEC_NAME = "ujson"
+else:
+    CODEC_NAME = "json"
+
+
+def loads(data):
+    """Decode JSON from ``str`` or UTF-8 ``bytes``."""
+    if CODEC_NAME == "orjson":
+        return orjson.loads(data)
+    if CODEC_NAME == "ujson":
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj):
+    """Compact UTF-8 encoding, used for request bodies."""
+    try:
+        if CODEC_NAME == "orjson":
+            return orjson.dumps(obj)
+        if CODEC_NAME == "ujson":
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+    except (TypeError, OverflowError):
+        # Non-string keys and other values the fast codecs reject.
+        pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def dumps_pretty(obj):
+    """Two-space indented text for state files and debug output."""
+    try:
+        if CODEC_NAME == "orjson":
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+        if CODEC_NAME == "ujson":
+            return ujson.dumps(obj, indent=2, ensure_ascii=False, escape_forward_slashes=False)
+    except (TypeError, OverflowError):
+        pass
+    return json.dumps(obj, indent=2, ensure_ascii=False)
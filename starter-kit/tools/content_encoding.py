@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import os
+import zlib
+
+from hashing import CHUNK_SIZE, HashingWriter
+
+try:
+    from compression import zstd as stdlib_zstd
+except ImportError:
+    stdlib_zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# off (default), auto (zstd when available, else gzip), zstd or gzip.
+DEFAULT_DELIVERY_COMPRESSION = os.getenv("AGENTTIKI_DELIVERY_COMPRESSION", "off").lower()
+DEFAULT_COMPRESSION_MIN_BYTES = int(os.getenv("AGENTTIKI_COMPRESSION_MIN_BYTES", "65536"))
+# Request bodies at least this large are sent gzip-encoded; 0 disables.
+DEFAULT_GZIP_REQUEST_BYTES = int(os.getenv("AGENTTIKI_GZIP_REQUEST_BYTES", "0"))
+
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+# What a corrupt or truncated compressed stream raises.
+DECODE_ERRORS = tuple(
+    error
+    for error in (
+        zlib.error,
+        ValueError,
+        getattr(stdlib_zstd, "ZstdError", None),
+        getattr(zstandard, "ZstdError", None),
+    )
+    if error is not None
+)
+# Delivery file metadata describing a compressed upload.
+METADATA_KEYS = ("content_encoding", "uncompressed_sha256", "uncompressed_size")
+
+
+def zstd_available():
+    return stdlib_zstd is not None or zstandard is not None
+
+
+def choose_codec(preference=DEFAULT_DELIVERY_COMPRESSION):
+    """``"zstd"``, ``"gzip"`` or ``None`` for a configured preference."""
+    preference = (preference or "off").lower()
+    if preference in ("off", "0", "false", "no", "none"):
+        return None
+    if preference in ("auto", "zstd") and zstd_available():
+        return "zstd"
+    return "gzip"
+
+
+def compressor(codec, level=None):
+    """Incremental compressor with ``compress(data)`` and ``flush()``."""
+    if codec == "gzip":
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+    if codec == "zstd" and stdlib_zstd is not None:
+        return stdlib_zstd.ZstdCompressor(level=level)
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+    raise ValueError(f"unsupported content encoding {codec!r}")
+
+
+def decompressor(codec):
+    """Incremental decompressor with ``decompress(data)``."""
+    if codec == "gzip":
+        return zlib.decompressobj(31)
+    if codec == "zstd" and stdlib_zstd is not None:
+        return stdlib_zstd.ZstdDecompressor()
+    if codec == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"unsupported content encoding {codec!r}")
+
+
+def compress_file(source_path, target_path, codec, level=None, chunk_size=CHUNK_SIZE):
+    """Compress a file in ``chunk_size`` steps, hashing both sides on the way.
+
+    Returns the delivery metadata: ``sha256``/``size`` of the compressed file
+    plus ``content_encoding``, ``uncompressed_sha256`` and ``uncompressed_size``.
+    """
+    engine = compressor(codec, level)
+    original = hashlib.sha256()
+    original_size = 0
+    with open(source_path, "rb") as source, HashingWriter.open(target_path) as target:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            original.update(chunk)
+            original_size += len(chunk)
+            target.write(engine.compress(chunk))
+        target.write(engine.flush())
+    return {
+        "sha256": target.hexdigest(),
+        "size": target.size,
+        "content_encoding": codec,
+        "uncompressed_sha256": original.hexdigest(),
+        "uncompressed_size": original_size,
+    }
+
+
+class DecompressingWriter:
+    """Writes the decompressed form of the bytes it is given to ``path``.
+
+    The decompressed bytes are hashed as they land, so a compressed download
+    is verified against its uncompressed hash without a second pass.
+    """
+
+    def __init__(self, path, codec):
+        self.codec = codec
+        self.engine = decompressor(codec)
+        self.writer = HashingWriter.open(path)
+
+    def write(self, data):
+        self.writer.write(self.engine.decompress(data))
+
+    def finish(self):
+        """Flush, sync and close; returns ``(sha256, size)`` of the output."""
+        if hasattr(self.engine, "flush"):
+            self.writer.write(self.engine.flush())
+        if getattr(self.engine, "eof", True) is False:
+            self.writer.close()
+            raise ValueError(f"truncated {self.codec} stream")
+        self.writer.flush()
+        os.fsync(self.writer.file_handle.fileno())
+        self.writer.close()
+        return self.writer.hexdigest(), self.writer.size
+
+    def close(self):
+        self.writer.close()
+
+
+def gzip_request_body(data, min_bytes=DEFAULT_GZIP_REQUEST_BYTES):
+    """``(body, True)`` gzip-encoded when ``data`` reaches ``min_bytes``."""
+    if not min_bytes or not isinstance(data, (bytes, bytearray)) or len(data) < min_bytes:
+        return data, False
+    # mtime=0 keeps the encoding byte-identical across retries.
+    return gzip.compress(bytes(data), compresslevel=6, mtime=0), True
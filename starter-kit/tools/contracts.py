@@ -1,17 +1,19 @@
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
 
 
-def get_contract(api_key, contract_id):
+def get_contract(api_key, contract_id, cache=False):
     client = get_client()
     return client.request_json(
         "GET",
         "CONTRACTS_API_BASE",
         f"/contracts/v1/{contract_id}",
         api_key=api_key,
+        cache=cache,
     )
 
 
-def transition_contract(api_key, contract_id, to_status):
+def transition_contract(api_key, contract_id, to_status, idempotency_key=None):
     client = get_client()
     return client.request_json(
         "POST",
@@ -24,6 +26,7 @@ def transition_contract(api_key, contract_id, to_status):
             "contract_id": contract_id,
             "to_status": to_status,
         },
+        idempotency_key=idempotency_key,
     )
 
 
@@ -46,3 +49,47 @@ def list_active_contracts(api_key, as_provider=True):
             "message": "No public buyer-side active-contract listing helper is included in this starter kit.",
         }
     }
+
+
+async def get_contract_async(api_key, contract_id, cache=False):
+    client = get_async_client()
+    return await client.request_json(
+        "GET",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}",
+        api_key=api_key,
+        cache=cache,
+    )
+
+
+async def transition_contract_async(api_key, contract_id, to_status, idempotency_key=None):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "CONTRACTS_API_BASE",
+        "/contracts/v1/transition",
+        api_key=api_key,
+        json={
+            "version": "v1",
+            "action": "transition",
+            "contract_id": contract_id,
+            "to_status": to_status,
+        },
+        idempotency_key=idempotency_key,
+    )
+
+
+async def list_provider_active_contracts_async(api_key):
+    client = get_async_client()
+    return await client.request_json(
+        "GET",
+        "CONTRACTS_API_BASE",
+        "/contracts/v1/provider?status=ACTIVE",
+        api_key=api_key,
+    )
+
+
+async def list_active_contracts_async(api_key, as_provider=True):
+    if as_provider:
+        return await list_provider_active_contracts_async(api_key)
+    return list_active_contracts(api_key, as_provider=False)
@@ -1,3 +1,4 @@
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
 
 
@@ -15,3 +16,19 @@ def create_topup_session(api_key, credits_amount):
         api_key=api_key,
         json={"credits_amount": int(credits_amount)},
     )
+
+
+async def get_balance_async(api_key):
+    client = get_async_client()
+    return await client.request_json("GET", "CREDITS_API_BASE", "/credits/v1/balance", api_key=api_key)
+
+
+async def create_topup_session_async(api_key, credits_amount):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "PAYMENTS_API_BASE",
+        "/payments/v1/create",
+        api_key=api_key,
+        json={"credits_amount": int(credits_amount)},
+    )
@@ -1,11 +1,14 @@
+import asyncio
+import functools
 from pathlib import Path
 
-import requests
-
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
+from downloads import download_file
+from uploads import upload_file
 
 
-def create_upload_intent(api_key, contract_id, delivery_type, files):
+def create_upload_intent(api_key, contract_id, delivery_type, files, idempotency_key=None):
     client = get_client()
     return client.request_json(
         "POST",
@@ -13,6 +16,7 @@ def create_upload_intent(api_key, contract_id, delivery_type, files):
         f"/contracts/v1/{contract_id}/delivery/upload-intent",
         api_key=api_key,
         json={"delivery_type": delivery_type, "files": files},
+        idempotency_key=idempotency_key,
     )
 
 
@@ -27,10 +31,99 @@ def confirm_delivery(api_key, contract_id, delivery_type, files):
     )
 
 
+def get_latest_delivery(api_key, contract_id, cache=False):
+    client = get_client()
+    return client.request_json(
+        "GET",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/latest",
+        api_key=api_key,
+        cache=cache,
+    )
+
+
 def put_file_to_presigned_url(upload_url, bytes_or_path, content_type="application/octet-stream"):
+    with get_client().leased() as client:
+        if isinstance(bytes_or_path, (str, Path)):
+            # Streamed from disk rather than read into memory first.
+            result = upload_file(client.session, upload_url, str(bytes_or_path), content_type)
+            status_code = result.get("status_code") or result.get("error", {}).get("status_code")
+            return {"status_code": status_code, "ok": "error" not in result}
+        response = client.session.put(upload_url, data=bytes_or_path, headers={"Content-Type": content_type}, timeout=30)
+        return {"status_code": response.status_code, "ok": response.ok}
+
+
+def upload_delivery_file(file_meta, local_path, content_type="application/octet-stream"):
+    """Upload one upload-intent file entry, in parallel parts when it has them."""
+    with get_client().leased() as client:
+        return upload_file(client.session, file_meta, str(local_path), content_type)
+
+
+def download_file_from_presigned_url(download_url, local_path, expected_sha256=None, file_meta=None):
+    # ``file_meta`` from the download response says whether the object is
+    # compressed; it is then decompressed into ``local_path`` as it streams.
+    file_meta = file_meta or {}
+    with get_client().leased() as client:
+        return download_file(
+            client.session,
+            download_url,
+            str(local_path),
+            expected_sha256=expected_sha256,
+            content_encoding=file_meta.get("content_encoding"),
+            expected_uncompressed_sha256=file_meta.get("uncompressed_sha256"),
+        )
+
+
+async def create_upload_intent_async(api_key, contract_id, delivery_type, files, idempotency_key=None):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/upload-intent",
+        api_key=api_key,
+        json={"delivery_type": delivery_type, "files": files},
+        idempotency_key=idempotency_key,
+    )
+
+
+async def confirm_delivery_async(api_key, contract_id, delivery_type, files):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/confirm",
+        api_key=api_key,
+        json={"delivery_type": delivery_type, "files": files},
+    )
+
+
+async def get_latest_delivery_async(api_key, contract_id, cache=False):
+    client = get_async_client()
+    return await client.request_json(
+        "GET",
+        "CONTRACTS_API_BASE",
+        f"/contracts/v1/{contract_id}/delivery/latest",
+        api_key=api_key,
+        cache=cache,
+    )
+
+
+async def put_file_to_presigned_url_async(upload_url, bytes_or_path, content_type="application/octet-stream"):
     if isinstance(bytes_or_path, (str, Path)):
-        payload = Path(bytes_or_path).read_bytes()
-    else:
-        payload = bytes_or_path
-    response = requests.put(upload_url, data=payload, headers={"Content-Type": content_type}, timeout=30)
-    return {"status_code": response.status_code, "ok": response.ok}
+        call = functools.partial(put_file_to_presigned_url, upload_url, bytes_or_path, content_type)
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+    client = get_async_client()
+    status_code, _, _ = await client.send("PUT", upload_url, data=bytes_or_path, headers={"Content-Type": content_type})
+    return {"status_code": status_code, "ok": status_code < 400}
+
+
+async def upload_delivery_file_async(file_meta, local_path, content_type="application/octet-stream"):
+    call = functools.partial(upload_delivery_file, file_meta, local_path, content_type)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+async def download_file_from_presigned_url_async(download_url, local_path, expected_sha256=None, file_meta=None):
+    # Streams to disk on the pooled blocking session so the event loop never
+    # holds the body.
+    call = functools.partial(download_file_from_presigned_url, download_url, local_path, expected_sha256, file_meta)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
@@ -0,0 +1,260 @@
+"""Hash, announce, upload and confirm a multi-file delivery in one pass.
+
+A manifest is a list of ``{"path": <delivery path>, "local_path": <file>}``
+entries; ``sha256`` and ``size`` may be filled in already when the file was
+written through ``HashingWriter``. Hashing and uploading each run through a
+bounded thread pool, so a delivery takes about as long as its slowest file::
+
+    result = deliver_manifest(api_key, contract_id, "OUTPUT", [
+        {"path": "output/report.pdf", "local_path": "build/report.pdf"},
+        {"path": "output/data.csv", "local_path": "build/data.csv"},
+    ])
+
+Confirm is only sent once every file, and every part of a multipart file,
+has been uploaded. ``compress_manifest`` optionally swaps files for zstd or
+gzip copies (``AGENTTIKI_DELIVERY_COMPRESSION``). With a ``BlobStore`` (``AGENTTIKI_BLOB_STORE``), unchanged
+files are not re-hashed, uploaded files are kept by content and files the
+backend reports it already holds are not sent again.
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agenttiki_client import get_client
+from blob_store import default_blob_store
+from content_encoding import (
+    DEFAULT_COMPRESSION_MIN_BYTES,
+    DEFAULT_DELIVERY_COMPRESSION,
+    METADATA_KEYS,
+    SUFFIXES,
+    choose_codec,
+    compress_file,
+)
+from deliveries import confirm_delivery, create_upload_intent
+from hashing import file_hash
+from uploads import UPLOAD_FAILED, completed_file, upload_file
+
+
+DEFAULT_DELIVERY_CONCURRENCY = int(os.getenv("AGENTTIKI_DELIVERY_CONCURRENCY", "4"))
+
+
+def hash_manifest(manifest, max_workers=DEFAULT_DELIVERY_CONCURRENCY, store=None):
+    """Copy of ``manifest`` with ``sha256`` and ``size`` on every entry."""
+    store = store or default_blob_store()
+
+    def fill(entry):
+        entry = dict(entry)
+        if not entry.get("sha256") and store is not None:
+            entry["sha256"] = store.hash_file(entry["local_path"])
+        elif not entry.get("sha256"):
+            entry["sha256"] = file_hash(entry["local_path"]).hexdigest()
+        if entry.get("size") is None:
+            entry["size"] = os.path.getsize(entry["local_path"])
+        return entry
+
+    try:
+        with ThreadPoolExecutor(max_workers=_workers(max_workers, manifest)) as pool:
+            return list(pool.map(fill, manifest))
+    finally:
+        if store is not None:
+            store.flush()
+
+
+def compress_manifest(
+    manifest,
+    compression=DEFAULT_DELIVERY_COMPRESSION,
+    min_bytes=DEFAULT_COMPRESSION_MIN_BYTES,
+    max_workers=DEFAULT_DELIVERY_CONCURRENCY,
+):
+    """Replace files of at least ``min_bytes`` with compressed copies.
+
+    ``compression`` is ``off``, ``auto`` (zstd when installed, else gzip),
+    ``zstd`` or ``gzip``. A compressed entry gets the codec's suffix on its
+    delivery path, the compressed file's ``sha256``/``size`` and the
+    ``content_encoding``, ``uncompressed_sha256`` and ``uncompressed_size``
+    metadata the buyer needs to decompress and verify it, and keeps the
+    original in ``source_path``. Files that do not shrink are left alone.
+    """
+    codec = choose_codec(compression)
+    if codec is None:
+        return list(manifest)
+
+    def shrink(entry):
+        size = entry.get("size")
+        if size is None:
+            size = os.path.getsize(entry["local_path"])
+        if size < min_bytes or entry.get("content_encoding"):
+            return entry
+        compressed_path = entry["local_path"] + SUFFIXES[codec]
+        metadata = compress_file(entry["local_path"], compressed_path, codec)
+        if metadata["size"] >= size:
+            os.remove(compressed_path)
+            return entry
+        return dict(
+            entry,
+            path=entry["path"] + SUFFIXES[codec],
+            local_path=compressed_path,
+            source_path=entry["local_path"],
+            **metadata,
+        )
+
+    with ThreadPoolExecutor(max_workers=_workers(max_workers, manifest)) as pool:
+        return list(pool.map(shrink, manifest))
+
+
+def remove_compressed(manifest):
+    """Delete the compressed copies ``compress_manifest`` wrote."""
+    for entry in manifest:
+        if entry.get("source_path"):
+            try:
+                os.remove(entry["local_path"])
+            except FileNotFoundError:
+                pass
+
+
+def intent_files(manifest):
+    """The ``files`` list for ``create_upload_intent``."""
+    files = []
+    for entry in manifest:
+        file_meta = {"path": entry["path"], "sha256": entry["sha256"], "size": entry["size"]}
+        file_meta.update({key: entry[key] for key in METADATA_KEYS if key in entry})
+        files.append(file_meta)
+    return files
+
+
+def upload_manifest(
+    manifest,
+    presigned_files,
+    session=None,
+    max_workers=DEFAULT_DELIVERY_CONCURRENCY,
+    store=None,
+    contract_id=None,
+):
+    """Upload every upload-intent entry from its manifest file, in parallel.
+
+    Returns ``{"files": [...], "report": {...}}`` with the entries to confirm,
+    or an ``UPLOAD_FAILED`` envelope listing the files that failed; the
+    report is attached either way.
+    """
+    if session is None:
+        with get_client().leased() as client:
+            return upload_manifest(manifest, presigned_files, client.session, max_workers, store, contract_id)
+    store = store or default_blob_store()
+    entries = {entry["path"]: entry for entry in manifest}
+    missing = [file_meta.get("path") for file_meta in presigned_files if file_meta.get("path") not in entries]
+    if missing:
+        return {"error": {"code": UPLOAD_FAILED, "message": f"no manifest entry for {', '.join(map(str, missing))}"}}
+
+    def send(file_meta):
+        started = time.perf_counter()
+        entry = entries[file_meta["path"]]
+        if store is not None and store.can_skip(file_meta):
+            size = entry.get("size")
+            if size is None:
+                size = os.path.getsize(entry["local_path"])
+            result = {"path": entry["local_path"], "size": size, "reused": True}
+        else:
+            result = upload_file(session, file_meta, entry["local_path"])
+        if store is not None and "error" not in result:
+            sha256 = store.put(entry["local_path"], entry.get("sha256") or file_meta.get("sha256"))
+            store.record_upload(sha256, file_meta, contract_id=contract_id)
+        return file_meta, result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=_workers(max_workers, presigned_files)) as pool:
+            outcomes = list(pool.map(send, presigned_files))
+    finally:
+        if store is not None:
+            store.flush()
+    report = _report(outcomes, time.perf_counter() - started)
+
+    failed = [dict(result["error"], path=file_meta["path"]) for file_meta, result, _ in outcomes if "error" in result]
+    if failed:
+        return {
+            "error": {"code": UPLOAD_FAILED, "message": f"{len(failed)} of {len(outcomes)} files failed", "files": failed},
+            "report": report,
+        }
+    return {"files": [completed_file(file_meta, result) for file_meta, result, _ in outcomes], "report": report}
+
+
+def deliver_manifest(
+    api_key,
+    contract_id,
+    delivery_type,
+    manifest,
+    idempotency_key=None,
+    max_workers=DEFAULT_DELIVERY_CONCURRENCY,
+    compression=DEFAULT_DELIVERY_COMPRESSION,
+):
+    """Hash, compress, request upload intents, upload and confirm ``manifest``.
+
+    Returns ``{"confirm", "files", "report"}`` or the first error envelope.
+    """
+    manifest = compress_manifest(hash_manifest(manifest, max_workers=max_workers), compression, max_workers=max_workers)
+    try:
+        intent = create_upload_intent(api_key, contract_id, delivery_type, intent_files(manifest), idempotency_key=idempotency_key)
+        if "error" in intent:
+            return intent
+        uploaded = upload_manifest(manifest, intent.get("files") or [], max_workers=max_workers, contract_id=contract_id)
+    finally:
+        remove_compressed(manifest)
+    if "error" in uploaded:
+        return uploaded
+    confirm = confirm_delivery(api_key, contract_id, delivery_type, uploaded["files"])
+    if "error" in confirm:
+        return dict(confirm, report=uploaded["report"])
+    return {"confirm": confirm, "files": uploaded["files"], "report": uploaded["report"]}
+
+
+async def deliver_manifest_async(
+    api_key,
+    contract_id,
+    delivery_type,
+    manifest,
+    idempotency_key=None,
+    max_workers=DEFAULT_DELIVERY_CONCURRENCY,
+    compression=DEFAULT_DELIVERY_COMPRESSION,
+):
+    # File I/O and the part pools are blocking; keep them off the event loop.
+    call = functools.partial(
+        deliver_manifest,
+        api_key,
+        contract_id,
+        delivery_type,
+        manifest,
+        idempotency_key=idempotency_key,
+        max_workers=max_workers,
+        compression=compression,
+    )
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+def _report(outcomes, elapsed):
+    files = []
+    total_bytes = 0
+    for file_meta, result, seconds in outcomes:
+        size = result.get("size", 0)
+        total_bytes += size if "error" not in result else 0
+        files.append(
+            {
+                "path": file_meta["path"],
+                "bytes": size,
+                "seconds": round(seconds, 4),
+                "mib_per_second": _rate(size, seconds),
+                "ok": "error" not in result,
+                "reused": bool(result.get("reused")),
+            }
+        )
+    return {"files": files, "bytes": total_bytes, "seconds": round(elapsed, 4), "mib_per_second": _rate(total_bytes, elapsed)}
+
+
+def _rate(size, seconds):
+    return round(size / (1 << 20) / seconds, 3) if seconds > 0 else None
+
+
+def _workers(max_workers, items):
+    return max(1, min(max_workers, len(items) or 1))
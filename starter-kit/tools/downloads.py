@@ -0,0 +1,191 @@
+import os
+import time
+
+import requests
+
+import codec
+from content_encoding import DECODE_ERRORS, DecompressingWriter, decompressor
+from hashing import CHUNK_SIZE, HashingWriter, file_hash
+
+
+DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
+HASH_MISMATCH = "HASH_MISMATCH"
+
+DEFAULT_DOWNLOAD_ATTEMPTS = int(os.getenv("AGENTTIKI_DOWNLOAD_ATTEMPTS", "3"))
+
+
+def download_file(
+    session,
+    url,
+    local_path,
+    expected_sha256=None,
+    timeout=60,
+    chunk_size=CHUNK_SIZE,
+    attempts=DEFAULT_DOWNLOAD_ATTEMPTS,
+    content_encoding=None,
+    expected_uncompressed_sha256=None,
+):
+    """Stream ``url`` to ``local_path``, hashing chunks as they arrive.
+
+    Bytes land in ``local_path + ".part"``; the object's ``ETag`` is kept
+    next to it. A broken transfer, in this call or an earlier one, resumes
+    with ``Range``/``If-Range`` from the end of the part file. The part is
+    renamed onto ``local_path`` only once the whole body is on disk and,
+    when ``expected_sha256`` is given, its hash matches.
+
+    With ``content_encoding`` (``"zstd"`` or ``"gzip"``) the part file keeps
+    the compressed bytes, which ``expected_sha256`` describes, while each
+    chunk is also decompressed into ``local_path``; the decompressed bytes are
+    checked against ``expected_uncompressed_sha256``.
+
+    Returns ``{"path", "sha256", "size", "resumed_from"}``, plus
+    ``uncompressed_sha256`` and ``uncompressed_size`` when decompressing, or
+    an error envelope with code ``DOWNLOAD_FAILED`` or ``HASH_MISMATCH``.
+    """
+    if content_encoding:
+        try:
+            decompressor(content_encoding)
+        except ValueError as exc:
+            return _error(DOWNLOAD_FAILED, str(exc))
+    part_path = local_path + ".part"
+    meta_path = part_path + ".json"
+    directory = os.path.dirname(local_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    validator, offset, digest = _resume_state(part_path, meta_path)
+    resumed_from = offset
+    inflater = None
+    error = None
+    for attempt in range(max(1, attempts)):
+        if attempt:
+            time.sleep(min(0.5 * 2 ** (attempt - 1), 5.0))
+        headers = {}
+        if offset and validator:
+            headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and headers:
+                    # The part file already holds the whole object.
+                    if content_encoding and inflater is None:
+                        inflater = _inflate_part(part_path, local_path, content_encoding, chunk_size)
+                    error = None
+                    break
+                if response.status_code == 206 and headers:
+                    mode = "ab"
+                    if content_encoding and inflater is None:
+                        inflater = _inflate_part(part_path, local_path, content_encoding, chunk_size)
+                elif response.status_code == 200:
+                    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                    _write_meta(meta_path, validator)
+                    offset, digest, resumed_from, mode = 0, None, 0, "wb"
+                    if inflater is not None:
+                        inflater.close()
+                    inflater = DecompressingWriter(local_path + ".inflating", content_encoding) if content_encoding else None
+                else:
+                    error = _error(DOWNLOAD_FAILED, f"HTTP {response.status_code}", response.status_code)
+                    if response.status_code < 500:
+                        break
+                    continue
+                writer = HashingWriter(open(part_path, mode), digest=digest)
+                digest = writer.hash
+                try:
+                    for chunk in response.iter_content(chunk_size):
+                        writer.write(chunk)
+                        offset += len(chunk)
+                        if inflater is not None:
+                            inflater.write(chunk)
+                    writer.flush()
+                    os.fsync(writer.file_handle.fileno())
+                finally:
+                    writer.close()
+            error = None
+            break
+        except (requests.RequestException, OSError) as exc:
+            error = _error(DOWNLOAD_FAILED, f"transfer interrupted at byte {offset}: {exc}")
+        except DECODE_ERRORS as exc:
+            # Corrupt bytes do not get better by resuming; start clean.
+            error = _error(HASH_MISMATCH, f"cannot decode {content_encoding} body: {exc}")
+            _remove(part_path, meta_path)
+            break
+
+    if error is not None:
+        if inflater is not None:
+            # Rebuilt from the part file on the next call.
+            inflater.close()
+            _remove(local_path + ".inflating")
+        return error
+    actual_sha256 = digest.hexdigest() if digest is not None else file_hash(part_path).hexdigest()
+    if expected_sha256 and actual_sha256 != expected_sha256:
+        # These bytes will never verify; the next attempt starts clean.
+        if inflater is not None:
+            inflater.close()
+        _remove(part_path, meta_path, local_path + ".inflating")
+        return _error(HASH_MISMATCH, f"expected sha256 {expected_sha256}, got {actual_sha256}", sha256=actual_sha256)
+    result = {"path": local_path, "sha256": actual_sha256, "size": offset, "resumed_from": resumed_from}
+    if not content_encoding:
+        os.replace(part_path, local_path)
+        _remove(meta_path)
+        return result
+
+    try:
+        if inflater is None:
+            inflater = _inflate_part(part_path, local_path, content_encoding, chunk_size)
+        uncompressed_sha256, uncompressed_size = inflater.finish()
+    except DECODE_ERRORS as exc:
+        _remove(part_path, meta_path, local_path + ".inflating")
+        return _error(HASH_MISMATCH, f"cannot decode {content_encoding} body: {exc}", sha256=actual_sha256)
+    _remove(part_path, meta_path)
+    if expected_uncompressed_sha256 and uncompressed_sha256 != expected_uncompressed_sha256:
+        _remove(local_path + ".inflating")
+        return _error(
+            HASH_MISMATCH,
+            f"expected uncompressed sha256 {expected_uncompressed_sha256}, got {uncompressed_sha256}",
+            sha256=uncompressed_sha256,
+        )
+    os.replace(local_path + ".inflating", local_path)
+    result.update(uncompressed_sha256=uncompressed_sha256, uncompressed_size=uncompressed_size)
+    return result
+
+
+def _resume_state(part_path, meta_path):
+    try:
+        with open(meta_path, "rb") as file_handle:
+            validator = codec.loads(file_handle.read()).get("validator")
+        offset = os.path.getsize(part_path)
+    except (OSError, ValueError, AttributeError):
+        return None, 0, None
+    if not validator or not offset:
+        return None, 0, None
+    return validator, offset, file_hash(part_path)
+
+
+def _inflate_part(part_path, local_path, content_encoding, chunk_size):
+    # Replays bytes fetched by an earlier call so decompression can continue.
+    inflater = DecompressingWriter(local_path + ".inflating", content_encoding)
+    with open(part_path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(chunk_size), b""):
+            inflater.write(chunk)
+    return inflater
+
+
+def _write_meta(meta_path, validator):
+    with open(meta_path, "w", encoding="utf-8") as file_handle:
+        file_handle.write(codec.dumps({"validator": validator}))
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _error(code, message, status_code=None, sha256=None):
+    error = {"code": code, "message": message}
+    if status_code is not None:
+        error["status_code"] = status_code
+    if sha256 is not None:
+        error["sha256"] = sha256
+    return {"error": error}
@@ -0,0 +1,90 @@
+import hashlib
+import mmap
+import os
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class HashingWriter:
+    """Binary file wrapper that hashes bytes on their way to disk.
+
+    The digest is ready when the last write returns, so a file written
+    through it never has to be read back. ``str`` is written as UTF-8.
+    Pass ``digest`` to continue a hash over bytes already on disk.
+    """
+
+    def __init__(self, file_handle, algorithm="sha256", digest=None):
+        self.file_handle = file_handle
+        self.hash = digest if digest is not None else hashlib.new(algorithm)
+        self.size = 0
+
+    @classmethod
+    def open(cls, path, algorithm="sha256"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return cls(open(path, "wb"), algorithm=algorithm)
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.hash.update(data)
+        self.size += len(data)
+        return self.file_handle.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+    def flush(self):
+        self.file_handle.flush()
+
+    def close(self):
+        self.file_handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    """SHA-256 hex digest of a file, without loading it whole."""
+    return file_hash(path, chunk_size=chunk_size).hexdigest()
+
+
+def file_hash(path, algorithm="sha256", chunk_size=CHUNK_SIZE):
+    """Hash object fed with the file in ``chunk_size`` steps.
+
+    The file is memory-mapped read-only; its pages are file-backed, so the
+    kernel can drop them again under pressure. Files that cannot be mapped
+    are read into one reused buffer.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file_handle:
+        size = os.fstat(file_handle.fileno()).st_size
+        if size == 0:
+            return digest
+        try:
+            mapped = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return _hash_stream(file_handle, digest, chunk_size)
+        with mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mapped) as view:
+                for offset in range(0, size, chunk_size):
+                    digest.update(view[offset : offset + chunk_size])
+    return digest
+
+
+def _hash_stream(file_handle, digest, chunk_size):
+    buffer = bytearray(chunk_size)
+    with memoryview(buffer) as view:
+        while True:
+            count = file_handle.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest
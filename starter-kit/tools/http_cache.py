@@ -0,0 +1,118 @@
+import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_ENTRIES = int(os.getenv("AGENTTIKI_HTTP_CACHE_ENTRIES", "1024"))
+CACHE_MARKERS = ("_version", "_unchanged")
+
+
+class CacheEntry:
+    __slots__ = ("etag", "last_modified", "digest", "payload")
+
+    def __init__(self, etag, last_modified, digest, payload):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.payload = payload
+
+    @property
+    def version(self):
+        return self.etag or self.digest
+
+    def view(self, unchanged):
+        # A deep copy, so neither the markers nor a caller's edits reach the
+        # cached payload.
+        payload = copy.deepcopy(self.payload)
+        payload["_version"] = self.version
+        payload["_unchanged"] = unchanged
+        return payload
+
+
+class ConditionalCache:
+    """Validator and body cache for polled GETs.
+
+    Sends ``If-None-Match``/``If-Modified-Since`` when the backend returned
+    validators. Otherwise it recognises an unchanged body by its SHA-256 and
+    skips re-parsing it. Returned payloads carry ``_version`` and
+    ``_unchanged`` so callers can skip work cheaply; each is a private copy
+    the caller may modify. The markers are not part of the backend's data:
+    pass a payload through ``strip_cache_markers`` before sending it back to
+    the API or storing it.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {"not_modified": 0, "same_body": 0, "changed": 0}
+        self._lock = threading.Lock()
+
+    def validators(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def lookup(self, key, status_code, content):
+        """Return the cached view when the response repeats the cached one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if status_code == 304:
+                self._counters["not_modified"] += 1
+            elif status_code == 200 and entry.digest == _digest(content):
+                self._counters["same_body"] += 1
+            else:
+                return None
+            self._entries.move_to_end(key)
+            return entry.view(unchanged=True)
+
+    def store(self, key, headers, content, payload):
+        if not isinstance(payload, dict) or "error" in payload:
+            with self._lock:
+                self._entries.pop(key, None)
+            return payload
+        entry = CacheEntry(
+            headers.get("ETag") or headers.get("etag"),
+            headers.get("Last-Modified") or headers.get("last-modified"),
+            _digest(content),
+            payload,
+        )
+        with self._lock:
+            self._counters["changed"] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry.view(unchanged=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = len(self._entries)
+        return counters
+
+
+def strip_cache_markers(payload):
+    """Copy of a cached result without the ``_version``/``_unchanged`` markers."""
+    if not isinstance(payload, dict):
+        return payload
+    return {key: value for key, value in payload.items() if key not in CACHE_MARKERS}
+
+
+def _digest(content):
+    return hashlib.sha256(content or b"").hexdigest()
+
+
+DEFAULT_HTTP_CACHE = ConditionalCache()
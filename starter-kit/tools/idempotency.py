@@ -0,0 +1,61 @@
+import hashlib
+import uuid
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def derive_idempotency_key(actor, resource, action, *details):
+    material = "|".join(str(part) for part in (actor, resource, action) + details)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:40]
+
+
+def is_indeterminate(response):
+    """True when the outcome of a state-changing call is unknown.
+
+    Server errors and envelopes without a status code may or may not have
+    been applied, so their key must survive for the next attempt.
+    """
+    error = response.get("error") if isinstance(response, dict) else None
+    if not isinstance(error, dict):
+        return False
+    status_code = error.get("status_code")
+    return not status_code or status_code >= 500 or status_code == 429
+
+
+class IdempotencyKeys:
+    """Idempotency keys kept in a plain dict that is saved with FSM state.
+
+    A key is minted the first time an (action, resource) pair is attempted and
+    reused until the backend gives a definite answer. A call that timed out can
+    therefore be resent with the same key, even after a process restart.
+    ``persist`` is called whenever a new key is minted, before the request is
+    sent.
+    """
+
+    def __init__(self, store, persist=None):
+        self.store = store
+        self.persist = persist
+
+    def acquire(self, actor, resource, action):
+        slot = self._slot(resource, action)
+        key = self.store.get(slot)
+        if key is None:
+            key = derive_idempotency_key(actor, resource, action, uuid.uuid4().hex)
+            self.store[slot] = key
+            if self.persist:
+                self.persist()
+        return key
+
+    def release(self, resource, action):
+        self.store.pop(self._slot(resource, action), None)
+
+    def call(self, actor, resource, action, send):
+        key = self.acquire(actor, resource, action)
+        response = send(key)
+        if not is_indeterminate(response):
+            self.release(resource, action)
+        return response
+
+    def _slot(self, resource, action):
+        return f"{action}:{resource}"
@@ -1,3 +1,4 @@
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
 
 
@@ -27,3 +28,31 @@ def match_listings_v2(api_key, intent):
         api_key=api_key,
         json={"version": "v2", "intent": intent},
     )
+
+
+async def create_listing_v2_async(api_key, intent, offer, trust_score=0.9, negotiation_supported=True):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "LISTINGS_API_BASE",
+        "/listings/ingest/v2",
+        api_key=api_key,
+        json={
+            "version": "v2",
+            "intent": intent,
+            "offer": offer,
+            "trust_score": trust_score,
+            "negotiation_supported": negotiation_supported,
+        },
+    )
+
+
+async def match_listings_v2_async(api_key, intent):
+    client = get_async_client()
+    return await client.request_json(
+        "POST",
+        "LISTINGS_API_BASE",
+        "/listings/match/v2",
+        api_key=api_key,
+        json={"version": "v2", "intent": intent},
+    )
@@ -0,0 +1,262 @@
+import bisect
+import re
+import socket
+import threading
+import time
+from collections import Counter
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # urllib3 < 2
+    NameResolutionError = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("dns", "connect", "ttfb", "total")
+
+_VERSION_SEGMENT = re.compile(r"^v\d+$")
+
+
+def template_path(path):
+    """``/contracts/v1/ct_93af/delivery/latest`` -> ``/contracts/v1/{id}/delivery/latest``.
+
+    Segments carrying digits (other than ``v1``-style versions) or long
+    opaque tokens are identifiers. Words such as ``provider-OPEN`` stay.
+    """
+    segments = []
+    for segment in path.split("?", 1)[0].split("/"):
+        if not segment or _VERSION_SEGMENT.match(segment):
+            segments.append(segment)
+        elif any(char.isdigit() for char in segment) or len(segment) >= 24:
+            segments.append("{id}")
+        else:
+            segments.append(segment)
+    return "/".join(segments) or "/"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = {}
+        self.statuses = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class RequestMetrics:
+    """Latency histograms, status counts and byte totals per endpoint.
+
+    Endpoints are keyed by method, base name and templated path. ``record``
+    has the after-hook signature, so it is installed on every client by
+    default and can be combined with your own hooks.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, request, response):
+        key = (request["method"], request["base_name"], request["endpoint"])
+        status = str(response["status_code"]) if response.get("status_code") else "error"
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = EndpointStats()
+                self._endpoints[key] = stats
+            stats.statuses[status] += 1
+            stats.bytes_out += request.get("bytes_out") or 0
+            stats.bytes_in += response.get("bytes_in") or 0
+            for phase, seconds in (response.get("timings") or {}).items():
+                if seconds is None:
+                    continue
+                histogram = stats.latency.get(phase)
+                if histogram is None:
+                    histogram = Histogram(self.buckets)
+                    stats.latency[phase] = histogram
+                histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """Per-endpoint dicts sorted by total time spent, slowest first."""
+        with self._lock:
+            rows = [
+                {
+                    "method": method,
+                    "base_name": base_name,
+                    "endpoint": endpoint,
+                    "statuses": dict(stats.statuses),
+                    "bytes_in": stats.bytes_in,
+                    "bytes_out": stats.bytes_out,
+                    "latency": {phase: stats.latency[phase].snapshot() for phase in PHASES if phase in stats.latency},
+                }
+                for (method, base_name, endpoint), stats in self._endpoints.items()
+            ]
+        return sorted(rows, key=lambda row: -row["latency"].get("total", {}).get("sum", 0))
+
+    def prometheus_text(self, prefix="agenttiki_client"):
+        lines = [
+            f"# HELP {prefix}_request_seconds AgentTiki request latency by phase.",
+            f"# TYPE {prefix}_request_seconds histogram",
+        ]
+        responses = [
+            f"# HELP {prefix}_responses_total Responses by status code.",
+            f"# TYPE {prefix}_responses_total counter",
+        ]
+        transferred = [
+            f"# HELP {prefix}_bytes_total Request and response body bytes.",
+            f"# TYPE {prefix}_bytes_total counter",
+        ]
+        with self._lock:
+            for (method, base_name, endpoint), stats in sorted(self._endpoints.items()):
+                labels = f'method="{method}",base="{base_name}",endpoint="{_escape(endpoint)}"'
+                for phase in PHASES:
+                    histogram = stats.latency.get(phase)
+                    if histogram is None:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{prefix}_request_seconds_bucket{{{labels},phase="{phase}",le="{le}"}} {count}')
+                    lines.append(f'{prefix}_request_seconds_sum{{{labels},phase="{phase}"}} {histogram.sum:.6f}')
+                    lines.append(f'{prefix}_request_seconds_count{{{labels},phase="{phase}"}} {histogram.count}')
+                for status, count in sorted(stats.statuses.items()):
+                    responses.append(f'{prefix}_responses_total{{{labels},status="{status}"}} {count}')
+                transferred.append(f'{prefix}_bytes_total{{{labels},direction="in"}} {stats.bytes_in}')
+                transferred.append(f'{prefix}_bytes_total{{{labels},direction="out"}} {stats.bytes_out}')
+        return "\n".join(lines + responses + transferred) + "\n"
+
+
+_CONNECT_TIMES = threading.local()
+
+
+def take_connect_timings():
+    """Connection setup time spent by this thread since the previous call.
+
+    ``connect`` covers DNS, TCP and TLS for newly opened connections and is
+    0 when a keep-alive connection was reused. ``dns`` is the name lookup
+    part of it, present only when a lookup happened.
+    """
+    timings = {"connect": getattr(_CONNECT_TIMES, "seconds", 0.0)}
+    dns = getattr(_CONNECT_TIMES, "dns", None)
+    if dns is not None:
+        timings["dns"] = dns
+    _CONNECT_TIMES.seconds = 0.0
+    _CONNECT_TIMES.dns = None
+    return timings
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _CONNECT_TIMES.seconds = getattr(_CONNECT_TIMES, "seconds", 0.0) + time.perf_counter() - started
+
+    def _new_conn(self):
+        # Resolve here so the lookup can be timed on its own, then let
+        # urllib3 connect to each address in turn as create_connection would.
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            if NameResolutionError is None:
+                raise NewConnectionError(self, f"Failed to resolve {self.host}: {error}") from error
+            raise NameResolutionError(self.host, self, error) from error
+        finally:
+            _CONNECT_TIMES.dns = (getattr(_CONNECT_TIMES, "dns", None) or 0.0) + time.perf_counter() - started
+
+        dns_host = self._dns_host
+        last_error = None
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as error:
+                    last_error = error
+        finally:
+            self._dns_host = dns_host
+        raise last_error
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """``HTTPAdapter`` whose new connections report their DNS and connect time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,1011 @@
+"""In-memory stand-in for the AgentTiki APIs, for offline runs and load tests.
+
+Serves the actor, listing, negotiation, contract, delivery, credits and
+payment routes used by the starter kit and the example agents, plus the
+presigned blob URLs those routes hand out and an OpenAI-compatible chat
+endpoint for the agents' LLM calls. Point the ``*_API_BASE`` variables at it::
+
+    python tools/mock_server.py --port 8787 --latency-ms 20 --error-rate 0.01
+
+or start it in-process::
+
+    with MockAgentTiki(latency=0.02) as mock:
+        os.environ.update(mock.env())
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import codec
+
+
+BASE_NAMES = (
+    "LISTINGS_API_BASE",
+    "CONTRACTS_API_BASE",
+    "NEGOTIATION_API_BASE",
+    "ACTORS_API_BASE",
+    "CREDITS_API_BASE",
+    "PAYMENTS_API_BASE",
+)
+NEGOTIATION_PREFIXES = ("/negotiate/v2", "/negotiations/v2")
+# Client-supplied file metadata kept with a delivery, e.g. for compressed files.
+DELIVERY_METADATA = ("content_encoding", "uncompressed_sha256", "uncompressed_size")
+
+DEFAULT_LATENCY_MS = float(os.getenv("AGENTTIKI_MOCK_LATENCY_MS", "0"))
+DEFAULT_JITTER_MS = float(os.getenv("AGENTTIKI_MOCK_JITTER_MS", "0"))
+DEFAULT_ERROR_RATE = float(os.getenv("AGENTTIKI_MOCK_ERROR_RATE", "0"))
+DEFAULT_THROTTLE_RATE = float(os.getenv("AGENTTIKI_MOCK_THROTTLE_RATE", "0"))
+DEFAULT_FAULT_PATHS = os.getenv("AGENTTIKI_MOCK_FAULT_PATHS", "")
+DEFAULT_STARTING_CREDITS = int(os.getenv("AGENTTIKI_MOCK_STARTING_CREDITS", "100000"))
+DEFAULT_MULTIPART_PART_SIZE = int(os.getenv("AGENTTIKI_MOCK_MULTIPART_PART_SIZE", str(8 << 20)))
+
+# Contract lifecycle: (from, to) -> party allowed to request it.
+TRANSITIONS = {
+    ("ACTIVE", "SHIPPED"): "provider",
+    ("SHIPPED", "FULFILLED"): "buyer",
+    ("ACTIVE", "BREACHED"): "buyer",
+    ("SHIPPED", "BREACHED"): "buyer",
+    ("ACTIVE", "DISPUTED"): "any",
+    ("SHIPPED", "DISPUTED"): "any",
+}
+
+
+class MockError(Exception):
+    def __init__(self, status_code, code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+    def payload(self):
+        return {"error": {"code": self.code, "message": self.message}}
+
+
+class FaultInjector:
+    """Latency and failures applied before a request reaches its route.
+
+    Every matching request sleeps ``latency`` plus up to ``jitter`` seconds.
+    It is then answered with a ``500`` with probability ``error_rate`` or a
+    ``429`` carrying ``Retry-After`` with probability ``throttle_rate``.
+    ``paths`` is a regex; when set, only matching paths get faults.
+    Attributes may be changed while the server is running.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, paths=None, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.paths = re.compile(paths) if paths else None
+        self.retry_after = retry_after
+        self.injected = {"errors": 0, "throttles": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self, path):
+        """Sleep, then return ``(status, payload, headers)`` or ``None``."""
+        if self.paths is not None and not self.paths.search(path):
+            return None
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            roll = self._random.random()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            if roll < self.error_rate:
+                self.injected["errors"] += 1
+                return 500, {"error": {"code": "INTERNAL_ERROR", "message": "injected failure"}}, {}
+            if roll < self.error_rate + self.throttle_rate:
+                self.injected["throttles"] += 1
+                return 429, {"message": "Too Many Requests"}, {"Retry-After": str(self.retry_after)}
+        return None
+
+    def stats(self):
+        with self._lock:
+            return dict(self.injected)
+
+
+class MockBackend:
+    """Platform state and route handlers. Every handler runs under one lock."""
+
+    def __init__(
+        self,
+        base_url="",
+        starting_credits=DEFAULT_STARTING_CREDITS,
+        require_payment=False,
+        seed=None,
+        multipart_part_size=DEFAULT_MULTIPART_PART_SIZE,
+    ):
+        self.base_url = base_url
+        self.random = random.Random(seed)
+        self.starting_credits = starting_credits
+        self.require_payment = require_payment
+        self.actors = {}
+        self.actors_by_key = {}
+        self.listings = {}
+        self.negotiations = {}
+        self.contracts = {}
+        self.snapshots = {}
+        self.blobs = {}
+        self.blob_owners = {}
+        self.blob_digests = {}
+        self.upload_tokens = {}
+        self.download_tokens = {}
+        self.multipart_part_size = multipart_part_size
+        self.multipart_uploads = {}
+        self.part_tokens = {}
+        self.idempotent = {}
+        self.lock = threading.RLock()
+
+    # --- actors and credits ---
+
+    def register(self, actor, body):
+        actor_id = f"act_{secrets.token_hex(6)}"
+        api_key = f"key_{secrets.token_hex(16)}"
+        self.actors[actor_id] = {"actor_id": actor_id, "balance": self.starting_credits, "reserved": 0}
+        self.actors_by_key[api_key] = actor_id
+        return 200, {"actor_id": actor_id, "api_key": api_key}
+
+    def balance(self, actor, body):
+        return 200, {
+            "actor_id": actor["actor_id"],
+            "balance_credits": actor["balance"],
+            "reserved_credits": actor["reserved"],
+            "available_credits": actor["balance"] - actor["reserved"],
+        }
+
+    def create_payment(self, actor, body):
+        contract_id = body.get("contract_id")
+        if contract_id:
+            contract = self._contract(actor, contract_id)
+            if contract["status"] != "ACTIVE_PENDING_PAYMENT":
+                raise MockError(400, "INVALID_STATE_TRANSITION", f"contract is {contract['status']}")
+            if str(body.get("sig")) != contract["payment_sig"] or str(body.get("exp")) != contract["payment_exp"]:
+                raise MockError(400, "SCHEMA_VALIDATION_FAILED", "invalid payment signature")
+            # Checkout completes immediately.
+            self._set_status(contract, "ACTIVE")
+            return 200, {"client_secret": f"pi_{secrets.token_hex(8)}_secret", "contract_id": contract_id}
+        amount = body.get("credits_amount")
+        if not isinstance(amount, int) or amount <= 0:
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "credits_amount must be a positive integer")
+        actor["balance"] += amount
+        return 200, {
+            "session_id": f"cs_{secrets.token_hex(8)}",
+            "client_secret": f"cs_{secrets.token_hex(8)}_secret",
+            "credits_amount": amount,
+        }
+
+    # --- listings ---
+
+    def ingest(self, actor, body):
+        intent = body.get("intent")
+        offer = body.get("offer")
+        if not isinstance(intent, dict) or not isinstance(offer, dict):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "intent and offer are required")
+        listing_id = f"{actor['actor_id']}-{secrets.token_hex(4)}"
+        self.listings[listing_id] = {
+            "listing_id": listing_id,
+            "provider_id": actor["actor_id"],
+            "intent": intent,
+            "intent_hash": intent_hash(intent),
+            "offer": offer,
+            "trust_score": body.get("trust_score"),
+        }
+        return 200, {"listing_id": listing_id, "intent_hash": self.listings[listing_id]["intent_hash"]}
+
+    def match(self, actor, body):
+        intent = body.get("intent")
+        if not isinstance(intent, dict):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "intent is required")
+        wanted = intent_hash(intent)
+        matches = [
+            {
+                "listing_id": listing["listing_id"],
+                "provider_id": listing["provider_id"],
+                "price": listing["offer"].get("price"),
+                "offer": listing["offer"],
+                "trust_score": listing["trust_score"],
+            }
+            for listing in self.listings.values()
+            if listing["intent_hash"] == wanted and listing["provider_id"] != actor["actor_id"]
+        ]
+        # Equal prices are served in random order so buyers spread out
+        # over providers instead of all picking the first listing.
+        self.random.shuffle(matches)
+        matches.sort(key=lambda item: item["price"] or 0)
+        return 200, {"intent_hash": wanted, "matches": matches}
+
+    # --- negotiations ---
+
+    def create_negotiation(self, actor, body):
+        listing = self.listings.get(body.get("listing_id"))
+        proposal = body.get("proposal") or body.get("offer")
+        if listing is None:
+            raise MockError(404, "NOT_FOUND", "listing not found")
+        if not isinstance(proposal, dict):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "proposal is required")
+        negotiation_id = f"ng_{secrets.token_hex(8)}"
+        self.negotiations[negotiation_id] = {
+            "negotiation_id": negotiation_id,
+            "listing_id": listing["listing_id"],
+            "intent_hash": listing["intent_hash"],
+            "buyer_id": actor["actor_id"],
+            "provider_id": listing["provider_id"],
+            "status": "OPEN",
+            "next_actor_id": listing["provider_id"],
+            "rounds": [{"actor_id": actor["actor_id"], "proposal": proposal}],
+            "max_rounds": int(body.get("max_rounds") or 5),
+            "contract_id": None,
+            "payment_url": None,
+            "version": 1,
+            "updated_at": time.time(),
+        }
+        return 200, self._negotiation_view(self.negotiations[negotiation_id])
+
+    def open_negotiations(self, actor, body, role):
+        key = "provider_id" if role == "provider" else "buyer_id"
+        negotiations = [
+            {
+                "negotiation_id": negotiation["negotiation_id"],
+                "status": negotiation["status"],
+                "offer": negotiation["rounds"][-1]["proposal"],
+                "next_actor_id": negotiation["next_actor_id"],
+            }
+            for negotiation in self.negotiations.values()
+            if negotiation[key] == actor["actor_id"] and negotiation["status"] == "OPEN"
+        ]
+        return 200, {"negotiations": negotiations}
+
+    def get_negotiation(self, actor, body, negotiation_id):
+        return 200, self._negotiation_view(self._negotiation(actor, negotiation_id))
+
+    def propose(self, actor, body, negotiation_id):
+        negotiation = self._negotiation_turn(actor, negotiation_id)
+        proposal = body.get("proposal")
+        if not isinstance(proposal, dict):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "proposal is required")
+        if len(negotiation["rounds"]) >= negotiation["max_rounds"]:
+            negotiation["status"] = "EXPIRED"
+            self._touch(negotiation)
+            raise MockError(409, "INVALID_STATE_TRANSITION", "max rounds reached")
+        negotiation["rounds"].append({"actor_id": actor["actor_id"], "proposal": proposal})
+        negotiation["next_actor_id"] = self._counterparty(negotiation, actor["actor_id"])
+        self._touch(negotiation)
+        return 200, self._negotiation_view(negotiation)
+
+    def accept(self, actor, body, negotiation_id):
+        negotiation = self._negotiation_turn(actor, negotiation_id)
+        final_offer = negotiation["rounds"][-1]["proposal"]
+        contract = self._open_contract(
+            negotiation["buyer_id"],
+            negotiation["provider_id"],
+            final_offer,
+            negotiation_id=negotiation_id,
+            intent_hash_value=negotiation["intent_hash"],
+        )
+        negotiation["status"] = "ACCEPTED"
+        negotiation["contract_id"] = contract["contract_id"]
+        negotiation["payment_url"] = contract.get("payment_url")
+        self._touch(negotiation)
+        return 200, self._negotiation_view(negotiation)
+
+    def reject(self, actor, body, negotiation_id):
+        negotiation = self._negotiation_turn(actor, negotiation_id)
+        negotiation["status"] = "REJECTED"
+        self._touch(negotiation)
+        return 200, self._negotiation_view(negotiation)
+
+    # --- contracts ---
+
+    def contracts_action(self, actor, body):
+        action = body.get("action")
+        if action == "transition":
+            return self.transition(actor, body)
+        if action != "create":
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "action must be create or transition")
+        provider_id = body.get("provider_id")
+        if provider_id not in self.actors or not isinstance(body.get("final_offer"), dict):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "provider_id and final_offer are required")
+        contract = self._open_contract(
+            actor["actor_id"],
+            provider_id,
+            body["final_offer"],
+            negotiation_id=body.get("negotiation_id"),
+            intent_hash_value=body.get("intent_hash"),
+            contract_id=body.get("contract_id"),
+        )
+        return 200, self._contract_view(contract)
+
+    def transition(self, actor, body):
+        contract = self._contract(actor, body.get("contract_id"))
+        to_status = body.get("to_status")
+        party = TRANSITIONS.get((contract["status"], to_status))
+        if party is None:
+            raise MockError(409, "INVALID_STATE_TRANSITION", f"{contract['status']} -> {to_status} is not allowed")
+        if party != "any" and contract[f"{party}_id"] != actor["actor_id"]:
+            raise MockError(403, "UNAUTHORIZED_ACTOR", f"only the {party} may move a contract to {to_status}")
+        if to_status == "SHIPPED" and not self._latest_delivery(contract, "OUTPUT"):
+            raise MockError(409, "INVALID_STATE_TRANSITION", "no confirmed OUTPUT delivery")
+        if to_status in ("FULFILLED", "BREACHED"):
+            self._settle(contract, paid=to_status == "FULFILLED")
+        self._set_status(contract, to_status)
+        return 200, self._contract_view(contract)
+
+    def list_contracts(self, actor, body, role, query):
+        wanted = (query.get("status") or [None])[0]
+        contracts = [
+            self._contract_view(contract)
+            for contract in self.contracts.values()
+            if contract[f"{role}_id"] == actor["actor_id"] and (wanted is None or contract["status"] == wanted)
+        ]
+        return 200, {"contracts": contracts}
+
+    def get_contract(self, actor, body, contract_id):
+        return 200, self._contract_view(self._contract(actor, contract_id))
+
+    # --- deliveries ---
+
+    def upload_intent(self, actor, body, contract_id):
+        contract = self._contract(actor, contract_id)
+        delivery_type = body.get("delivery_type")
+        files = body.get("files")
+        if delivery_type not in ("INPUT", "OUTPUT") or not isinstance(files, list) or not files:
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "delivery_type and files are required")
+        uploader = "buyer" if delivery_type == "INPUT" else "provider"
+        if contract[f"{uploader}_id"] != actor["actor_id"]:
+            raise MockError(403, "UNAUTHORIZED_ACTOR", f"only the {uploader} uploads {delivery_type}")
+        if contract["status"] != "ACTIVE":
+            raise MockError(409, "INVALID_STATE_TRANSITION", f"contract is {contract['status']}")
+        if delivery_type == "OUTPUT" and not self._latest_delivery(contract, "INPUT"):
+            raise MockError(409, "INVALID_STATE_TRANSITION", "OUTPUT requires a confirmed INPUT delivery")
+        snapshot_id = f"snap_{secrets.token_hex(8)}"
+        entries = []
+        for file_meta in files:
+            path = file_meta.get("path") if isinstance(file_meta, dict) else None
+            if not path:
+                raise MockError(400, "SCHEMA_VALIDATION_FAILED", "every file needs a path")
+            blob_key = f"contracts/{contract_id}/{delivery_type}/{snapshot_id}/{path}"
+            token = secrets.token_urlsafe(24)
+            self.upload_tokens[token] = blob_key
+            self.blob_owners[blob_key] = actor["actor_id"]
+            entry = {
+                "path": path,
+                "sha256": file_meta.get("sha256"),
+                "snapshot_id": snapshot_id,
+                "s3_key": blob_key,
+                "upload_url": f"{self.base_url}/blobs/{token}",
+            }
+            entry.update({key: file_meta[key] for key in DELIVERY_METADATA if key in file_meta})
+            size = file_meta.get("size")
+            known_key = self.blob_digests.get((actor["actor_id"], file_meta.get("sha256")))
+            if known_key in self.blobs:
+                # Same uploader, same content: stored without another PUT.
+                self.store_blob(blob_key, self.blobs[known_key])
+                entry["exists"] = True
+            elif self.multipart_part_size and isinstance(size, int) and size > self.multipart_part_size:
+                entry["multipart"] = self._start_multipart(blob_key, size)
+            entries.append(entry)
+        self.snapshots[snapshot_id] = {
+            "snapshot_id": snapshot_id,
+            "contract_id": contract_id,
+            "delivery_type": delivery_type,
+            "files": entries,
+            "confirmed_at": None,
+        }
+        return 200, {"contract_id": contract_id, "delivery_type": delivery_type, "files": entries}
+
+    def confirm(self, actor, body, contract_id):
+        contract = self._contract(actor, contract_id)
+        files = body.get("files") or []
+        snapshot_ids = {file_meta.get("snapshot_id") for file_meta in files if isinstance(file_meta, dict)}
+        if len(snapshot_ids) != 1:
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "files must belong to one snapshot")
+        snapshot = self.snapshots.get(snapshot_ids.pop())
+        if snapshot is None or snapshot["contract_id"] != contract_id:
+            raise MockError(404, "NOT_FOUND", "snapshot not found")
+        if snapshot["delivery_type"] != body.get("delivery_type", snapshot["delivery_type"]):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", "delivery_type does not match the upload intent")
+        completions = {
+            file_meta.get("s3_key"): file_meta["multipart"]
+            for file_meta in files
+            if isinstance(file_meta, dict) and isinstance(file_meta.get("multipart"), dict)
+        }
+        for s3_key, completion in completions.items():
+            if s3_key not in self.blobs:
+                self._complete_multipart(s3_key, completion)
+        missing = [entry["path"] for entry in snapshot["files"] if entry["s3_key"] not in self.blobs]
+        if missing:
+            raise MockError(409, "INVALID_STATE_TRANSITION", f"not uploaded: {', '.join(missing)}")
+        if snapshot["confirmed_at"] is None:
+            snapshot["confirmed_at"] = time.time()
+            contract["deliveries"].append(snapshot["snapshot_id"])
+            self._touch(contract)
+        return 200, {"contract_id": contract_id, "delivery_type": snapshot["delivery_type"], "status": "recorded"}
+
+    def latest_delivery(self, actor, body, contract_id):
+        contract = self._contract(actor, contract_id)
+        snapshot = self._latest_delivery(contract)
+        if snapshot is None:
+            return 200, {"contract_id": contract_id, "delivery_type": None, "files": []}
+        return 200, {
+            "contract_id": contract_id,
+            "delivery_type": snapshot["delivery_type"],
+            "snapshot_id": snapshot["snapshot_id"],
+            "files": [self._stored_file(entry) for entry in snapshot["files"]],
+            "timestamp": snapshot["confirmed_at"],
+        }
+
+    def download(self, actor, body, contract_id):
+        contract = self._contract(actor, contract_id)
+        snapshot = self._latest_delivery(contract, "OUTPUT")
+        if snapshot is None:
+            raise MockError(404, "NOT_FOUND", "no OUTPUT delivery")
+        files = []
+        for entry in snapshot["files"]:
+            token = secrets.token_urlsafe(24)
+            self.download_tokens[token] = entry["s3_key"]
+            files.append(dict(self._stored_file(entry), download_url=f"{self.base_url}/blobs/{token}"))
+        return 200, {
+            "contract_id": contract_id,
+            "snapshot_id": snapshot["snapshot_id"],
+            "download_url": files[0]["download_url"],
+            "sha256": files[0]["sha256"],
+            "files": files,
+        }
+
+    def _start_multipart(self, blob_key, size):
+        upload_id = f"mpu_{secrets.token_hex(8)}"
+        count = -(-size // self.multipart_part_size)
+        self.multipart_uploads[upload_id] = {"s3_key": blob_key, "count": count, "parts": {}}
+        parts = []
+        for part_number in range(1, count + 1):
+            token = secrets.token_urlsafe(24)
+            self.part_tokens[token] = (upload_id, part_number)
+            parts.append({"part_number": part_number, "upload_url": f"{self.base_url}/blobs/{token}"})
+        return {"upload_id": upload_id, "part_size": self.multipart_part_size, "parts": parts}
+
+    def _complete_multipart(self, blob_key, completion):
+        upload = self.multipart_uploads.get(completion.get("upload_id"))
+        if upload is None or upload["s3_key"] != blob_key:
+            raise MockError(404, "NOT_FOUND", "multipart upload not found")
+        listed = {part.get("part_number"): part.get("etag") for part in completion.get("parts") or []}
+        if sorted(listed) != list(range(1, upload["count"] + 1)):
+            raise MockError(400, "SCHEMA_VALIDATION_FAILED", f"multipart upload needs parts 1..{upload['count']}")
+        for part_number, etag in listed.items():
+            content = upload["parts"].get(part_number)
+            if content is None or etag != f'"{hashlib.md5(content).hexdigest()}"':
+                raise MockError(400, "SCHEMA_VALIDATION_FAILED", f"part {part_number} is missing or its ETag differs")
+        self.store_blob(blob_key, b"".join(upload["parts"][number] for number in sorted(listed)))
+        del self.multipart_uploads[completion["upload_id"]]
+
+    def store_blob(self, blob_key, content):
+        self.blobs[blob_key] = content
+        owner = self.blob_owners.get(blob_key)
+        if owner is not None:
+            self.blob_digests[(owner, hashlib.sha256(content).hexdigest())] = blob_key
+
+    # --- helpers ---
+
+    def actor_for(self, headers):
+        authorization = headers.get("Authorization") or ""
+        api_key = authorization[7:] if authorization.startswith("Bearer ") else None
+        actor_id = self.actors_by_key.get(api_key)
+        if actor_id is None:
+            raise MockError(401, "UNAUTHORIZED", "missing or invalid API key")
+        return self.actors[actor_id]
+
+    def _negotiation(self, actor, negotiation_id):
+        negotiation = self.negotiations.get(negotiation_id)
+        if negotiation is None:
+            raise MockError(404, "NOT_FOUND", "negotiation not found")
+        if actor["actor_id"] not in (negotiation["buyer_id"], negotiation["provider_id"]):
+            raise MockError(403, "UNAUTHORIZED_ACTOR", "not a party to this negotiation")
+        return negotiation
+
+    def _negotiation_turn(self, actor, negotiation_id):
+        negotiation = self._negotiation(actor, negotiation_id)
+        if negotiation["status"] != "OPEN":
+            raise MockError(409, "INVALID_STATE_TRANSITION", f"negotiation is {negotiation['status']}")
+        if negotiation["next_actor_id"] != actor["actor_id"]:
+            raise MockError(409, "NOT_YOUR_TURN", "waiting for the other party")
+        return negotiation
+
+    def _counterparty(self, negotiation, actor_id):
+        return negotiation["buyer_id"] if actor_id == negotiation["provider_id"] else negotiation["provider_id"]
+
+    def _negotiation_view(self, negotiation):
+        turn = "PROVIDER" if negotiation["next_actor_id"] == negotiation["provider_id"] else "BUYER"
+        round_count = len(negotiation["rounds"])
+        return {
+            "negotiation_id": negotiation["negotiation_id"],
+            "listing_id": negotiation["listing_id"],
+            "intent_hash": negotiation["intent_hash"],
+            "status": negotiation["status"],
+            "next_actor_id": negotiation["next_actor_id"],
+            "turn": turn,
+            "rounds": negotiation["rounds"],
+            "last_offer": negotiation["rounds"][-1]["proposal"],
+            "round_count": round_count,
+            "max_rounds": negotiation["max_rounds"],
+            "contract_id": negotiation["contract_id"],
+            "payment_url": negotiation["payment_url"],
+            "meta": {
+                "status": negotiation["status"],
+                "next_actor_id": negotiation["next_actor_id"],
+                "buyer_id": negotiation["buyer_id"],
+                "provider_id": negotiation["provider_id"],
+                "round_count": round_count,
+                "max_rounds": negotiation["max_rounds"],
+                "contract_id": negotiation["contract_id"],
+            },
+            "version": negotiation["version"],
+        }
+
+    def _open_contract(self, buyer_id, provider_id, final_offer, negotiation_id=None, intent_hash_value=None, contract_id=None):
+        price = int(final_offer.get("price") or 0)
+        contract = {
+            "contract_id": contract_id or f"ct_{secrets.token_hex(8)}",
+            "negotiation_id": negotiation_id,
+            "intent_hash": intent_hash_value,
+            "buyer_id": buyer_id,
+            "provider_id": provider_id,
+            "final_offer": final_offer,
+            "price": price,
+            "status": "ACTIVE",
+            "deliveries": [],
+            "version": 1,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }
+        if self.require_payment:
+            contract["status"] = "ACTIVE_PENDING_PAYMENT"
+            contract["payment_exp"] = str(int(time.time()) + 3600)
+            contract["payment_sig"] = secrets.token_hex(16)
+            query = urllib.parse.urlencode(
+                {"contract_id": contract["contract_id"], "exp": contract["payment_exp"], "sig": contract["payment_sig"]}
+            )
+            contract["payment_url"] = f"{self.base_url}/pay/?{query}"
+        else:
+            buyer = self.actors[buyer_id]
+            if buyer["balance"] - buyer["reserved"] < price:
+                raise MockError(402, "INSUFFICIENT_CREDITS", f"{price} credits needed")
+            buyer["reserved"] += price
+        contract["status_times"] = {contract["status"]: contract["created_at"]}
+        self.contracts[contract["contract_id"]] = contract
+        return contract
+
+    def _settle(self, contract, paid):
+        if self.require_payment:
+            if paid:
+                self.actors[contract["provider_id"]]["balance"] += contract["price"]
+            return
+        buyer = self.actors[contract["buyer_id"]]
+        buyer["reserved"] -= contract["price"]
+        if paid:
+            buyer["balance"] -= contract["price"]
+            self.actors[contract["provider_id"]]["balance"] += contract["price"]
+
+    def _contract(self, actor, contract_id):
+        contract = self.contracts.get(contract_id)
+        if contract is None:
+            raise MockError(404, "NOT_FOUND", "contract not found")
+        if actor["actor_id"] not in (contract["buyer_id"], contract["provider_id"]):
+            raise MockError(403, "UNAUTHORIZED_ACTOR", "not a party to this contract")
+        return contract
+
+    def _contract_view(self, contract):
+        return {
+            key: contract[key]
+            for key in (
+                "contract_id",
+                "negotiation_id",
+                "intent_hash",
+                "buyer_id",
+                "provider_id",
+                "final_offer",
+                "status",
+                "version",
+                "created_at",
+                "updated_at",
+            )
+        }
+
+    def _latest_delivery(self, contract, delivery_type=None):
+        for snapshot_id in reversed(contract["deliveries"]):
+            snapshot = self.snapshots[snapshot_id]
+            if delivery_type is None or snapshot["delivery_type"] == delivery_type:
+                return snapshot
+        return None
+
+    def _stored_file(self, entry):
+        content = self.blobs[entry["s3_key"]]
+        stored = {
+            "path": entry["path"],
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size": len(content),
+            "snapshot_id": entry["snapshot_id"],
+        }
+        stored.update({key: entry[key] for key in DELIVERY_METADATA if key in entry})
+        return stored
+
+    def _set_status(self, contract, status):
+        contract["status"] = status
+        self._touch(contract)
+        contract["status_times"][status] = contract["updated_at"]
+
+    def _touch(self, record):
+        record["version"] += 1
+        record["updated_at"] = time.time()
+
+
+def intent_hash(intent):
+    return hashlib.sha256(codec.dumps_bytes(_canonical(intent))).hexdigest()
+
+
+def _canonical(value):
+    # Key order must not change the hash, whatever the codec does.
+    if isinstance(value, dict):
+        return [[key, _canonical(value[key])] for key in sorted(value)]
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _routes(negotiation_prefixes):
+    routes = [
+        ("POST", r"/actors/v1", "register", False),
+        ("GET", r"/credits/v1/balance", "balance", True),
+        ("POST", r"/payments/v1/create", "create_payment", True),
+        ("POST", r"/listings/ingest/v[12]", "ingest", True),
+        ("POST", r"/listings/match/v[12]", "match", True),
+        ("POST", r"/contracts/v1", "contracts_action", True),
+        ("POST", r"/contracts/v1/transition", "transition", True),
+        ("GET", r"/contracts/v1/(?P<role>provider|buyer)", "list_contracts", True),
+        ("GET", r"/contracts/v1/(?P<contract_id>[^/]+)", "get_contract", True),
+        ("POST", r"/contracts/v1/(?P<contract_id>[^/]+)/delivery/upload-intent", "upload_intent", True),
+        ("POST", r"/contracts/v1/(?P<contract_id>[^/]+)/delivery/confirm", "confirm", True),
+        ("GET", r"/contracts/v1/(?P<contract_id>[^/]+)/delivery/latest", "latest_delivery", True),
+        ("GET", r"/contracts/v1/(?P<contract_id>[^/]+)/delivery/download", "download", True),
+    ]
+    for prefix in negotiation_prefixes:
+        prefix = re.escape(prefix)
+        routes += [
+            ("POST", prefix, "create_negotiation", True),
+            ("GET", prefix + r"/(?P<role>provider|buyer)-OPEN", "open_negotiations", True),
+            ("GET", prefix + r"/(?P<negotiation_id>[^/]+)", "get_negotiation", True),
+            ("POST", prefix + r"/(?P<negotiation_id>[^/]+)/propose", "propose", True),
+            ("POST", prefix + r"/(?P<negotiation_id>[^/]+)/accept", "accept", True),
+            ("POST", prefix + r"/(?P<negotiation_id>[^/]+)/reject", "reject", True),
+        ]
+    return [(method, re.compile(pattern + "$"), name, authenticated) for method, pattern, name, authenticated in routes]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "AgentTikiMock/1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def handle(self):
+        # Agents are killed mid-request when a run stops; a dropped
+        # connection is not worth a traceback on stderr.
+        try:
+            super().handle()
+        except ConnectionError:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.mock.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method):
+        mock = self.server.mock
+        parsed = urllib.parse.urlsplit(self.path)
+        path = parsed.path.rstrip("/") or "/"
+        body = self._read_body()
+        mock.count(method, path)
+        fault = mock.faults.apply(path)
+        if fault is not None:
+            self._send_json(*fault)
+            return
+        if path.startswith("/blobs/"):
+            self._blob(method, path[len("/blobs/"):], body)
+            return
+        if method == "POST" and path.endswith("/chat/completions"):
+            self._send_json(200, _chat_completion(), {})
+            return
+        self._api(method, path, parsed.query, body)
+
+    def _api(self, method, path, query, body):
+        mock = self.server.mock
+        backend = mock.backend
+        allowed = False
+        for route_method, pattern, name, authenticated in mock.routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                payload = codec.loads(body) if body else {}
+            except Exception:
+                self._send_json(400, MockError(400, "SCHEMA_VALIDATION_FAILED", "body is not JSON").payload(), {})
+                return
+            if not isinstance(payload, dict):
+                payload = {}
+            kwargs = match.groupdict()
+            if name == "list_contracts":
+                kwargs["query"] = urllib.parse.parse_qs(query)
+            with backend.lock:
+                try:
+                    actor = backend.actor_for(self.headers) if authenticated else None
+                    replay_key = (actor["actor_id"] if actor else None, self.headers.get("Idempotency-Key"))
+                    if method == "POST" and replay_key[1] and replay_key in backend.idempotent:
+                        status, result = backend.idempotent[replay_key]
+                    else:
+                        status, result = getattr(backend, name)(actor, payload, **kwargs)
+                        if method == "POST" and replay_key[1]:
+                            backend.idempotent[replay_key] = (status, result)
+                    response = codec.dumps_bytes(result)
+                except MockError as exc:
+                    status, response = exc.status_code, codec.dumps_bytes(exc.payload())
+            self._send_bytes(status, response, {}, etag=method == "GET")
+            return
+        if allowed:
+            self._send_json(405, {"message": "Method Not Allowed"}, {})
+        else:
+            self._send_json(404, {"message": "Not Found"}, {})
+
+    def _blob(self, method, token, body):
+        backend = self.server.mock.backend
+        with backend.lock:
+            if method == "PUT" and token in backend.part_tokens:
+                upload_id, part_number = backend.part_tokens[token]
+                upload = backend.multipart_uploads.get(upload_id)
+                blob_key = upload and upload["s3_key"]
+                if upload is not None:
+                    upload["parts"][part_number] = body
+            elif method == "PUT":
+                blob_key = backend.upload_tokens.get(token)
+                if blob_key is not None:
+                    backend.store_blob(blob_key, body)
+            else:
+                blob_key = backend.download_tokens.get(token) or backend.upload_tokens.get(token)
+                content = backend.blobs.get(blob_key)
+        if blob_key is None or (method == "GET" and content is None):
+            self._send_bytes(403, b"AccessDenied", {"Content-Type": "text/plain"})
+        elif method == "PUT":
+            self._send_bytes(200, b"", {"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        elif method != "GET":
+            self._send_bytes(405, b"", {})
+        else:
+            self._send_range(content)
+
+    def _send_range(self, content):
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "Accept-Ranges": "bytes",
+            "ETag": f'"{hashlib.md5(content).hexdigest()}"',
+        }
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+        if_range = self.headers.get("If-Range")
+        if match is None or (if_range and if_range != headers["ETag"]):
+            self._send_bytes(200, content, headers)
+            return
+        start = int(match.group(1))
+        end = min(int(match.group(2)), len(content) - 1) if match.group(2) else len(content) - 1
+        if start >= len(content) or start > end:
+            headers["Content-Range"] = f"bytes */{len(content)}"
+            self._send_bytes(416, b"", headers)
+            return
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        self._send_bytes(206, content[start : end + 1], headers)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if body and (self.headers.get("Content-Encoding") or "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _send_json(self, status, payload, headers):
+        self._send_bytes(status, codec.dumps_bytes(payload), dict(headers, **{"Content-Type": "application/json"}))
+
+    def _send_bytes(self, status, content, headers, etag=False):
+        headers = dict(headers)
+        headers.setdefault("Content-Type", "application/json")
+        if etag and status == 200:
+            tag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+            headers["ETag"] = tag
+            if self.headers.get("If-None-Match") == tag:
+                status, content = 304, b""
+        self.send_response(status)
+        self.send_header("apigw-requestid", secrets.token_hex(8))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if content:
+            self.wfile.write(content)
+
+
+def _chat_completion():
+    # A bare PROPOSE lets the decision engine's clamp pick the price, which
+    # keeps negotiations deterministic without a real model.
+    return {
+        "id": f"chatcmpl-{secrets.token_hex(6)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "agenttiki-mock",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": '{"action": "PROPOSE", "proposal": {}}'},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class MockAgentTiki:
+    """Threaded HTTP server wrapping ``MockBackend`` and ``FaultInjector``.
+
+    ``negotiation_prefixes`` chooses which negotiation routes exist, for
+    example only ``("/negotiations/v2",)`` to exercise the route fallback.
+    ``require_payment`` opens contracts as ``ACTIVE_PENDING_PAYMENT`` with a
+    signed payment URL instead of reserving credits. Upload-intent files that
+    declare a ``size`` above ``multipart_part_size`` also get per-part URLs;
+    confirm assembles them from the listed part ETags.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        faults=None,
+        negotiation_prefixes=NEGOTIATION_PREFIXES,
+        starting_credits=DEFAULT_STARTING_CREDITS,
+        require_payment=False,
+        seed=None,
+        multipart_part_size=DEFAULT_MULTIPART_PART_SIZE,
+        verbose=False,
+    ):
+        self.faults = faults or FaultInjector()
+        self.routes = _routes(negotiation_prefixes)
+        self.verbose = verbose
+        self.requests = {}
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+        self.backend = MockBackend(
+            self.base_url,
+            starting_credits=starting_credits,
+            require_payment=require_payment,
+            seed=seed,
+            multipart_part_size=multipart_part_size,
+        )
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that point the client and agents here."""
+        env = {name: self.base_url for name in BASE_NAMES}
+        env["PAYMENTS_PAGE_BASE"] = f"{self.base_url}/pay"
+        env["BUYER_PAYMENT_URL_BASE"] = f"{self.base_url}/pay"
+        env["OPENAI_BASE_URL"] = f"{self.base_url}/v1"
+        env["OPENAI_API_KEY"] = "mock"
+        return env
+
+    def count(self, method, path):
+        with self._count_lock:
+            key = f"{method} {_template(path)}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def stats(self):
+        with self._count_lock:
+            requests = dict(self.requests)
+        return {"requests": requests, "faults": self.faults.stats()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="agenttiki-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _template(path):
+    if path.startswith("/blobs/"):
+        return "/blobs/{token}"
+    segments = path.split("/")
+    return "/".join("{id}" if "_" in segment or len(segment) >= 24 else segment for segment in segments)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an in-memory AgentTiki mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE)
+    parser.add_argument("--throttle-rate", type=float, default=DEFAULT_THROTTLE_RATE)
+    parser.add_argument("--fault-paths", default=DEFAULT_FAULT_PATHS, help="regex limiting faults to matching paths")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--negotiation-prefix", action="append", dest="negotiation_prefixes")
+    parser.add_argument("--starting-credits", type=int, default=DEFAULT_STARTING_CREDITS)
+    parser.add_argument("--require-payment", action="store_true")
+    parser.add_argument(
+        "--multipart-part-size",
+        type=int,
+        default=DEFAULT_MULTIPART_PART_SIZE,
+        help="offer part URLs for files declaring a larger size (0 disables)",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    faults = FaultInjector(
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        paths=args.fault_paths or None,
+        seed=args.seed,
+    )
+    mock = MockAgentTiki(
+        host=args.host,
+        port=args.port,
+        faults=faults,
+        negotiation_prefixes=tuple(args.negotiation_prefixes or NEGOTIATION_PREFIXES),
+        starting_credits=args.starting_credits,
+        require_payment=args.require_payment,
+        seed=args.seed,
+        multipart_part_size=args.multipart_part_size,
+        verbose=args.verbose,
+    )
+    for name, value in mock.env().items():
+        print(f"export {name}={value}")
+    print(f"# AgentTiki mock listening on {mock.base_url}", flush=True)
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,34 @@
+from agenttiki_async_client import get_async_client
 from agenttiki_client import get_client
+from route_cache import is_not_found, negotiation_routes
 
 
-def _request_with_fallback(method, api_key, primary_path, fallback_path=None, **kwargs):
+def _request_negotiation(method, api_key, suffix="", **kwargs):
     client = get_client()
-    response = client.request_json(method, "NEGOTIATION_API_BASE", primary_path, api_key=api_key, **kwargs)
-    if fallback_path and response.get("error", {}).get("status_code") == 404:
-        return client.request_json(method, "NEGOTIATION_API_BASE", fallback_path, api_key=api_key, **kwargs)
-    return response
+    return negotiation_routes.call(
+        client.bases["NEGOTIATION_API_BASE"],
+        suffix,
+        lambda path: client.request_json(method, "NEGOTIATION_API_BASE", path, api_key=api_key, **kwargs),
+        is_not_found,
+    )
 
 
-def create_negotiation(api_key, intent_hash, listing_id, proposal, max_rounds=5, expiry_seconds=900):
-    payload = {
+async def _request_negotiation_async(method, api_key, suffix="", **kwargs):
+    client = get_async_client()
+
+    async def send(path):
+        return await client.request_json(method, "NEGOTIATION_API_BASE", path, api_key=api_key, **kwargs)
+
+    return await negotiation_routes.call_async(
+        client.bases["NEGOTIATION_API_BASE"],
+        suffix,
+        send,
+        is_not_found,
+    )
+
+
+def _create_payload(intent_hash, listing_id, proposal, max_rounds, expiry_seconds):
+    return {
         "version": "v2",
         "intent_hash": intent_hash,
         "listing_id": listing_id,
@@ -18,56 +36,69 @@ def create_negotiation(api_key, intent_hash, listing_id, proposal, max_rounds=5,
         "max_rounds": max_rounds,
         "expiry_seconds": expiry_seconds,
     }
-    return _request_with_fallback(
-        "POST",
-        api_key,
-        "/negotiate/v2",
-        "/negotiations/v2",
-        json=payload,
-    )
 
 
-def get_negotiation(api_key, negotiation_id):
-    return _request_with_fallback(
-        "GET",
-        api_key,
-        f"/negotiate/v2/{negotiation_id}",
-        f"/negotiations/v2/{negotiation_id}",
-    )
+def create_negotiation(api_key, intent_hash, listing_id, proposal, max_rounds=5, expiry_seconds=900):
+    payload = _create_payload(intent_hash, listing_id, proposal, max_rounds, expiry_seconds)
+    return _request_negotiation("POST", api_key, json=payload)
+
+
+def get_negotiation(api_key, negotiation_id, cache=False):
+    return _request_negotiation("GET", api_key, f"/{negotiation_id}", cache=cache)
 
 
-def propose_negotiation(api_key, negotiation_id, proposal):
-    return _request_with_fallback(
+def propose_negotiation(api_key, negotiation_id, proposal, idempotency_key=None):
+    return _request_negotiation(
         "POST",
         api_key,
-        f"/negotiate/v2/{negotiation_id}/propose",
-        f"/negotiations/v2/{negotiation_id}/propose",
+        f"/{negotiation_id}/propose",
         json={"proposal": proposal},
+        idempotency_key=idempotency_key,
     )
 
 
-def accept_negotiation(api_key, negotiation_id):
-    return _request_with_fallback(
-        "POST",
-        api_key,
-        f"/negotiate/v2/{negotiation_id}/accept",
-        f"/negotiations/v2/{negotiation_id}/accept",
-    )
+def accept_negotiation(api_key, negotiation_id, idempotency_key=None):
+    return _request_negotiation("POST", api_key, f"/{negotiation_id}/accept", idempotency_key=idempotency_key)
 
 
 def reject_negotiation(api_key, negotiation_id):
-    return _request_with_fallback(
-        "POST",
-        api_key,
-        f"/negotiate/v2/{negotiation_id}/reject",
-        f"/negotiations/v2/{negotiation_id}/reject",
-    )
+    return _request_negotiation("POST", api_key, f"/{negotiation_id}/reject")
 
 
 def discover_provider_open_negotiations(api_key):
-    return _request_with_fallback(
-        "GET",
+    return _request_negotiation("GET", api_key, "/provider-OPEN")
+
+
+def negotiation_route_stats():
+    return negotiation_routes.stats()
+
+
+async def create_negotiation_async(api_key, intent_hash, listing_id, proposal, max_rounds=5, expiry_seconds=900):
+    payload = _create_payload(intent_hash, listing_id, proposal, max_rounds, expiry_seconds)
+    return await _request_negotiation_async("POST", api_key, json=payload)
+
+
+async def get_negotiation_async(api_key, negotiation_id, cache=False):
+    return await _request_negotiation_async("GET", api_key, f"/{negotiation_id}", cache=cache)
+
+
+async def propose_negotiation_async(api_key, negotiation_id, proposal, idempotency_key=None):
+    return await _request_negotiation_async(
+        "POST",
         api_key,
-        "/negotiate/v2/provider-OPEN",
-        "/negotiations/v2/provider-OPEN",
+        f"/{negotiation_id}/propose",
+        json={"proposal": proposal},
+        idempotency_key=idempotency_key,
     )
+
+
+async def accept_negotiation_async(api_key, negotiation_id, idempotency_key=None):
+    return await _request_negotiation_async("POST", api_key, f"/{negotiation_id}/accept", idempotency_key=idempotency_key)
+
+
+async def reject_negotiation_async(api_key, negotiation_id):
+    return await _request_negotiation_async("POST", api_key, f"/{negotiation_id}/reject")
+
+
+async def discover_provider_open_negotiations_async(api_key):
+    return await _request_negotiation_async("GET", api_key, "/provider-OPEN")
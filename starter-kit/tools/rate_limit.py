@@ -0,0 +1,163 @@
+import asyncio
+import os
+import threading
+import time
+
+
+# Unset: no pacing until the backend throttles. A number paces from the
+# start at that many requests per second; 0 disables the limiter.
+DEFAULT_RATE = float(os.environ["AGENTTIKI_RATE_LIMIT"]) if os.getenv("AGENTTIKI_RATE_LIMIT") else None
+DEFAULT_MAX_RATE = float(os.getenv("AGENTTIKI_RATE_LIMIT_MAX", "100"))
+DEFAULT_MIN_RATE = float(os.getenv("AGENTTIKI_RATE_LIMIT_MIN", "0.5"))
+DEFAULT_BURST = float(os.getenv("AGENTTIKI_RATE_BURST", "20"))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate follows the backend's throttling (AIMD).
+
+    With ``rate=None`` the limiter starts open: requests are not paced at
+    all until the backend answers 429. From then on every admitted request
+    reserves a token, and when the bucket is empty the caller is told how
+    long to wait for its slot, so bursts queue up instead of failing. A 429
+    halves the rate (starting from ``max_rate``), at most once per
+    ``cooldown`` seconds, and blocks the bucket until ``Retry-After`` has
+    passed. Every other response adds ``increase`` requests per second back;
+    an open limiter stops pacing again once it is back at ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        rate=DEFAULT_RATE,
+        burst=DEFAULT_BURST,
+        min_rate=DEFAULT_MIN_RATE,
+        max_rate=DEFAULT_MAX_RATE,
+        increase=1.0,
+        decrease=0.5,
+        cooldown=1.0,
+    ):
+        self.opens = rate is None
+        self.paced = not self.opens
+        self.rate = max_rate if rate is None else rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, self.rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = burst
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            if not self.paced:
+                delay = max(0.0, self.blocked_until - now)
+                self.waited_seconds += delay
+                return delay
+            self._refill(now)
+            self.tokens -= 1
+            delay = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            self.waited_seconds += delay
+            return delay
+
+    def acquire(self, sleep=time.sleep):
+        delay = self.reserve()
+        if delay > 0:
+            sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            if not self.paced:
+                return
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            if self.opens and self.rate >= self.max_rate:
+                self.paced = False
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttled += 1
+            if not self.paced:
+                self.paced = True
+                self.tokens = 0.0
+                self._updated = now
+            # Concurrent requests from one burst all see 429; shrink once.
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + float(retry_after))
+
+    def observe(self, result):
+        error = result.get("error") if isinstance(result, dict) else None
+        status_code = error.get("status_code") if isinstance(error, dict) else None
+        if status_code == 429:
+            self.on_throttle(error.get("retry_after"))
+        elif not status_code or status_code < 500:
+            self.on_success()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3) if self.paced else None,
+                "tokens": round(self.tokens, 3),
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 3),
+            }
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiterRegistry:
+    """One limiter per base name, shared by every client in the process."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.rate is None or self.rate > 0
+
+    def get(self, base_name):
+        if not self.enabled:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(base_name)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter(rate=self.rate, burst=self.burst)
+                self._limiters[base_name] = limiter
+            return limiter
+
+    def configure(self, rate=None, burst=None):
+        with self._lock:
+            if rate is not None:
+                self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            self._limiters.clear()
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {base_name: limiter.stats() for base_name, limiter in limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from circuit_breaker import BACKEND_UNAVAILABLE
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Platform codes from schemas/error_codes.md. Anything listed as protocol
+# enforcement is final: resending the same request cannot change the answer.
+NON_RETRYABLE_CODES = {
+    "SCHEMA_VALIDATION_FAILED",
+    "UNAUTHORIZED",
+    "UNAUTHORIZED_ACTOR",
+    "INSUFFICIENT_CREDITS",
+    "INVALID_STATE_TRANSITION",
+    "INVALID_DELIVERY_SEQUENCE",
+    "INVALID_PROPOSAL",
+    "NEGOTIATION_CLOSED",
+    "NEGOTIATION_EXPIRED",
+    "MAX_ROUNDS_REACHED",
+    "PAYMENT_REQUIRED",
+    # Raised locally by an open circuit breaker; waiting is the only remedy.
+    BACKEND_UNAVAILABLE,
+}
+# Rejected before any state changed, so safe to resend for every method.
+REJECTED_CODES = {"NOT_YOUR_TURN"}
+SERVER_ERROR_CODES = {"INTERNAL_ERROR", "INTERNAL_SERVER_ERROR"}
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("AGENTTIKI_RETRY_MAX_ATTEMPTS", "4"))
+DEFAULT_BASE_DELAY = float(os.getenv("AGENTTIKI_RETRY_BASE_DELAY", "0.25"))
+DEFAULT_MAX_DELAY = float(os.getenv("AGENTTIKI_RETRY_MAX_DELAY", "30"))
+DEFAULT_BUDGET_RATIO = float(os.getenv("AGENTTIKI_RETRY_BUDGET_RATIO", "0.2"))
+
+
+class RetryBudget:
+    """Token bucket that caps retries to a fraction of an actor's traffic.
+
+    Every first attempt deposits ``ratio`` tokens and every retry spends one,
+    so during a backend brownout retries add at most ``ratio`` extra load.
+    ``min_per_second`` keeps a trickle of retries available to quiet actors.
+    """
+
+    def __init__(self, ratio=DEFAULT_BUDGET_RATIO, min_per_second=0.5, max_balance=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.max_balance, self.balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+
+class RetryPolicy:
+    """Classifies failed calls and retries them with decorrelated jitter.
+
+    Results follow the ``request_json`` contract: a dict with an ``error``
+    object carrying ``code`` and ``status_code``. Server errors and transport
+    failures are only retried for safe methods or calls marked idempotent.
+    """
+
+    def __init__(
+        self,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+        budget_ratio=DEFAULT_BUDGET_RATIO,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def budget(self, actor_key):
+        with self._lock:
+            budget = self._budgets.get(actor_key)
+            if budget is None:
+                budget = RetryBudget(ratio=self.budget_ratio)
+                self._budgets[actor_key] = budget
+            return budget
+
+    def is_retryable(self, method, result=None, exc=None, idempotent=False):
+        replay_safe = idempotent or method.upper() in SAFE_METHODS
+        if exc is not None:
+            return replay_safe
+        error = result.get("error") if isinstance(result, dict) else None
+        if not isinstance(error, dict):
+            return False
+        code = error.get("code")
+        status_code = error.get("status_code") or 0
+        if code in NON_RETRYABLE_CODES:
+            return False
+        if code in REJECTED_CODES or status_code == 429:
+            return True
+        if code in SERVER_ERROR_CODES or status_code >= 500:
+            return replay_safe
+        return False
+
+    def next_delay(self, previous_delay, result=None):
+        upper = max(self.base_delay, previous_delay * 3)
+        delay = min(self.max_delay, random.uniform(self.base_delay, upper))
+        error = result.get("error") if isinstance(result, dict) else None
+        if isinstance(error, dict) and error.get("retry_after"):
+            delay = max(delay, float(error["retry_after"]))
+        return delay
+
+    def delays(self):
+        delay = 0.0
+        while True:
+            delay = self.next_delay(delay)
+            yield delay
+
+    def run(self, method, send, actor_key=None, idempotent=False, transient=(), sleep=time.sleep):
+        budget = self.budget(actor_key)
+        budget.deposit()
+        delay = 0.0
+        attempt = 1
+        while True:
+            result, exc = None, None
+            try:
+                result = send()
+            except transient as error:
+                exc = error
+            if not self._should_retry(attempt, method, result, exc, idempotent, budget):
+                if exc is not None:
+                    raise exc
+                return result
+            delay = self.next_delay(delay, result)
+            sleep(delay)
+            attempt += 1
+
+    async def run_async(self, method, send, actor_key=None, idempotent=False, transient=()):
+        budget = self.budget(actor_key)
+        budget.deposit()
+        delay = 0.0
+        attempt = 1
+        while True:
+            result, exc = None, None
+            try:
+                result = await send()
+            except transient as error:
+                exc = error
+            if not self._should_retry(attempt, method, result, exc, idempotent, budget):
+                if exc is not None:
+                    raise exc
+                return result
+            delay = self.next_delay(delay, result)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _should_retry(self, attempt, method, result, exc, idempotent, budget):
+        if attempt >= self.max_attempts:
+            return False
+        if not self.is_retryable(method, result=result, exc=exc, idempotent=idempotent):
+            return False
+        return budget.withdraw()
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+
+NEGOTIATION_PREFIXES = ("/negotiate/v2", "/negotiations/v2")
+DEFAULT_ROUTE_TTL_SECONDS = float(os.getenv("AGENTTIKI_ROUTE_TTL_SECONDS", "3600"))
+
+
+class RouteResolver:
+    """Remembers which path prefix answers on each base URL.
+
+    Deployments expose negotiation either under ``/negotiate/v2`` or
+    ``/negotiations/v2``. The first call probes prefixes in order and caches
+    the first one that does not 404. Later calls go straight to the cached
+    prefix until ``ttl`` expires or that prefix itself returns a 404.
+    """
+
+    def __init__(self, prefixes=NEGOTIATION_PREFIXES, ttl=DEFAULT_ROUTE_TTL_SECONDS):
+        self.prefixes = tuple(prefixes)
+        self.ttl = ttl
+        self._routes = {}
+        self._counters = {"hits": 0, "misses": 0, "reprobes": 0, "probe_requests": 0}
+        self._lock = threading.Lock()
+
+    def learned(self, base):
+        with self._lock:
+            entry = self._routes.get(base)
+            if entry is None:
+                return None
+            prefix, learned_at = entry
+            if self.ttl and time.monotonic() - learned_at > self.ttl:
+                del self._routes[base]
+                return None
+            return prefix
+
+    def learn(self, base, prefix):
+        with self._lock:
+            self._routes[base] = (prefix, time.monotonic())
+
+    def forget(self, base=None):
+        with self._lock:
+            if base is None:
+                self._routes.clear()
+            else:
+                self._routes.pop(base, None)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["routes"] = {base: prefix for base, (prefix, _) in self._routes.items()}
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+    def call(self, base, suffix, send, is_not_found):
+        """Send ``suffix`` under the right prefix for ``base``.
+
+        ``send(path)`` performs the request and ``is_not_found(result)`` tells
+        whether the result is a 404. The result of the winning request is
+        returned, or the last 404 when every prefix misses.
+        """
+        prefix = self.learned(base)
+        result = None
+        if prefix is not None:
+            result = send(prefix + suffix)
+            if not is_not_found(result):
+                self._count("hits")
+                return result
+            self._count("reprobes")
+        self._count("misses")
+        for candidate in self._probe_order(prefix):
+            self._count("probe_requests")
+            result = send(candidate + suffix)
+            if not is_not_found(result):
+                self.learn(base, candidate)
+                return result
+        return result
+
+    async def call_async(self, base, suffix, send, is_not_found):
+        prefix = self.learned(base)
+        result = None
+        if prefix is not None:
+            result = await send(prefix + suffix)
+            if not is_not_found(result):
+                self._count("hits")
+                return result
+            self._count("reprobes")
+        self._count("misses")
+        for candidate in self._probe_order(prefix):
+            self._count("probe_requests")
+            result = await send(candidate + suffix)
+            if not is_not_found(result):
+                self.learn(base, candidate)
+                return result
+        return result
+
+    def _probe_order(self, skip):
+        # A 404 on the cached prefix usually means a missing resource rather
+        # than a moved route, so the cached entry is kept unless another
+        # prefix answers instead.
+        return [prefix for prefix in self.prefixes if prefix != skip]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+
+def is_not_found(response):
+    error = response.get("error") if isinstance(response, dict) else None
+    return isinstance(error, dict) and error.get("status_code") == 404
+
+
+negotiation_routes = RouteResolver()
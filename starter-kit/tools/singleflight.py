@@ -0,0 +1,112 @@
+import asyncio
+import copy
+import threading
+
+
+class _Counters:
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+
+    def stats(self):
+        total = self.leaders + self.followers
+        return {
+            "calls": total,
+            "network_calls": self.leaders,
+            "coalesced": self.followers,
+            "dedup_ratio": self.followers / total if total else 0.0,
+        }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(_Counters):
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller runs ``fn``. Callers arriving while it is in flight wait
+    and receive a deep copy of its result, so they can mutate it freely.
+    Nothing is cached once the call returns.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+# Result handed to followers when the leader was cancelled.
+_ABANDONED = object()
+
+
+class AsyncSingleFlight(_Counters):
+    """Asyncio variant of ``SingleFlight`` for clients bound to one loop.
+
+    Cancelling the leader only cancels the leader: its followers start the
+    call again, one of them leading it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+
+    async def do(self, key, fn):
+        while key in self._calls:
+            self.followers += 1
+            result = await asyncio.shield(self._calls[key])
+            if result is not _ABANDONED:
+                return copy.deepcopy(result)
+            self.followers -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_result(_ABANDONED)
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
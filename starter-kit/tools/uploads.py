@@ -0,0 +1,187 @@
+import contextlib
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import requests
+
+
+UPLOAD_FAILED = "UPLOAD_FAILED"
+
+DEFAULT_UPLOAD_ATTEMPTS = int(os.getenv("AGENTTIKI_UPLOAD_ATTEMPTS", "3"))
+DEFAULT_UPLOAD_CONCURRENCY = int(os.getenv("AGENTTIKI_UPLOAD_CONCURRENCY", "4"))
+
+_READ_SIZE = 1 << 16
+
+
+def upload_file(
+    session,
+    target,
+    local_path,
+    content_type="application/octet-stream",
+    timeout=60,
+    max_workers=DEFAULT_UPLOAD_CONCURRENCY,
+    attempts=DEFAULT_UPLOAD_ATTEMPTS,
+):
+    """Stream ``local_path`` to a presigned upload target.
+
+    ``target`` is either a presigned URL or a file entry from an upload-intent
+    response. When the entry carries ``multipart.parts``, each part is read
+    straight from disk and PUT to its own URL, ``max_workers`` at a time, and
+    a failed part is retried on its own. Otherwise the file goes up in one
+    streamed PUT.
+
+    Returns ``{"path", "size", "status_code", "etag"}``, plus ``upload_id``
+    and ``parts`` for a multipart upload, or an ``UPLOAD_FAILED`` envelope.
+    Pass the result to ``completed_file`` for the confirm call.
+    """
+    size = os.path.getsize(local_path)
+    multipart = target.get("multipart") if isinstance(target, dict) else None
+    # An empty file has nothing to split; it can only go up in a single PUT.
+    if multipart and multipart.get("parts") and size:
+        return _upload_parts(session, multipart, local_path, size, content_type, timeout, max_workers, attempts)
+
+    url = target.get("upload_url") if isinstance(target, dict) else target
+    if not url:
+        return _error("upload target has no upload_url")
+    # requests cannot size an empty file object and would send it chunked,
+    # which presigned PUTs reject; an empty bytes body gets Content-Length: 0.
+    open_body = (lambda: open(local_path, "rb")) if size else (lambda: contextlib.nullcontext(b""))
+    response = _put(session, url, open_body, content_type, timeout, attempts)
+    if "error" in response:
+        return response
+    return {
+        "path": local_path,
+        "size": size,
+        "status_code": response["status_code"],
+        "etag": response["etag"],
+    }
+
+
+def completed_file(file_meta, result):
+    """The upload-intent ``file_meta`` as it should be sent to confirm."""
+    completed = {key: value for key, value in file_meta.items() if key != "multipart"}
+    if "parts" in result:
+        completed["multipart"] = {"upload_id": result["upload_id"], "parts": result["parts"]}
+    return completed
+
+
+def _upload_parts(session, multipart, local_path, size, content_type, timeout, max_workers, attempts):
+    parts = sorted(multipart["parts"], key=lambda part: part["part_number"])
+    part_size = multipart.get("part_size") or -(-size // len(parts))
+    if part_size <= 0:
+        return _error(f"invalid multipart part_size {part_size}")
+    if -(-size // part_size) != len(parts):
+        return _error(f"{len(parts)} part URLs do not cover {size} bytes in {part_size}-byte parts")
+
+    def send(index, part):
+        offset = index * part_size
+        length = min(part_size, size - offset)
+        response = _put(
+            session,
+            part["upload_url"],
+            lambda: _FileSlice(local_path, offset, length),
+            content_type,
+            timeout,
+            attempts,
+        )
+        if "error" in response:
+            response["error"]["part_number"] = part["part_number"]
+            raise _PartFailed(response)
+        return {"part_number": part["part_number"], "etag": response["etag"]}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(parts)))) as pool:
+        futures = [pool.submit(send, index, part) for index, part in enumerate(parts)]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is not None:
+                exc = future.exception()
+                if isinstance(exc, _PartFailed):
+                    return exc.result
+                raise exc
+        completed = [future.result() for future in futures]
+    return {
+        "path": local_path,
+        "size": size,
+        "status_code": 200,
+        "etag": None,
+        "upload_id": multipart.get("upload_id"),
+        "parts": completed,
+    }
+
+
+def _put(session, url, open_body, content_type, timeout, attempts):
+    error = None
+    for attempt in range(max(1, attempts)):
+        if attempt:
+            time.sleep(min(0.5 * 2 ** (attempt - 1), 5.0))
+        try:
+            with open_body() as body:
+                response = session.put(url, data=body, headers={"Content-Type": content_type}, timeout=timeout)
+        except (requests.RequestException, OSError) as exc:
+            error = _error(f"upload interrupted: {exc}")
+            continue
+        if response.ok:
+            return {"status_code": response.status_code, "etag": response.headers.get("ETag")}
+        error = _error(f"HTTP {response.status_code}", response.status_code)
+        if response.status_code < 500 and response.status_code != 429:
+            break
+    return error
+
+
+class _FileSlice:
+    """Read-only window onto part of a file, sized so requests sends a
+    ``Content-Length`` and streams it instead of buffering."""
+
+    def __init__(self, path, offset, length):
+        self.file_handle = open(path, "rb")
+        self.offset = offset
+        self.length = length
+        self.file_handle.seek(offset)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(lambda: self.read(_READ_SIZE), b"")
+
+    def read(self, size=-1):
+        remaining = self.length - self.tell()
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file_handle.read(size) if size > 0 else b""
+
+    def tell(self):
+        return self.file_handle.tell() - self.offset
+
+    def seek(self, position, whence=0):
+        if whence == 1:
+            position += self.tell()
+        elif whence == 2:
+            position += self.length
+        self.file_handle.seek(self.offset + max(0, min(position, self.length)))
+        return self.tell()
+
+    def close(self):
+        self.file_handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _PartFailed(Exception):
+    def __init__(self, result):
+        super().__init__(result["error"]["message"])
+        self.result = result
+
+
+def _error(message, status_code=None):
+    error = {"code": UPLOAD_FAILED, "message": message}
+    if status_code is not None:
+        error["status_code"] = status_code
+    return {"error": error}